@@ -0,0 +1,81 @@
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from dishka import AsyncContainer, make_async_container
+from ulid import ULID
+
+from checkbox.config import Settings
+from checkbox.database.models import User
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.services.user import UserService
+
+
+def make_container() -> AsyncContainer:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    return make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: settings}
+    )
+
+
+@asynccontextmanager
+async def benchmark_user(container: AsyncContainer) -> AsyncIterator[User]:
+    async with container() as request_container:
+        user_service = await request_container.get(UserService)
+        user = await user_service.create(
+            email=f"benchmark_{ULID()}@example.com", password="benchmark"
+        )
+
+    try:
+        yield user
+    finally:
+        async with container() as request_container:
+            user_service = await request_container.get(UserService)
+            await user_service.delete(user.id)
+
+
+async def measure(
+    func: Callable[[], Awaitable], iterations: int, warmup: int = 3
+) -> list[float]:
+    for _ in range(warmup):
+        await func()
+
+    timings = []
+
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    return timings
+
+
+def summarize(timings: list[float]) -> dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+    }
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    index = round(percent / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+def format_summary(name: str, timings: list[float]) -> str:
+    summary = summarize(timings)
+    return (
+        f"{name:<40} mean {summary['mean_ms']:8.2f} ms"
+        f"  p50 {summary['p50_ms']:8.2f} ms"
+        f"  p95 {summary['p95_ms']:8.2f} ms"
+        f"  p99 {summary['p99_ms']:8.2f} ms"
+    )
@@ -0,0 +1,398 @@
+"""End-to-end load test with a weighted mix of endpoints.
+
+Creates benchmark users with some receipts, then concurrent clients pick
+requests from the mix for `--duration` seconds. Prints throughput and
+p50/p95/p99 latency per endpoint and writes them as JSON with `--output`,
+so runs on different commits can be compared.
+
+The app runs in-process by default (one event loop, like a single uvicorn
+worker), `--workers N` starts `uvicorn` with N workers instead and `--url`
+targets an already running server. Rate limiting is disabled for the app
+started by the load test, a server given by `--url` needs
+RATE_LIMIT__ENABLED=False.
+
+Usage: poetry run python -m benchmarks.loadtest [--concurrency 20] [--duration 30]
+    [--mix sign_in=1,create=3,list=3,get=4,plaintext=2] [--workers 4]
+    [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, UTC, timedelta
+
+from httpx import AsyncClient, ASGITransport, TransportError
+from ulid import ULID
+
+from benchmarks.common import make_container, summarize, format_summary
+from checkbox.config import Settings
+from checkbox.database.models import User
+from checkbox.services.user import UserService
+from checkbox.web.main import create_app
+
+DEFAULT_MIX = "sign_in=1,create=3,list=3,get=4,plaintext=2"
+PASSWORD = "benchmark"
+UVICORN_PORT = 8765
+
+LIST_FILTERS = (
+    {},
+    {"payment_type": "CARD"},
+    {"min_total": "100"},
+    {"total_mode": "none", "limit": 20},
+    {"start_date": (datetime.now(UTC) - timedelta(days=1)).isoformat()},
+)
+
+
+@dataclass
+class VirtualUser:
+    user: User
+    headers: dict[str, str]
+    receipt_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Results:
+    timings: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+def build_receipt(rng: random.Random) -> dict:
+    prices = [rng.randrange(100, 50000) for _ in range(rng.randrange(1, 10))]
+    quantities = [rng.randrange(1, 5) for _ in prices]
+    # Cents, so the card payment matches the total exactly
+    total = sum(price * quantity for price, quantity in zip(prices, quantities))
+    payment_type, amount = rng.choice(
+        (("CARD", total), ("CASH", total + rng.randrange(10000)))
+    )
+    return {
+        "products": [
+            {
+                "name": f"Product {rng.randrange(1000)}",
+                "price": f"{price / 100:.2f}",
+                "quantity": quantity,
+            }
+            for price, quantity in zip(prices, quantities)
+        ],
+        "payment": {"type": payment_type, "amount": f"{amount / 100:.2f}"},
+    }
+
+
+async def sign_in(client: AsyncClient, user: VirtualUser, rng: random.Random):
+    return await client.post(
+        "/users/sign-in", json={"email": user.user.email, "password": PASSWORD}
+    )
+
+
+async def create_receipt(client: AsyncClient, user: VirtualUser, rng: random.Random):
+    response = await client.post(
+        "/receipts", json=build_receipt(rng), headers=user.headers
+    )
+    if response.status_code == 201:
+        user.receipt_ids.append(response.json()["id"])
+    return response
+
+
+async def list_receipts(client: AsyncClient, user: VirtualUser, rng: random.Random):
+    return await client.get(
+        "/receipts", params=rng.choice(LIST_FILTERS), headers=user.headers
+    )
+
+
+async def get_receipt(client: AsyncClient, user: VirtualUser, rng: random.Random):
+    receipt_id = rng.choice(user.receipt_ids)
+    return await client.get(f"/receipts/{receipt_id}", headers=user.headers)
+
+
+async def get_plaintext(client: AsyncClient, user: VirtualUser, rng: random.Random):
+    receipt_id = rng.choice(user.receipt_ids)
+    return await client.get(
+        f"/receipts/{receipt_id}/plaintext",
+        params={"line_length": rng.choice((32, 40, 48))},
+    )
+
+
+OPERATIONS = {
+    "sign_in": sign_in,
+    "create": create_receipt,
+    "list": list_receipts,
+    "get": get_receipt,
+    "plaintext": get_plaintext,
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}"
+            )
+        weights[name] = float(weight or 1)
+
+    return weights
+
+
+@asynccontextmanager
+async def app_client(args: argparse.Namespace) -> AsyncIterator[AsyncClient]:
+    if args.url:
+        async with AsyncClient(base_url=args.url, timeout=60) as client:
+            yield client
+        return
+
+    if args.workers:
+        async with uvicorn_server(args.workers) as base_url:
+            async with AsyncClient(base_url=base_url, timeout=60) as client:
+                yield client
+        return
+
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    settings.rate_limit.ENABLED = False
+    app = create_app(settings)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://benchmark", timeout=60
+    ) as client:
+        yield client
+
+    await app.state.dishka_container.close()
+
+
+@asynccontextmanager
+async def uvicorn_server(workers: int) -> AsyncIterator[str]:
+    base_url = f"http://127.0.0.1:{UVICORN_PORT}"
+    env = os.environ | {"SQLALCHEMY__ECHO": "False", "RATE_LIMIT__ENABLED": "False"}
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "checkbox.web.main:app",
+            "--port",
+            str(UVICORN_PORT),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=env,
+    )
+
+    try:
+        async with AsyncClient(base_url=base_url) as client:
+            for _ in range(100):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def create_users(
+    client: AsyncClient, count: int, receipts_per_user: int, rng: random.Random
+) -> list[VirtualUser]:
+    container = make_container()
+    users = []
+
+    async with container() as request_container:
+        user_service = await request_container.get(UserService)
+        for _ in range(count):
+            user = await user_service.create(
+                email=f"benchmark_{ULID()}@example.com", password=PASSWORD
+            )
+            users.append(VirtualUser(user=user, headers={}))
+
+    await container.close()
+
+    for user in users:
+        response = await sign_in(client, user, rng)
+        response.raise_for_status()
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for _ in range(receipts_per_user):
+            (await create_receipt(client, user, rng)).raise_for_status()
+
+    return users
+
+
+async def delete_users(users: list[VirtualUser]) -> None:
+    container = make_container()
+
+    async with container() as request_container:
+        user_service = await request_container.get(UserService)
+        for user in users:
+            await user_service.delete(user.user.id)
+
+    await container.close()
+
+
+async def run_load(
+    client: AsyncClient,
+    users: list[VirtualUser],
+    weights: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> tuple[Results, float]:
+    results = Results()
+    names = list(weights)
+    started_at = time.perf_counter()
+    measure_from = started_at + warmup
+    stop_at = measure_from + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+
+        while (request_started_at := time.perf_counter()) < stop_at:
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            user = rng.choice(users)
+            response = await OPERATIONS[name](client, user, rng)
+            elapsed_ms = (time.perf_counter() - request_started_at) * 1000
+
+            if request_started_at < measure_from:
+                continue
+
+            results.timings[name].append(elapsed_ms)
+            if response.status_code >= 400:
+                results.errors[name] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return results, time.perf_counter() - measure_from
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(
+    args: argparse.Namespace,
+    weights: dict[str, float],
+    results: Results,
+    elapsed: float,
+) -> dict:
+    endpoints = {}
+
+    for name in weights:
+        timings = results.timings[name]
+        endpoints[name] = {
+            "requests": len(timings),
+            "errors": results.errors[name],
+            "throughput_rps": len(timings) / elapsed,
+            **summarize(timings),
+        }
+
+    total_requests = sum(len(t) for t in results.timings.values())
+    return {
+        "revision": git_revision(),
+        "started_at": datetime.now(UTC).isoformat(),
+        "config": {
+            "mode": "url" if args.url else "uvicorn" if args.workers else "in-process",
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "users": args.users,
+            "receipts_per_user": args.receipts_per_user,
+            "mix": weights,
+            "seed": args.seed,
+        },
+        "elapsed_seconds": elapsed,
+        "requests": total_requests,
+        "errors": sum(results.errors.values()),
+        "throughput_rps": total_requests / elapsed,
+        "endpoints": endpoints,
+        "all": summarize([t for ts in results.timings.values() for t in ts]),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    weights = args.mix
+    rng = random.Random(args.seed)
+
+    async with app_client(args) as client:
+        users = await create_users(client, args.users, args.receipts_per_user, rng)
+
+        try:
+            results, elapsed = await run_load(
+                client,
+                users,
+                weights,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                seed=args.seed,
+            )
+        finally:
+            await delete_users(users)
+
+    report = build_report(args, weights, results, elapsed)
+
+    print(
+        f"--- {report['config']['mode']}, {args.concurrency} clients, {elapsed:.1f} s"
+    )
+    for name, endpoint in report["endpoints"].items():
+        print(
+            format_summary(name, results.timings[name]),
+            f"  {endpoint['throughput_rps']:8.1f} req/s  {endpoint['errors']} errors",
+        )
+    print(
+        format_summary("all", [t for ts in results.timings.values() for t in ts]),
+        f"  {report['throughput_rps']:8.1f} req/s  {report['errors']} errors",
+    )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX, help="operation=weight,..."
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--receipts-per-user", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=0, help="uvicorn workers")
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
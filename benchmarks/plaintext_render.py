@@ -0,0 +1,168 @@
+"""Plaintext receipt rendering throughput, 1k receipts x 5 products.
+
+Usage: poetry run python -m benchmarks.plaintext_render [--iterations 20] [--line-length 32]
+
+Compares the compiled `ReceiptLayout` with the f-string formatter it replaced,
+kept here as the baseline, for ORM receipts and for the receipt JSON documents
+ZIP downloads render from.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, UTC, timedelta
+from decimal import Decimal
+
+from benchmarks.common import measure, format_summary, summarize
+from checkbox.database.models import Receipt, ReceiptProduct
+from checkbox.database.models.base import generate_sequential_ids
+from checkbox.database.models.receipt import PaymentType
+from checkbox.dto.receipt import ReceiptDto
+from checkbox.services.plaintext import (
+    KYIV_TZ,
+    format_receipt,
+    format_receipts,
+    render_receipts_json,
+)
+from checkbox.services.receipt_service import dump_receipt_json
+
+RECEIPTS_COUNT = 1000
+PRODUCTS_PER_RECEIPT = 5
+
+
+def format_receipt_baseline(receipt: Receipt, line_length: int = 32) -> str:
+    receipt_lines = [f"{'checkbox.ua':^{line_length}}", "=" * line_length]
+
+    for product in receipt.products:
+        quantity_price = f"{product.quantity:.2f} x {product.price:,.2f}".rjust(
+            line_length - len(product.name)
+        )
+        receipt_lines.append(
+            f"{product.name.ljust(line_length - len(quantity_price))}{quantity_price}"
+        )
+        total = f"{product.total:,.2f}".rjust(line_length)
+        receipt_lines.append(total)
+
+    receipt_lines.append("=" * line_length)
+
+    str_total = str(receipt.total)
+    receipt_lines.append(f"СУМА{str_total:>{line_length - len(str_total) + 1}}")
+
+    str_payment_amount = str(receipt.payment_amount)
+    receipt_lines.append(
+        f"{receipt.payment_type.capitalize()}{str_payment_amount:>{line_length - len(str_payment_amount) + 1}}"
+    )
+    str_rest = str(receipt.rest)
+    receipt_lines.append(f"Решта{str_rest:>{line_length - len(str_rest) - 1}}")
+    receipt_lines.append("=" * line_length)
+
+    created_at_kyiv = receipt.created_at.astimezone(KYIV_TZ)
+    receipt_lines.append(f"{created_at_kyiv.strftime('%d.%m.%Y %H:%M'):^{line_length}}")
+    receipt_lines.append(f"{'Дякуємо за покупку!':^{line_length}}")
+
+    return "\n".join(receipt_lines)
+
+
+def receipt_from_dto_baseline(receipt: ReceiptDto) -> Receipt:
+    return Receipt(
+        id=receipt.id,
+        products=[
+            ReceiptProduct(
+                name=product.name,
+                price=product.price,
+                quantity=product.quantity,
+                total=product.total,
+            )
+            for product in receipt.products
+        ],
+        total=receipt.total,
+        payment_type=receipt.payment.type,
+        payment_amount=receipt.payment.amount,
+        rest=receipt.rest,
+        created_at=receipt.created_at,
+    )
+
+
+def build_receipts() -> list[Receipt]:
+    created_at = datetime.now(UTC)
+    return [
+        Receipt(
+            id=receipt_id,
+            products=[
+                ReceiptProduct(
+                    name=f"Product {j}",
+                    price=Decimal("1234.50"),
+                    quantity=j + 1,
+                    total=Decimal("1234.50") * (j + 1),
+                )
+                for j in range(PRODUCTS_PER_RECEIPT)
+            ],
+            payment_type=PaymentType.CARD,
+            payment_amount=Decimal("18517.50"),
+            total=Decimal("18517.50"),
+            rest=Decimal("0.00"),
+            created_at=created_at + timedelta(minutes=i),
+        )
+        for i, receipt_id in enumerate(generate_sequential_ids(RECEIPTS_COUNT))
+    ]
+
+
+async def run(iterations: int, line_length: int) -> None:
+    receipts = build_receipts()
+    assert format_receipts(receipts, line_length) == [
+        format_receipt_baseline(receipt, line_length) for receipt in receipts
+    ]
+
+    receipts_json = [dump_receipt_json(receipt).decode() for receipt in receipts]
+
+    async def baseline():
+        return [format_receipt_baseline(receipt, line_length) for receipt in receipts]
+
+    async def layout_per_receipt():
+        return [format_receipt(receipt, line_length) for receipt in receipts]
+
+    async def layout_batch():
+        return format_receipts(receipts, line_length)
+
+    # What a ZIP download worker renders from
+    async def json_baseline():
+        return [
+            format_receipt_baseline(
+                receipt_from_dto_baseline(ReceiptDto.model_validate_json(receipt_json)),
+                line_length,
+            )
+            for receipt_json in receipts_json
+        ]
+
+    async def json_layout():
+        return render_receipts_json(receipts_json, line_length)
+
+    print(
+        f"--- {RECEIPTS_COUNT} receipts x {PRODUCTS_PER_RECEIPT} products,"
+        f" line length {line_length}"
+    )
+    for name, func in (
+        ("f-string baseline", baseline),
+        ("layout / format_receipt", layout_per_receipt),
+        ("layout / format_receipts batch", layout_batch),
+        ("json / DTO -> ORM -> f-string", json_baseline),
+        ("json / render_receipts_json", json_layout),
+    ):
+        timings = await measure(func, iterations)
+        receipts_per_second = RECEIPTS_COUNT / summarize(timings)["p50_ms"] * 1000
+        print(
+            f"{format_summary(name, timings)}  {receipts_per_second:10,.0f} receipts/s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--line-length", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.line_length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Product-name search in `GET /receipts` with and without the trigram index.
+
+Runs against seeded data, a multi-million-row `receipt_products` table takes:
+
+    poetry run python -m checkbox.cli.seed --users 200000
+    poetry run python -m benchmarks.product_search [--iterations 20]
+
+Searches the receipts of the user with the most receipts and of a median one,
+for a common term, an absent one and a misspelled one (fuzzy). Trigram (GIN)
+indexes are only read with bitmap scans, so "no index" runs the same queries
+with bitmap scans disabled.
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import make_container, measure, format_summary
+from checkbox.dto.generic import TotalMode
+from checkbox.dto.receipt import ProductMatch
+from checkbox.services.receipt_service import ReceiptService
+
+SEARCHES = (
+    ("common", "coffee", ProductMatch.SUBSTRING),
+    ("absent", "zanzibar", ProductMatch.SUBSTRING),
+    ("fuzzy", "cofee", ProductMatch.FUZZY),
+)
+PAGE_SIZE = 20
+
+
+async def pick_users(session: AsyncSession) -> dict[str, tuple[str, int]]:
+    result = await session.execute(text("""
+        SELECT user_id, count(*) AS receipts_count
+        FROM receipts
+        GROUP BY user_id
+        ORDER BY receipts_count DESC
+        """))
+    users = result.all()
+    heavy, median = users[0], users[len(users) // 2]
+    return {"heavy": tuple(heavy), "median": tuple(median)}
+
+
+async def run(iterations: int, min_products: int) -> None:
+    container = make_container()
+
+    async with container() as request_container:
+        session = await request_container.get(AsyncSession)
+        # `reltuples` of a partitioned table is the sum of its partitions'
+        products_count = await session.scalar(text("""
+            SELECT coalesce(sum(greatest(child.reltuples, 0)), 0)::bigint
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'receipt_products'::regclass
+            """))
+        if products_count < min_products:
+            await container.close()
+            raise SystemExit(
+                f"receipt_products has ~{products_count} rows, seed at least"
+                f" {min_products} with `python -m checkbox.cli.seed`"
+            )
+
+        users = await pick_users(session)
+        await session.commit()
+
+    print(
+        f"--- receipt_products: ~{products_count} rows, {PAGE_SIZE} receipts per page"
+    )
+
+    for user_label, (user_id, receipts_count) in users.items():
+        for search_label, term, product_match in SEARCHES:
+            for use_index in (True, False):
+                async with container() as request_container:
+                    session = await request_container.get(AsyncSession)
+                    receipt_service = await request_container.get(ReceiptService)
+
+                    if not use_index:
+                        await session.execute(text("SET LOCAL enable_bitmapscan = off"))
+
+                    async def search():
+                        await receipt_service.get_user_receipts_json(
+                            user_id=user_id,
+                            start_date=None,
+                            end_date=None,
+                            payment_type=None,
+                            min_total=None,
+                            offset=0,
+                            limit=PAGE_SIZE,
+                            total_mode=TotalMode.NONE,
+                            product=term,
+                            product_match=product_match,
+                        )
+
+                    timings = await measure(search, iterations)
+                    await session.rollback()
+
+                name = (
+                    f"{user_label} ({receipts_count} receipts) {search_label}"
+                    f" {'index' if use_index else 'no index'}"
+                )
+                print(format_summary(name, timings))
+
+    await container.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--min-products", type=int, default=1_000_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.min_products))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Receipt write latency under concurrent load.
+
+Compares `ReceiptService.create` with the previous behavior, which re-selected
+the receipt with its products after the commit.
+
+Usage: poetry run python -m benchmarks.receipt_create [--concurrency 20] [--requests 100]
+"""
+
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+
+from dishka import AsyncContainer
+
+from benchmarks.common import (
+    make_container,
+    benchmark_user,
+    format_summary,
+)
+from checkbox.dto.receipt import CreateReceiptDto
+from checkbox.services.receipt_service import ReceiptService
+
+RECEIPT = CreateReceiptDto.model_validate(
+    {
+        "products": [
+            {"name": f"Product {i}", "price": Decimal("9.99"), "quantity": 2}
+            for i in range(5)
+        ],
+        "payment": {"type": "CARD", "amount": Decimal("99.90")},
+    }
+)
+
+
+async def create(receipt_service: ReceiptService, user_id: str) -> None:
+    await receipt_service.create(RECEIPT, user_id=user_id)
+
+
+async def create_and_reselect(receipt_service: ReceiptService, user_id: str) -> None:
+    receipt = await receipt_service.create(RECEIPT, user_id=user_id)
+    await receipt_service.get_user_receipt_by_id(receipt.id, user_id=user_id)
+
+
+async def run_load(
+    container: AsyncContainer, scenario, user_id: str, concurrency: int, requests: int
+) -> tuple[list[float], float]:
+    timings = []
+
+    async def worker():
+        for _ in range(requests):
+            # One request scope per call, like the web app
+            async with container() as request_container:
+                receipt_service = await request_container.get(ReceiptService)
+                started_at = time.perf_counter()
+                await scenario(receipt_service, user_id)
+                timings.append((time.perf_counter() - started_at) * 1000)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, time.perf_counter() - started_at
+
+
+async def run(concurrency: int, requests: int) -> None:
+    container = make_container()
+
+    async with benchmark_user(container) as user:
+        # warm up the pool
+        await run_load(container, create, user.id, concurrency, 2)
+
+        for name, scenario in (
+            ("create + re-select (previous)", create_and_reselect),
+            ("create with RETURNING", create),
+        ):
+            timings, elapsed = await run_load(
+                container, scenario, user.id, concurrency, requests
+            )
+            print(format_summary(name, timings), f"  {len(timings) / elapsed:.0f} rps")
+
+    await container.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100, help="per worker")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Compare ORM-hydrated receipt reads with Postgres-side JSON assembly.
+
+Usage: poetry run python -m benchmarks.receipt_reads [--iterations 50]
+"""
+
+import argparse
+import asyncio
+from decimal import Decimal
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ulid import ULID
+
+from benchmarks.common import make_container, benchmark_user, measure, format_summary
+from checkbox.database.models import Receipt, ReceiptProduct
+from checkbox.database.models.receipt import PaymentType
+from checkbox.dto.generic import OffsetResponse
+from checkbox.dto.receipt import ReceiptDto
+from checkbox.services.receipt_service import ReceiptService
+
+PRODUCTS_PER_RECEIPT = (10, 100, 1000)
+RECEIPTS_PER_PAGE = 20
+
+
+async def seed_receipts(
+    session: AsyncSession, user_id: str, receipts: int, products: int
+) -> list[str]:
+    receipt_ids = [str(ULID()) for _ in range(receipts)]
+    await session.execute(
+        insert(Receipt),
+        [
+            {
+                "id": receipt_id,
+                "user_id": user_id,
+                "payment_type": PaymentType.CARD,
+                "payment_amount": Decimal("10.00") * products,
+                "total": Decimal("10.00") * products,
+                "rest": Decimal("0.00"),
+            }
+            for receipt_id in receipt_ids
+        ],
+    )
+    await session.execute(
+        insert(ReceiptProduct),
+        [
+            {
+                "id": str(ULID()),
+                "receipt_id": receipt_id,
+                "name": f"Product {i}",
+                "price": Decimal("5.00"),
+                "quantity": 2,
+                "total": Decimal("10.00"),
+            }
+            for receipt_id in receipt_ids
+            for i in range(products)
+        ],
+    )
+    await session.commit()
+    return receipt_ids
+
+
+async def run(iterations: int) -> None:
+    container = make_container()
+    list_adapter = TypeAdapter(OffsetResponse[ReceiptDto])
+
+    for products in PRODUCTS_PER_RECEIPT:
+        async with benchmark_user(container) as user:
+            async with container() as request_container:
+                session = await request_container.get(AsyncSession)
+                receipt_service = await request_container.get(ReceiptService)
+                receipt_ids = await seed_receipts(
+                    session, user.id, RECEIPTS_PER_PAGE, products
+                )
+
+                async def orm_by_id():
+                    receipt = await receipt_service.get_user_receipt_by_id(
+                        receipt_ids[0], user.id
+                    )
+                    # What FastAPI does with the returned model
+                    return receipt.model_dump_json().encode()
+
+                async def json_by_id():
+                    return await receipt_service.get_user_receipt_by_id_json(
+                        receipt_ids[0], user.id
+                    )
+
+                list_params = dict(
+                    user_id=user.id,
+                    start_date=None,
+                    end_date=None,
+                    payment_type=None,
+                    min_total=None,
+                    offset=0,
+                    limit=RECEIPTS_PER_PAGE,
+                )
+
+                async def orm_list():
+                    page = await receipt_service.get_user_receipts(**list_params)
+                    return list_adapter.dump_json(page)
+
+                async def json_list():
+                    return await receipt_service.get_user_receipts_json(**list_params)
+
+                print(f"--- {products} products per receipt")
+                for name, func in (
+                    ("by id / ORM + pydantic", orm_by_id),
+                    ("by id / Postgres JSON", json_by_id),
+                    (f"list of {RECEIPTS_PER_PAGE} / ORM + pydantic", orm_list),
+                    (f"list of {RECEIPTS_PER_PAGE} / Postgres JSON", json_list),
+                ):
+                    session.expunge_all()
+                    timings = await measure(func, iterations)
+                    print(format_summary(name, timings))
+
+    await container.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compare receipt response serialization paths on 1k receipts x 20 products.
+
+Usage: poetry run python -m benchmarks.receipt_serialization [--iterations 20]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, UTC
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from benchmarks.common import measure, format_summary
+from checkbox.database.models import Receipt, ReceiptProduct
+from checkbox.database.models.base import generate_sequential_ids
+from checkbox.database.models.receipt import PaymentType
+from checkbox.dto.receipt import (
+    ReceiptDto,
+    ReceiptBatchItemDto,
+    ReceiptBatchResultDto,
+)
+from checkbox.services.receipt_service import (
+    RECEIPTS_ADAPTER,
+    dump_receipt_batch_json,
+)
+
+RECEIPTS_COUNT = 1000
+PRODUCTS_PER_RECEIPT = 20
+
+
+def build_receipts() -> list[Receipt]:
+    created_at = datetime.now(UTC)
+    return [
+        Receipt(
+            id=receipt_id,
+            user_id=receipt_id,
+            products=[
+                ReceiptProduct(
+                    id=product_id,
+                    name=f"Product {i}",
+                    price=Decimal("5.00"),
+                    quantity=2,
+                    total=Decimal("10.00"),
+                )
+                for i, product_id in enumerate(
+                    generate_sequential_ids(PRODUCTS_PER_RECEIPT)
+                )
+            ],
+            payment_type=PaymentType.CARD,
+            payment_amount=Decimal("200.00"),
+            total=Decimal("200.00"),
+            rest=Decimal("0.00"),
+            created_at=created_at,
+        )
+        for receipt_id in generate_sequential_ids(RECEIPTS_COUNT)
+    ]
+
+
+async def run(iterations: int) -> None:
+    receipts = build_receipts()
+    indexed_receipts = list(enumerate(receipts))
+    # What FastAPI builds for a `-> ReceiptBatchResultDto` return annotation
+    response_field = create_model_field(
+        name="Response", type_=ReceiptBatchResultDto, mode="serialization"
+    )
+
+    async def batch_dto_and_response_model():
+        result = ReceiptBatchResultDto(
+            created=len(receipts),
+            failed=0,
+            items=[
+                ReceiptBatchItemDto(index=i, receipt=ReceiptDto.model_validate(r))
+                for i, r in indexed_receipts
+            ],
+        )
+        content = await serialize_response(
+            field=response_field, response_content=result
+        )
+        return JSONResponse(content).body
+
+    async def batch_orjson():
+        return dump_receipt_batch_json(indexed_receipts, [])
+
+    async def list_new_adapter():
+        return TypeAdapter(list[ReceiptDto]).validate_python(receipts)
+
+    async def list_cached_adapter():
+        return RECEIPTS_ADAPTER.validate_python(receipts)
+
+    print(f"--- {RECEIPTS_COUNT} receipts x {PRODUCTS_PER_RECEIPT} products")
+    for name, func in (
+        ("batch / DTO + response_model", batch_dto_and_response_model),
+        ("batch / orjson from ORM", batch_orjson),
+        ("list / TypeAdapter per call", list_new_adapter),
+        ("list / cached TypeAdapter", list_cached_adapter),
+    ):
+        timings = await measure(func, iterations)
+        print(format_summary(name, timings))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
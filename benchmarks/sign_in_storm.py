@@ -0,0 +1,102 @@
+"""Receipt endpoint latency during a sign-in storm.
+
+Runs the app in-process (one event loop, like a single uvicorn worker) and
+measures `GET /receipts` while concurrent clients keep signing in, once with
+bcrypt on the event loop and once with each configured password executor.
+
+Usage: poetry run python -m benchmarks.sign_in_storm [--sign-in-clients 20]
+"""
+
+import argparse
+import asyncio
+import time
+
+from httpx import AsyncClient, ASGITransport
+from ulid import ULID
+
+from benchmarks.common import format_summary
+from checkbox.config import Settings
+from checkbox.web.main import create_app
+
+EXECUTORS = ("inline", "thread", "process")
+
+
+async def run_scenario(executor: str, sign_in_clients: int, requests: int) -> None:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    settings.password_hashing.EXECUTOR = executor
+    app = create_app(settings)
+
+    credentials = {
+        "email": f"benchmark_{ULID()}@example.com",
+        "password": "benchmark",
+    }
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+        response = await client.post("/users/sign-up", json=credentials)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await client.post(
+            "/receipts",
+            json={
+                "products": [{"name": "Product", "price": "1.00", "quantity": 1}],
+                "payment": {"type": "CASH", "amount": "1.00"},
+            },
+            headers=headers,
+        )
+
+        async def measure_receipts() -> list[float]:
+            timings = []
+
+            for _ in range(requests):
+                started_at = time.perf_counter()
+                await client.get("/receipts", headers=headers)
+                timings.append((time.perf_counter() - started_at) * 1000)
+                await asyncio.sleep(0.005)
+
+            return timings
+
+        print(format_summary(f"[{executor}] receipts, idle", await measure_receipts()))
+
+        sign_ins = 0
+        stop = asyncio.Event()
+
+        async def sign_in_loop():
+            nonlocal sign_ins
+
+            while not stop.is_set():
+                await client.post("/users/sign-in", json=credentials)
+                sign_ins += 1
+
+        storm = [asyncio.create_task(sign_in_loop()) for _ in range(sign_in_clients)]
+        started_at = time.perf_counter()
+        timings = await measure_receipts()
+        elapsed = time.perf_counter() - started_at
+        stop.set()
+        await asyncio.gather(*storm)
+
+        print(
+            format_summary(f"[{executor}] receipts, sign-in storm", timings),
+            f"  {sign_ins / elapsed:.0f} sign-ins/s",
+        )
+
+    await app.state.dishka_container.close()
+
+
+async def run(sign_in_clients: int, requests: int, executors: list[str]) -> None:
+    for executor in executors:
+        await run_scenario(executor, sign_in_clients, requests)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sign-in-clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--executors", nargs="+", default=EXECUTORS, choices=EXECUTORS)
+    args = parser.parse_args()
+    asyncio.run(run(args.sign_in_clients, args.requests, args.executors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import bisect
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from ulid import ULID
+
+# Receipts moved out of the database live in immutable segment files, one or
+# more per month of `created_at`. Segment file layout:
+#   blocks  - zlib-compressed runs of records (receipt JSON documents)
+#   index   - fixed-size entries sorted by receipt id, see `INDEX_ENTRY`
+#   footer  - magic, index offset, entries count
+SEGMENT_SUFFIX = ".cbxseg"
+SEGMENT_MAGIC = b"CBXSEG01"
+FOOTER = struct.Struct("<8sQQ")
+# receipt id, user id, block offset, block length, record offset, record length
+INDEX_ENTRY = struct.Struct("<26s26sQIII")
+ID_SIZE = 26
+
+# Uncompressed bytes per block: a lookup decompresses one block
+BLOCK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ArchivedReceipt:
+    user_id: str
+    # The receipt in the `ReceiptDto` JSON shape
+    json: bytes
+
+
+class SegmentWriter:
+    """Writes a segment file, made visible by an atomic rename on `close()`."""
+
+    def __init__(self, path: Path, compression_level: int = 6) -> None:
+        self.path = path
+        self.compression_level = compression_level
+        self.entries_count = 0
+        self._tmp_path = path.with_name(f".{path.name}.tmp")
+        self._file = open(self._tmp_path, "wb")
+        self._offset = 0
+        self._block: list[bytes] = []
+        self._block_size = 0
+        # (receipt id, user id, record offset, record length) of the current block
+        self._block_entries: list[tuple[bytes, bytes, int, int]] = []
+        self._index: list[tuple[bytes, bytes, int, int, int, int]] = []
+
+    def add(self, receipt_id: str, user_id: str, receipt_json: bytes) -> None:
+        self._block_entries.append(
+            (
+                _pack_id(receipt_id),
+                _pack_id(user_id),
+                self._block_size,
+                len(receipt_json),
+            )
+        )
+        self._block.append(receipt_json)
+        self._block_size += len(receipt_json)
+        self.entries_count += 1
+
+        if self._block_size >= BLOCK_SIZE:
+            self._flush_block()
+
+    def close(self) -> None:
+        self._flush_block()
+        self._index.sort()
+        index_offset = self._offset
+
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+
+        self._file.write(FOOTER.pack(SEGMENT_MAGIC, index_offset, len(self._index)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def _flush_block(self) -> None:
+        if not self._block:
+            return
+
+        compressed = zlib.compress(b"".join(self._block), self.compression_level)
+        self._file.write(compressed)
+
+        for receipt_id, user_id, record_offset, record_length in self._block_entries:
+            self._index.append(
+                (
+                    receipt_id,
+                    user_id,
+                    self._offset,
+                    len(compressed),
+                    record_offset,
+                    record_length,
+                )
+            )
+
+        self._offset += len(compressed)
+        self._block, self._block_size, self._block_entries = [], 0, []
+
+
+class Segment:
+    """A read-only memory-mapped segment, looked up by binary search of its index."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._index_offset, self.entries_count = FOOTER.unpack_from(
+            self._mmap, len(self._mmap) - FOOTER.size
+        )
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a receipts archive segment")
+
+    def __len__(self) -> int:
+        return self.entries_count
+
+    def __getitem__(self, position: int) -> bytes:
+        # The receipt id of an index entry, for `bisect`
+        offset = self._index_offset + position * INDEX_ENTRY.size
+        return self._mmap[offset : offset + ID_SIZE]
+
+    def get(self, receipt_id: str) -> ArchivedReceipt | None:
+        entry = self._find(receipt_id)
+        if entry is None:
+            return None
+
+        _, user_id, block_offset, block_length, record_offset, record_length = entry
+        block = zlib.decompress(self._mmap[block_offset : block_offset + block_length])
+        return ArchivedReceipt(
+            user_id=user_id.rstrip(b"\0").decode(),
+            json=block[record_offset : record_offset + record_length],
+        )
+
+    def get_user_id(self, receipt_id: str) -> str | None:
+        # Reads the index entry only, without decompressing the receipt
+        entry = self._find(receipt_id)
+        if entry is None:
+            return None
+        return entry[1].rstrip(b"\0").decode()
+
+    def _find(self, receipt_id: str) -> tuple | None:
+        if len(receipt_id.encode()) > ID_SIZE:
+            # Never written by `SegmentWriter`, e.g. a malformed id from a URL
+            return None
+
+        key = _pack_id(receipt_id)
+        position = bisect.bisect_left(self, key)
+
+        if position == self.entries_count or self[position] != key:
+            return None
+
+        return INDEX_ENTRY.unpack_from(
+            self._mmap, self._index_offset + position * INDEX_ENTRY.size
+        )
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class ReceiptArchive:
+    """Segment files of archived receipts in a directory.
+
+    Segments written by the archiver are picked up when the directory changes.
+    Lookups block on reading the memory-mapped files, which takes well under
+    a millisecond once the index pages are cached.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.segments: dict[str, Segment] = {}
+        self._names: list[str] = []
+        self._directory_mtime: float | None = None
+
+    def get(self, receipt_id: str) -> ArchivedReceipt | None:
+        self._refresh()
+
+        for segment in self._segments_by_likelihood(receipt_id):
+            archived_receipt = segment.get(receipt_id)
+            if archived_receipt is not None:
+                return archived_receipt
+
+        return None
+
+    def get_user_id(self, receipt_id: str) -> str | None:
+        self._refresh()
+
+        for segment in self._segments_by_likelihood(receipt_id):
+            user_id = segment.get_user_id(receipt_id)
+            if user_id is not None:
+                return user_id
+
+        return None
+
+    def new_segment_path(self, month: date) -> Path:
+        # Never overwrites a segment, even if a month is archived again
+        return self.directory / f"{month:%Y%m}-{ULID()}{SEGMENT_SUFFIX}"
+
+    def close(self) -> None:
+        for segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
+        self._names.clear()
+        self._directory_mtime = None
+
+    def _refresh(self) -> None:
+        try:
+            directory_mtime = self.directory.stat().st_mtime
+        except FileNotFoundError:
+            return
+
+        if directory_mtime == self._directory_mtime:
+            return
+
+        self._directory_mtime = directory_mtime
+        for path in self.directory.glob(f"*{SEGMENT_SUFFIX}"):
+            name = path.name.removesuffix(SEGMENT_SUFFIX)
+            if name not in self.segments:
+                self.segments[name] = Segment(path)
+                bisect.insort(self._names, name)
+
+    def _segments_by_likelihood(self, receipt_id: str) -> list[Segment]:
+        # Receipt ids are ULIDs of about the creation time, so the segments of
+        # the id's month go first, then the later and the earlier ones
+        start = 0
+        try:
+            start = bisect.bisect_left(
+                self._names, f"{ULID.from_str(receipt_id).datetime:%Y%m}"
+            )
+        except ValueError:
+            pass
+
+        return [
+            self.segments[name] for name in self._names[start:] + self._names[:start]
+        ]
+
+
+def _pack_id(value: str) -> bytes:
+    packed = value.encode()
+    if len(packed) > ID_SIZE:
+        raise ValueError(f"Id {value!r} is longer than {ID_SIZE} bytes")
+    return packed.ljust(ID_SIZE, b"\0")
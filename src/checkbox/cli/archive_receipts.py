@@ -0,0 +1,75 @@
+"""Move receipts older than ARCHIVE__MIN_AGE_DAYS to archive segment files.
+
+poetry run python -m checkbox.cli.archive_receipts [--min-age-days 365] [--lock-timeout-ms 5000]
+
+Archives whole months: a month is archived once all of its receipts are old
+enough, then its partitions are dropped. Archived receipts are still served by
+`GET /receipts/{id}` and the plaintext endpoint, but no longer listed, exported
+or deleted along with their user.
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, UTC, timedelta
+
+from dishka import make_async_container
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from checkbox.config import Settings
+from checkbox.database.partitions import add_months, get_partition_months
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.services.receipt_service import ReceiptService
+
+
+async def archive(args: argparse.Namespace) -> None:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    container = make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: settings}
+    )
+    min_age_days = args.min_age_days or settings.archive.MIN_AGE_DAYS
+    cutoff = (datetime.now(UTC) - timedelta(days=min_age_days)).date()
+
+    try:
+        engine = await container.get(AsyncEngine)
+        async with engine.connect() as connection:
+            months = [
+                month
+                for month in await get_partition_months(connection)
+                if add_months(month, 1) <= cutoff
+            ]
+
+        if not months:
+            print(f"No months of receipts ending before {cutoff} to archive")
+
+        for month in months:
+            started_at = time.perf_counter()
+
+            async with container() as request_container:
+                receipt_service = await request_container.get(ReceiptService)
+                archived_count = await receipt_service.archive_month(
+                    month, lock_timeout_ms=args.lock_timeout_ms
+                )
+
+            print(
+                f"Archived {archived_count} receipts of {month:%Y-%m}"
+                f" in {time.perf_counter() - started_at:.1f} s"
+            )
+    finally:
+        await container.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--min-age-days", type=int, help="defaults to ARCHIVE__MIN_AGE_DAYS"
+    )
+    parser.add_argument("--lock-timeout-ms", type=int, default=5000)
+    asyncio.run(archive(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Rebuild `daily_receipt_summaries` from the `receipts` table.
+
+poetry run python -m checkbox.cli.backfill_daily_summaries [--user-id ID]
+"""
+
+import argparse
+import asyncio
+
+from dishka import make_async_container
+
+from checkbox.config import Settings
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.services.report_service import ReportService
+
+
+async def backfill(user_id: str | None) -> int:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    container = make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: settings}
+    )
+
+    try:
+        async with container() as request_container:
+            report_service = await request_container.get(ReportService)
+            return await report_service.rebuild_daily_summaries(user_id=user_id)
+    finally:
+        await container.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", help="Only rebuild the summaries of this user")
+    args = parser.parse_args()
+
+    summaries_count = asyncio.run(backfill(args.user_id))
+    print(f"Rebuilt {summaries_count} daily summaries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Manage monthly partitions of `receipts` and `receipt_products`.
+
+poetry run python -m checkbox.cli.partitions create [--months-ahead 3] [--from 2024-01-01]
+poetry run python -m checkbox.cli.partitions detach --before 2024-01-01 [--drop]
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+from dishka import make_async_container
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from checkbox.config import Settings
+from checkbox.database.partitions import (
+    create_monthly_partitions,
+    create_future_partitions,
+    detach_partitions,
+    partition_name,
+    RECEIPTS_TABLE,
+    PRODUCTS_TABLE,
+)
+from checkbox.di import MainProvider
+
+
+async def run(args: argparse.Namespace) -> None:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    container = make_async_container(MainProvider(), context={Settings: settings})
+
+    try:
+        engine = await container.get(AsyncEngine)
+
+        async with engine.begin() as connection:
+            if args.command == "create":
+                created = await create_future_partitions(connection, args.months_ahead)
+                if args.from_day:
+                    created += await create_monthly_partitions(
+                        connection, args.from_day, date.today()
+                    )
+                print(f"Created partitions for: {_format_months(created)}")
+                return
+
+            detached = await detach_partitions(
+                connection, before=args.before, lock_timeout_ms=args.lock_timeout_ms
+            )
+            print(f"Detached partitions of: {_format_months(detached)}")
+
+            if args.drop:
+                for month in detached:
+                    for table in (PRODUCTS_TABLE, RECEIPTS_TABLE):
+                        await connection.execute(
+                            text(f"DROP TABLE {partition_name(table, month)}")
+                        )
+                print("Dropped the detached partitions")
+    finally:
+        await container.close()
+
+
+def _format_months(months: list[date]) -> str:
+    return ", ".join(f"{month:%Y-%m}" for month in months) or "none"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = commands.add_parser(
+        "create", help="Create the missing monthly partitions"
+    )
+    create_parser.add_argument("--months-ahead", type=int, default=3)
+    create_parser.add_argument(
+        "--from",
+        dest="from_day",
+        type=date.fromisoformat,
+        help="Also create partitions for past months since this day",
+    )
+
+    detach_parser = commands.add_parser(
+        "detach", help="Detach the partitions of months that end before a day"
+    )
+    detach_parser.add_argument("--before", type=date.fromisoformat, required=True)
+    detach_parser.add_argument("--lock-timeout-ms", type=int, default=5000)
+    detach_parser.add_argument(
+        "--drop", action="store_true", help="Drop the detached partitions"
+    )
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
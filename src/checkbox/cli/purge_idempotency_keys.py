@@ -0,0 +1,38 @@
+"""Delete expired idempotency keys of `POST /receipts`.
+
+poetry run python -m checkbox.cli.purge_idempotency_keys
+"""
+
+import argparse
+import asyncio
+
+from dishka import make_async_container
+
+from checkbox.config import Settings
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.services.receipt_service import ReceiptService
+
+
+async def purge() -> int:
+    settings = Settings()
+    container = make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: settings}
+    )
+
+    try:
+        async with container() as request_container:
+            receipt_service = await request_container.get(ReceiptService)
+            return await receipt_service.delete_expired_idempotency_keys()
+    finally:
+        await container.close()
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+
+    deleted_count = asyncio.run(purge())
+    print(f"Deleted {deleted_count} expired idempotency keys")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""Generate synthetic users, receipts and products and bulk-load them with COPY.
+
+poetry run python -m checkbox.cli.seed --users 100000 [--receipts-per-user 30] [--jobs 4] [--seed 0]
+
+The data only depends on `--seed` (not on `--jobs`): receipts per user are
+heavy-tailed (a few users own most receipts), products per receipt and prices
+are skewed towards small values, timestamps are spread over `--years`. Users
+are `seed<seed>_<n>@example.com` with the password given by `--password`.
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from decimal import Decimal
+
+import asyncpg
+from dishka import make_async_container
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from ulid import ULID
+
+from checkbox.config import Settings, PostgresSettings
+from checkbox.database.partitions import create_monthly_partitions
+from checkbox.database.models.receipt import PaymentType
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.services.password import PasswordHasher
+from checkbox.services.report_service import ReportService
+
+USERS_PER_CHUNK = 1000
+# Pareto shape of receipts per user, the top 20% of users own ~80% of receipts
+RECEIPTS_PARETO_ALPHA = 1.5
+QUANTITIES = (1, 2, 3, 4, 5, 10)
+QUANTITY_WEIGHTS = (70, 14, 6, 4, 4, 2)
+# Cash payments are rounded up to a banknote, in cents
+CASH_ROUNDING = (1, 100, 1000, 5000, 10000, 20000, 50000)
+CASH_ROUNDING_WEIGHTS = (10, 15, 20, 20, 20, 10, 5)
+
+PRODUCT_NAMES = tuple(
+    f"{kind} {variant}"
+    for kind in (
+        "Milk",
+        "Bread",
+        "Coffee",
+        "Tea",
+        "Cheese",
+        "Apples",
+        "Water",
+        "Juice",
+        "Chocolate",
+        "Pasta",
+        "Rice",
+        "Eggs",
+        "Butter",
+        "Yogurt",
+        "Soap",
+        "Shampoo",
+        "Batteries",
+        "Notebook",
+        "Pen",
+        "Charger",
+    )
+    for variant in ("Classic", "Premium", "Organic", "Mini", "Family pack")
+)
+
+USER_COLUMNS = ("id", "email", "password", "created_at", "updated_at")
+RECEIPT_COLUMNS = (
+    "id",
+    "user_id",
+    "total",
+    "payment_type",
+    "payment_amount",
+    "rest",
+    "created_at",
+    "updated_at",
+)
+PRODUCT_COLUMNS = (
+    "id",
+    "receipt_id",
+    "receipt_created_at",
+    "name",
+    "price",
+    "quantity",
+    "total",
+    "created_at",
+    "updated_at",
+)
+
+
+@dataclass(frozen=True)
+class SeedOptions:
+    users: int
+    receipts_per_user: float
+    products_per_receipt: float
+    card_share: float
+    years: float
+    seed: int
+    password_hash: str
+    # The same for all jobs, timestamps are spread over `years` before it
+    now: float
+
+
+@dataclass
+class SeedCounts:
+    users: int = 0
+    receipts: int = 0
+    products: int = 0
+
+    def __add__(self, other: "SeedCounts") -> "SeedCounts":
+        return SeedCounts(
+            users=self.users + other.users,
+            receipts=self.receipts + other.receipts,
+            products=self.products + other.products,
+        )
+
+
+def generate_chunk(
+    options: SeedOptions, first_user: int, last_user: int
+) -> tuple[list[tuple], list[tuple], list[tuple]]:
+    users, receipts, products = [], [], []
+    period = options.years * 365 * 24 * 60 * 60
+    # Pareto(alpha) - 1 starts at 0 and has mean 1 / (alpha - 1)
+    receipts_scale = options.receipts_per_user * (RECEIPTS_PARETO_ALPHA - 1)
+    max_receipts = int(options.receipts_per_user * 100)
+
+    for user_index in range(first_user, last_user):
+        # One generator per user keeps the data independent of the jobs count
+        rng = random.Random(f"{options.seed}:{user_index}")
+        user_created_at = options.now - period - rng.random() * 30 * 24 * 60 * 60
+        user_id = _seeded_ulid(user_created_at, rng)
+        users.append(
+            (
+                user_id,
+                f"seed{options.seed}_{user_index}@example.com",
+                options.password_hash,
+                _to_datetime(user_created_at),
+                _to_datetime(user_created_at),
+            )
+        )
+
+        receipts_count = min(
+            int((rng.paretovariate(RECEIPTS_PARETO_ALPHA) - 1) * receipts_scale),
+            max_receipts,
+        )
+
+        for _ in range(receipts_count):
+            created_at = options.now - rng.random() * period
+            receipt_created_at = _to_datetime(created_at)
+            receipt_id = _seeded_ulid(created_at, rng)
+            products_count = 1 + int(
+                rng.expovariate(1 / max(options.products_per_receipt - 1, 0.01))
+            )
+            # Sequential ids keep the products in insertion order
+            first_product_id = int(ULID.from_str(_seeded_ulid(created_at, rng)))
+            total_cents = 0
+
+            for product_index in range(min(products_count, 100)):
+                price_cents = max(100, int(rng.lognormvariate(math.log(5000), 1)))
+                price_cents = min(price_cents, 10_000_00)
+                quantity = rng.choices(QUANTITIES, weights=QUANTITY_WEIGHTS)[0]
+                product_total_cents = price_cents * quantity
+                total_cents += product_total_cents
+                products.append(
+                    (
+                        str(ULID.from_int(first_product_id + product_index)),
+                        receipt_id,
+                        receipt_created_at,
+                        rng.choice(PRODUCT_NAMES),
+                        _to_money(price_cents),
+                        quantity,
+                        _to_money(product_total_cents),
+                        receipt_created_at,
+                        receipt_created_at,
+                    )
+                )
+
+            if rng.random() < options.card_share:
+                payment_type = PaymentType.CARD
+                payment_cents = total_cents
+            else:
+                payment_type = PaymentType.CASH
+                rounding = rng.choices(CASH_ROUNDING, weights=CASH_ROUNDING_WEIGHTS)[0]
+                payment_cents = math.ceil(total_cents / rounding) * rounding
+
+            receipts.append(
+                (
+                    receipt_id,
+                    user_id,
+                    _to_money(total_cents),
+                    payment_type.value,
+                    _to_money(payment_cents),
+                    _to_money(payment_cents - total_cents),
+                    receipt_created_at,
+                    receipt_created_at,
+                )
+            )
+
+    return users, receipts, products
+
+
+async def load_chunks(
+    options: SeedOptions, postgres: PostgresSettings, job_index: int, jobs: int
+) -> SeedCounts:
+    counts = SeedCounts()
+    connection = await asyncpg.connect(
+        user=postgres.USER,
+        password=postgres.PASSWORD,
+        host=postgres.HOST,
+        port=postgres.PORT,
+        database=postgres.DATABASE,
+    )
+
+    try:
+        for first_user in range(
+            job_index * USERS_PER_CHUNK, options.users, jobs * USERS_PER_CHUNK
+        ):
+            last_user = min(first_user + USERS_PER_CHUNK, options.users)
+            users, receipts, products = generate_chunk(options, first_user, last_user)
+
+            # A chunk per transaction: rows reference their parents in the same chunk
+            async with connection.transaction():
+                await connection.copy_records_to_table(
+                    "users", records=users, columns=USER_COLUMNS
+                )
+                await connection.copy_records_to_table(
+                    "receipts", records=receipts, columns=RECEIPT_COLUMNS
+                )
+                await connection.copy_records_to_table(
+                    "receipt_products", records=products, columns=PRODUCT_COLUMNS
+                )
+
+            counts += SeedCounts(len(users), len(receipts), len(products))
+    finally:
+        await connection.close()
+
+    return counts
+
+
+def run_job(
+    options: SeedOptions, postgres: PostgresSettings, job_index: int, jobs: int
+) -> SeedCounts:
+    return asyncio.run(load_chunks(options, postgres, job_index, jobs))
+
+
+async def seed(args: argparse.Namespace) -> None:
+    settings = Settings()
+    settings.sqlalchemy.ECHO = False
+    container = make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: settings}
+    )
+
+    try:
+        # A single hash for all users, bcrypt would take longer than the COPY
+        password_hasher = await container.get(PasswordHasher)
+        options = SeedOptions(
+            users=args.users,
+            receipts_per_user=args.receipts_per_user,
+            products_per_receipt=args.products_per_receipt,
+            card_share=args.card_share,
+            years=args.years,
+            seed=args.seed,
+            password_hash=await password_hasher.hash(args.password),
+            now=time.time(),
+        )
+
+        # Rows of months without a partition would pile up in the default one
+        engine = await container.get(AsyncEngine)
+        async with engine.begin() as connection:
+            await create_monthly_partitions(
+                connection,
+                first_month=_to_datetime(
+                    options.now - options.years * 365 * 24 * 60 * 60
+                ).date(),
+                last_month=_to_datetime(options.now).date(),
+            )
+
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            job_counts = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor, run_job, options, settings.postgres, i, args.jobs
+                    )
+                    for i in range(args.jobs)
+                )
+            )
+        counts = sum(job_counts, SeedCounts())
+        elapsed = time.perf_counter() - started_at
+        rows = counts.users + counts.receipts + counts.products
+        print(
+            f"Loaded {counts.users} users, {counts.receipts} receipts and"
+            f" {counts.products} products in {elapsed:.1f} s ({rows / elapsed:.0f} rows/s)"
+        )
+
+        async with container() as request_container:
+            report_service = await request_container.get(ReportService)
+            await report_service.session.execute(
+                text("ANALYZE users, receipts, receipt_products")
+            )
+            if not args.skip_summaries:
+                summaries_count = await report_service.rebuild_daily_summaries()
+                print(f"Rebuilt {summaries_count} daily summaries")
+            else:
+                await report_service.session.commit()
+    finally:
+        await container.close()
+
+
+def _seeded_ulid(timestamp: float, rng: random.Random) -> str:
+    # `ULID.from_timestamp` takes the random part from `os.urandom`
+    return str(ULID.from_int((int(timestamp * 1000) << 80) | rng.getrandbits(80)))
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, UTC)
+
+
+def _to_money(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument(
+        "--receipts-per-user", type=float, default=30, help="mean, heavy-tailed"
+    )
+    parser.add_argument(
+        "--products-per-receipt", type=float, default=4, help="mean, at most 100"
+    )
+    parser.add_argument("--card-share", type=float, default=0.6)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--jobs", type=int, default=4, help="parallel COPY processes")
+    parser.add_argument(
+        "--skip-summaries",
+        action="store_true",
+        help="Don't rebuild daily summaries, see checkbox.cli.backfill_daily_summaries",
+    )
+    args = parser.parse_args()
+    asyncio.run(seed(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 POSTGRES_DSN_TEMPLATE = (
@@ -11,6 +14,11 @@ class PostgresSettings(BaseSettings):
     HOST: str
     PORT: int
     DATABASE: str
+    # DSNs of read-only replicas, the primary serves all reads when empty
+    REPLICA_URLS: list[str] = []
+    REPLICA_SELECTION: Literal["round_robin", "least_busy"] = "round_robin"
+    # After creating receipts, the user's reads go to the primary for this long
+    READ_YOUR_WRITES_SECONDS: float = 5
 
     @property
     def url(self) -> str:
@@ -24,7 +32,55 @@ class PostgresSettings(BaseSettings):
 
 
 class SQLAlchemySettings(BaseSettings):
-    ECHO: bool = True
+    # Logs every statement, only meant for debugging
+    ECHO: bool = False
+    # Per worker process: workers * (POOL_SIZE + MAX_OVERFLOW) must stay
+    # below Postgres `max_connections`, minus connections of other clients
+    POOL_SIZE: int = 10
+    MAX_OVERFLOW: int = 5
+    POOL_TIMEOUT: float = 30
+    POOL_PRE_PING: bool = True
+    # Seconds after which a connection is replaced, -1 to keep connections forever
+    POOL_RECYCLE: int = 1800
+    # Prepared statements per connection, set to 0 behind pgbouncer in transaction mode
+    STATEMENT_CACHE_SIZE: int = 100
+
+
+class PartitionSettings(BaseSettings):
+    # Monthly partitions of receipts are created this far ahead on app startup,
+    # disable it if the app's database user may not create tables
+    CREATE_ON_STARTUP: bool = True
+    MONTHS_AHEAD: int = 3
+
+
+class ArchiveSettings(BaseSettings):
+    # Segment files of archived receipts, shared by all app hosts
+    DIRECTORY: str = "archive"
+    # Months of receipts older than this are moved to the archive as a whole
+    MIN_AGE_DAYS: int = 365
+
+
+class RenderCacheSettings(BaseSettings):
+    # Set MAX_ENTRIES to 0 to disable the cache
+    MAX_ENTRIES: int = 10_000
+    MAX_BYTES: int = 32 * 1024 * 1024
+    TTL_SECONDS: int = 24 * 60 * 60
+
+
+class PlaintextExportSettings(BaseSettings):
+    # Renders receipts for ZIP downloads, "inline" renders on the event loop
+    EXECUTOR: Literal["thread", "process", "inline"] = "process"
+    MAX_WORKERS: int = 2
+    # Receipts fetched and rendered at a time
+    BATCH_SIZE: int = 500
+
+
+class UserCacheSettings(BaseSettings):
+    # Set MAX_ENTRIES to 0 to disable the cache
+    MAX_ENTRIES: int = 10_000
+    # Deleting a user invalidates only the local worker's cache,
+    # other workers keep the user for at most this long
+    TTL_SECONDS: int = 60
 
 
 class AuthSettings(BaseSettings):
@@ -35,9 +91,57 @@ class AuthSettings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_MINUTES: int
 
 
+class PasswordHashingSettings(BaseSettings):
+    # "inline" hashes on the event loop, only meant for tests and comparisons
+    EXECUTOR: Literal["thread", "process", "inline"] = "thread"
+    MAX_WORKERS: int = 4
+
+
+class IdempotencySettings(BaseSettings):
+    # How long a `POST /receipts` response is replayed for a repeated Idempotency-Key
+    TTL_SECONDS: int = 24 * 60 * 60
+
+
+class RateLimitBudget(BaseModel):
+    # Requests per second on average and in a burst
+    RATE: float
+    BURST: int
+
+
+class RateLimitSettings(BaseSettings):
+    ENABLED: bool = True
+    # Buckets are per user, or per client address for routes without auth
+    DEFAULT: RateLimitBudget = RateLimitBudget(RATE=20, BURST=100)
+    # Budgets of expensive routes, keyed by the method and the path template
+    ROUTES: dict[str, RateLimitBudget] = {
+        "POST /users/sign-up": RateLimitBudget(RATE=0.1, BURST=5),
+        "POST /users/sign-in": RateLimitBudget(RATE=0.5, BURST=10),
+        "POST /users/refresh-tokens": RateLimitBudget(RATE=0.5, BURST=10),
+        "POST /receipts/batch": RateLimitBudget(RATE=1, BURST=10),
+        "GET /receipts/export": RateLimitBudget(RATE=0.1, BURST=3),
+        "POST /receipts/plaintext/zip": RateLimitBudget(RATE=0.1, BURST=3),
+    }
+    # Buckets kept by each worker process
+    MAX_BUCKETS: int = 100_000
+
+
+class MetricsSettings(BaseSettings):
+    # Client addresses allowed to scrape `/metrics`
+    ALLOWED_CLIENTS: list[str] = ["127.0.0.1", "::1"]
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_nested_delimiter="__")
 
     postgres: PostgresSettings
     sqlalchemy: SQLAlchemySettings
     auth: AuthSettings
+    partitions: PartitionSettings = PartitionSettings()
+    archive: ArchiveSettings = ArchiveSettings()
+    render_cache: RenderCacheSettings = RenderCacheSettings()
+    plaintext_export: PlaintextExportSettings = PlaintextExportSettings()
+    user_cache: UserCacheSettings = UserCacheSettings()
+    password_hashing: PasswordHashingSettings = PasswordHashingSettings()
+    idempotency: IdempotencySettings = IdempotencySettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    metrics: MetricsSettings = MetricsSettings()
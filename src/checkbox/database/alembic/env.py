@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 
 from checkbox.config import Settings
 from checkbox.database.models import Base
+from checkbox.database.partitions import PARTITION_TABLE_RE
 
 settings = Settings()
 
@@ -34,6 +35,13 @@ target_metadata = Base.metadata
 config.set_main_option("sqlalchemy.url", settings.postgres.url)
 
 
+def include_name(name, type_, parent_names):
+    # Monthly partitions are managed by `checkbox.database.partitions`
+    if type_ == "table":
+        return not PARTITION_TABLE_RE.match(name)
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -49,6 +57,7 @@ def run_migrations_offline():
     context.configure(
         url=config.get_main_option("sqlachemy.url"),
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -59,7 +68,9 @@ def run_migrations_offline():
 
 def do_run_migrations(connection):
     context.configure(
-        connection=connection, target_metadata=target_metadata
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,43 @@
+"""daily receipt summaries
+
+Revision ID: 3f9c2a7d41e8
+Revises: be5d2fa483ce
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f9c2a7d41e8"
+down_revision = "be5d2fa483ce"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_receipt_summaries",
+        sa.Column("user_id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column(
+            "payment_type",
+            postgresql.ENUM("CASH", "CARD", name="paymenttype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("receipts_count", sa.Integer(), nullable=False),
+        sa.Column("total", sa.DECIMAL(precision=16, scale=2), nullable=False),
+        sa.Column("payment_amount", sa.DECIMAL(precision=16, scale=2), nullable=False),
+        sa.Column("rest", sa.DECIMAL(precision=16, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], onupdate="cascade", ondelete="cascade"
+        ),
+        sa.PrimaryKeyConstraint("user_id", "day", "payment_type"),
+    )
+    # Existing receipts are summarized with `python -m checkbox.cli.backfill_daily_summaries`
+
+
+def downgrade():
+    op.drop_table("daily_receipt_summaries")
@@ -0,0 +1,42 @@
+"""receipt indexes
+
+Revision ID: 8b1e5d0c93a2
+Revises: 3f9c2a7d41e8
+Create Date: 2026-10-18 11:40:02.532817
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8b1e5d0c93a2"
+down_revision = "3f9c2a7d41e8"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_receipts_user_id_created_at_id", "receipts", ["user_id", "created_at", "id"]),
+    (
+        "ix_receipts_user_id_payment_type_created_at",
+        "receipts",
+        ["user_id", "payment_type", "created_at"],
+    ),
+    ("ix_receipts_user_id_total", "receipts", ["user_id", "total"]),
+    ("ix_receipt_products_receipt_id_id", "receipt_products", ["receipt_id", "id"]),
+)
+
+
+def upgrade():
+    # CONCURRENTLY doesn't block writes to the tables, but can't run in a transaction.
+    # If a build fails, it leaves an INVALID index that must be dropped before retrying.
+    with op.get_context().autocommit_block():
+        for index_name, table_name, columns in INDEXES:
+            op.create_index(
+                index_name, table_name, columns, postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(INDEXES):
+            op.drop_index(index_name, table_name, postgresql_concurrently=True)
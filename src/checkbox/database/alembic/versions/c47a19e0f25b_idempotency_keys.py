@@ -0,0 +1,42 @@
+"""idempotency keys
+
+Revision ID: c47a19e0f25b
+Revises: 8b1e5d0c93a2
+Create Date: 2026-10-18 14:03:51.270418
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c47a19e0f25b"
+down_revision = "8b1e5d0c93a2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("user_id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("key", sa.VARCHAR(length=255), nullable=False),
+        sa.Column("request_hash", sa.VARCHAR(length=64), nullable=False),
+        sa.Column("receipt_id", sa.VARCHAR(length=26), nullable=True),
+        sa.Column("response", sa.LargeBinary(), nullable=True),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], onupdate="cascade", ondelete="cascade"
+        ),
+        sa.PrimaryKeyConstraint("user_id", "key"),
+    )
+    op.create_index(
+        "ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,214 @@
+"""partition receipts by month
+
+Revision ID: d5e83b1f6a07
+Revises: c47a19e0f25b
+Create Date: 2026-10-18 16:22:47.081934
+
+Rebuilds `receipts` and `receipt_products` as tables partitioned by month of
+the receipt's `created_at` and copies the rows over, in one transaction: the
+tables are locked until it commits, so run it during a maintenance window.
+
+"""
+
+from datetime import date, datetime, UTC
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "d5e83b1f6a07"
+down_revision = "c47a19e0f25b"
+branch_labels = None
+depends_on = None
+
+# Partitions created in advance, the app creates further ones on startup
+MONTHS_AHEAD = 3
+
+RECEIPTS_INDEXES = (
+    ("ix_receipts_user_id_created_at_id", ["user_id", "created_at", "id"]),
+    (
+        "ix_receipts_user_id_payment_type_created_at",
+        ["user_id", "payment_type", "created_at"],
+    ),
+    ("ix_receipts_user_id_total", ["user_id", "total"]),
+)
+PRODUCTS_INDEXES = (("ix_receipt_products_receipt_id_id", ["receipt_id", "id"]),)
+
+RECEIPT_COLUMNS = (
+    "id, user_id, total, payment_type, payment_amount, rest, created_at, updated_at"
+)
+PRODUCT_COLUMNS = "id, receipt_id, name, price, quantity, total, created_at, updated_at"
+
+
+def upgrade():
+    _rename_tables(suffix="_unpartitioned")
+
+    _create_receipts_table(partitioned=True)
+    _create_products_table(partitioned=True)
+
+    first_created_at = op.get_bind().scalar(
+        sa.text("SELECT min(created_at) FROM receipts_unpartitioned")
+    )
+    first_month = (first_created_at or datetime.now(UTC)).astimezone(UTC).date()
+    last_month = _add_months(datetime.now(UTC).date().replace(day=1), MONTHS_AHEAD)
+    month = first_month.replace(day=1)
+
+    while month <= last_month:
+        _create_partitions(month)
+        month = _add_months(month, 1)
+
+    op.execute("CREATE TABLE receipts_default PARTITION OF receipts DEFAULT")
+    op.execute("""
+        CREATE TABLE receipt_products_default PARTITION OF receipt_products (
+            FOREIGN KEY (receipt_id, receipt_created_at)
+            REFERENCES receipts_default (id, created_at)
+            ON DELETE CASCADE ON UPDATE CASCADE
+        ) DEFAULT
+        """)
+
+    op.execute(f"""
+        INSERT INTO receipts ({RECEIPT_COLUMNS})
+        SELECT {RECEIPT_COLUMNS} FROM receipts_unpartitioned
+        """)
+    op.execute(f"""
+        INSERT INTO receipt_products ({PRODUCT_COLUMNS}, receipt_created_at)
+        SELECT {", ".join(f"p.{c}" for c in PRODUCT_COLUMNS.split(", "))},
+               r.created_at
+        FROM receipt_products_unpartitioned p
+        JOIN receipts_unpartitioned r ON r.id = p.receipt_id
+        """)
+
+    # Built after the copy, on each partition
+    _create_indexes()
+
+    op.drop_table("receipt_products_unpartitioned")
+    op.drop_table("receipts_unpartitioned")
+
+
+def downgrade():
+    # Detached partitions are not copied back
+    _rename_tables(suffix="_partitioned")
+
+    _create_receipts_table(partitioned=False)
+    _create_products_table(partitioned=False)
+
+    op.execute(f"""
+        INSERT INTO receipts ({RECEIPT_COLUMNS})
+        SELECT {RECEIPT_COLUMNS} FROM receipts_partitioned
+        """)
+    op.execute(f"""
+        INSERT INTO receipt_products ({PRODUCT_COLUMNS})
+        SELECT {PRODUCT_COLUMNS} FROM receipt_products_partitioned
+        """)
+
+    _create_indexes()
+
+    # Drops the partitions too
+    op.drop_table("receipt_products_partitioned")
+    op.drop_table("receipts_partitioned")
+
+
+def _rename_tables(suffix: str):
+    # Indexes and primary keys would clash with the new tables' ones
+    for index_name, _ in PRODUCTS_INDEXES:
+        op.drop_index(index_name, table_name="receipt_products")
+    for index_name, _ in RECEIPTS_INDEXES:
+        op.drop_index(index_name, table_name="receipts")
+
+    for table_name in ("receipts", "receipt_products"):
+        op.rename_table(table_name, f"{table_name}{suffix}")
+        op.execute(
+            f"ALTER TABLE {table_name}{suffix}"
+            f" RENAME CONSTRAINT {table_name}_pkey TO {table_name}{suffix}_pkey"
+        )
+
+
+def _create_receipts_table(partitioned: bool):
+    # The partition key must be a part of the primary key
+    primary_key = ("id", "created_at") if partitioned else ("id",)
+    op.create_table(
+        "receipts",
+        sa.Column("id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("user_id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("total", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column(
+            "payment_type",
+            postgresql.ENUM("CASH", "CARD", name="paymenttype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("payment_amount", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("rest", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], onupdate="cascade", ondelete="cascade"
+        ),
+        sa.PrimaryKeyConstraint(*primary_key),
+        postgresql_partition_by="RANGE (created_at)" if partitioned else None,
+    )
+
+
+def _create_products_table(partitioned: bool):
+    columns = [
+        sa.Column("id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("receipt_id", sa.VARCHAR(length=26), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("price", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("total", sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    ]
+
+    if partitioned:
+        # The foreign keys are created per partition, see `_create_partitions`
+        columns += [
+            sa.Column(
+                "receipt_created_at", sa.TIMESTAMP(timezone=True), nullable=False
+            ),
+            sa.PrimaryKeyConstraint("id", "receipt_created_at"),
+        ]
+    else:
+        columns += [
+            sa.ForeignKeyConstraint(
+                ["receipt_id"], ["receipts.id"], onupdate="cascade", ondelete="cascade"
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        ]
+
+    op.create_table(
+        "receipt_products",
+        *columns,
+        postgresql_partition_by="RANGE (receipt_created_at)" if partitioned else None,
+    )
+
+
+def _create_partitions(month: date):
+    suffix = f"y{month.year:04}m{month.month:02}"
+    bounds = (
+        f"FROM ('{month.isoformat()} 00:00:00+00')"
+        f" TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+    op.execute(
+        f"CREATE TABLE receipts_{suffix} PARTITION OF receipts FOR VALUES {bounds}"
+    )
+    op.execute(f"""
+        CREATE TABLE receipt_products_{suffix} PARTITION OF receipt_products (
+            FOREIGN KEY (receipt_id, receipt_created_at)
+            REFERENCES receipts_{suffix} (id, created_at)
+            ON DELETE CASCADE ON UPDATE CASCADE
+        ) FOR VALUES {bounds}
+        """)
+
+
+def _create_indexes():
+    for index_name, columns in RECEIPTS_INDEXES:
+        op.create_index(index_name, "receipts", columns)
+    for index_name, columns in PRODUCTS_INDEXES:
+        op.create_index(index_name, "receipt_products", columns)
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
@@ -0,0 +1,54 @@
+"""receipt product name trigram index
+
+Revision ID: e2a9c4f7b815
+Revises: d5e83b1f6a07
+Create Date: 2026-10-18 19:12:36.404127
+
+An index can't be built CONCURRENTLY on a partitioned table: the parent's index
+is created invalid with ON ONLY, each partition's index is built concurrently
+and attached, and the parent's index becomes valid once all are attached.
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e2a9c4f7b815"
+down_revision = "d5e83b1f6a07"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_receipt_products_name_trgm"
+
+
+def upgrade():
+    # Needs a superuser, or a database owner if pg_trgm is a trusted extension
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        f"CREATE INDEX {INDEX_NAME} ON ONLY receipt_products"
+        " USING gin (name gin_trgm_ops)"
+    )
+    result = op.get_bind().execute(
+        sa.text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits"
+            " WHERE inhparent = 'receipt_products'::regclass ORDER BY 1"
+        )
+    )
+    partitions = result.scalars().all()
+
+    # If a build fails, it leaves an INVALID index that must be dropped before retrying
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            # The name Postgres gives the index of partitions created later
+            partition_index = f"{partition}_name_idx"
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index}"
+                f" ON {partition} USING gin (name gin_trgm_ops)"
+            )
+            op.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {partition_index}")
+
+
+def downgrade():
+    # Drops the partitions' indexes too, pg_trgm stays installed
+    op.drop_index(INDEX_NAME, table_name="receipt_products")
@@ -0,0 +1,19 @@
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def copy_records(
+    session: AsyncSession,
+    table: Table,
+    columns: Sequence[str],
+    records: Iterable[Sequence],
+) -> None:
+    # COPY through the session's own connection, so the rows are part of
+    # the session's current transaction.
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table.name, columns=list(columns), records=records
+    )
@@ -2,3 +2,5 @@ from .base import Base
 from .receipt import Receipt
 from .receipt_product import ReceiptProduct
 from .user import User
+from .daily_receipt_summary import DailyReceiptSummary
+from .idempotency_key import IdempotencyKey
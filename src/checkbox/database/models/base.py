@@ -1,5 +1,7 @@
+import os
+import time
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Annotated
 
 from sqlalchemy import TIMESTAMP, VARCHAR, ForeignKey, DECIMAL
@@ -14,9 +16,29 @@ PkColumn = Annotated[
     mapped_column(VARCHAR(26), primary_key=True, default=lambda: str(ULID())),
 ]
 
+# Low bits of ids from `generate_sequential_ids` that count the rows of one call
+SEQUENTIAL_ID_COUNTER_BITS = 32
+
 MoneyColumn = Annotated[Decimal, mapped_column(DECIMAL(10, 2))]
 
 
+def quantize_money(value: Decimal) -> Decimal:
+    # The value Postgres stores in a `MoneyColumn` (numeric rounds half away from zero)
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def generate_sequential_ids(count: int) -> list[str]:
+    # ULIDs created within the same millisecond are not ordered, so rows that must
+    # keep their insertion order (receipt products) get monotonically increasing ids:
+    # the current timestamp, random bits and a counter. `ULID()` is not used as the
+    # base, python-ulid 3+ increments its randomness by one within a millisecond,
+    # so the ranges of two calls would overlap.
+    timestamp_ms = time.time_ns() // 1_000_000
+    randomness = int.from_bytes(os.urandom(10)) >> SEQUENTIAL_ID_COUNTER_BITS
+    first_id = (timestamp_ms << 80) | (randomness << SEQUENTIAL_ID_COUNTER_BITS)
+    return [str(ULID.from_int(first_id + i)) for i in range(count)]
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     pass
 
@@ -0,0 +1,28 @@
+from datetime import date
+from decimal import Decimal
+from typing import Annotated
+
+from sqlalchemy import DECIMAL
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, CascadingForeignKey
+from .receipt import PaymentType
+
+# Sums of `MoneyColumn` values, with room for a day's worth of receipts
+MoneySumColumn = Annotated[Decimal, mapped_column(DECIMAL(16, 2))]
+
+
+class DailyReceiptSummary(Base):
+    # Per user, per Kyiv-local day, per payment type totals of `receipts`,
+    # kept up to date in the same transaction that creates the receipts
+    __tablename__ = "daily_receipt_summaries"
+
+    user_id: Mapped[str] = mapped_column(
+        CascadingForeignKey("users.id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    payment_type: Mapped[PaymentType] = mapped_column(primary_key=True)
+    receipts_count: Mapped[int]
+    total: Mapped[MoneySumColumn]
+    payment_amount: Mapped[MoneySumColumn]
+    rest: Mapped[MoneySumColumn]
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import VARCHAR, TIMESTAMP, LargeBinary, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, CascadingForeignKey
+
+
+class IdempotencyKey(Base, TimestampMixin):
+    # `Idempotency-Key` of a `POST /receipts` request and the response it got
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    user_id: Mapped[str] = mapped_column(
+        CascadingForeignKey("users.id"), primary_key=True
+    )
+    key: Mapped[str] = mapped_column(VARCHAR(255), primary_key=True)
+    # sha256 of the request body, a key can't be reused for a different receipt
+    request_hash: Mapped[str] = mapped_column(VARCHAR(64))
+    # No foreign key: rows go away with the user or on expiry, and an unindexed
+    # reference would slow down deleting receipts
+    receipt_id: Mapped[str | None] = mapped_column(VARCHAR(26))
+    response: Mapped[bytes | None] = mapped_column(LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
@@ -1,5 +1,7 @@
+from datetime import datetime
 from enum import StrEnum
 
+from sqlalchemy import Index, TIMESTAMP, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import (
@@ -10,6 +12,14 @@ from .base import (
     MoneyColumn,
 )
 
+# Products reference the receipt's partition by its `created_at`. The foreign
+# keys exist between the partitions only, so a month can be detached without
+# checking the other table.
+PRODUCTS_JOIN = (
+    "and_(Receipt.id == foreign(ReceiptProduct.receipt_id),"
+    " Receipt.created_at == foreign(ReceiptProduct.receipt_created_at))"
+)
+
 
 class PaymentType(StrEnum):
     CASH = "CASH"
@@ -18,6 +28,22 @@ class PaymentType(StrEnum):
 
 class Receipt(Base, TimestampMixin):
     __tablename__ = "receipts"
+    # Fetch SQL-side defaults (`created_at`) with INSERT ... RETURNING,
+    # so a new receipt is complete right after the flush.
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Listing and keyset pagination (`created_at desc, id desc` is a backward scan)
+        Index("ix_receipts_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index(
+            "ix_receipts_user_id_payment_type_created_at",
+            "user_id",
+            "payment_type",
+            "created_at",
+        ),
+        Index("ix_receipts_user_id_total", "user_id", "total"),
+        # Monthly partitions, see `checkbox.database.partitions`
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[PkColumn]
     user_id: Mapped[str] = mapped_column(CascadingForeignKey("users.id"))
@@ -25,8 +51,15 @@ class Receipt(Base, TimestampMixin):
     payment_type: Mapped[PaymentType]
     payment_amount: Mapped[MoneyColumn]
     rest: Mapped[MoneyColumn]
+    # The partition key must be a part of the primary key
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), primary_key=True, default=func.now()
+    )
 
     user: Mapped["User"] = relationship("User", back_populates="receipts")
     products: Mapped[list["ReceiptProduct"]] = relationship(
-        "ReceiptProduct", back_populates="receipt"
+        "ReceiptProduct",
+        back_populates="receipt",
+        order_by="ReceiptProduct.id",
+        primaryjoin=PRODUCTS_JOIN,
     )
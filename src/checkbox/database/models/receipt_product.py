@@ -1,18 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Index, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import Base, TimestampMixin, PkColumn, CascadingForeignKey, MoneyColumn
+from .base import Base, TimestampMixin, PkColumn, MoneyColumn
+from .receipt import PRODUCTS_JOIN
 
 
 class ReceiptProduct(Base, TimestampMixin):
     __tablename__ = "receipt_products"
+    __table_args__ = (
+        # Products of a receipt in insertion order, also used by `ON DELETE CASCADE`
+        Index("ix_receipt_products_receipt_id_id", "receipt_id", "id"),
+        # Substring and fuzzy product search, needs the pg_trgm extension
+        Index(
+            "ix_receipt_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # Partitioned like `receipts`, a product is in the month of its receipt
+        {"postgresql_partition_by": "RANGE (receipt_created_at)"},
+    )
 
     id: Mapped[PkColumn]
-    receipt_id: Mapped[str] = mapped_column(CascadingForeignKey("receipts.id"))
+    receipt_id: Mapped[str]
+    receipt_created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), primary_key=True
+    )
     name: Mapped[str]
     price: Mapped[MoneyColumn]
     quantity: Mapped[int]
     total: Mapped[MoneyColumn]
 
     receipt: Mapped[list["Reciept"]] = relationship(
-        "Receipt", back_populates="products"
+        "Receipt", back_populates="products", primaryjoin=PRODUCTS_JOIN
     )
@@ -0,0 +1,188 @@
+import re
+from datetime import date, datetime, UTC
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# `receipts` and `receipt_products` are partitioned by month (in UTC) of the
+# receipt's `created_at`. Each month is a pair of partitions with a foreign key
+# between them, so the pair is created and detached together. Rows outside
+# of the monthly partitions go to the `*_default` pair.
+RECEIPTS_TABLE = "receipts"
+PRODUCTS_TABLE = "receipt_products"
+
+PARTITION_NAME_RE = re.compile(r"^receipts_y(\d{4})m(\d{2})$")
+# Partitions of both tables, including detached ones
+PARTITION_TABLE_RE = re.compile(r"^receipt(s|_products)_(y\d{4}m\d{2}|default)$")
+
+# Serializes partition DDL of concurrently starting app workers
+PARTITIONS_LOCK_ID = 7_230_512
+
+CREATE_RECEIPTS_PARTITION_SQL = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF receipts
+FOR VALUES FROM ('{start}') TO ('{end}')
+"""
+
+CREATE_PRODUCTS_PARTITION_SQL = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF receipt_products (
+    FOREIGN KEY (receipt_id, receipt_created_at)
+    REFERENCES {receipts_partition} (id, created_at)
+    ON DELETE CASCADE ON UPDATE CASCADE
+)
+FOR VALUES FROM ('{start}') TO ('{end}')
+"""
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04}m{month.month:02}"
+
+
+async def create_monthly_partitions(
+    connection: AsyncConnection, first_month: date, last_month: date
+) -> list[date]:
+    """Create the missing partitions for the months from `first_month` to `last_month`.
+
+    Returns the months created. Fails if the default partition already has rows
+    of one of the months.
+    """
+    await connection.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITIONS_LOCK_ID}
+    )
+    existing = set(await _get_partitions(connection))
+    created = []
+    month = month_start(first_month)
+
+    while month <= last_month:
+        receipts_partition = partition_name(RECEIPTS_TABLE, month)
+
+        if receipts_partition not in existing:
+            bounds = {
+                "start": _format_bound(month),
+                "end": _format_bound(add_months(month, 1)),
+            }
+            await connection.execute(
+                text(
+                    CREATE_RECEIPTS_PARTITION_SQL.format(
+                        partition=receipts_partition, **bounds
+                    )
+                )
+            )
+            await connection.execute(
+                text(
+                    CREATE_PRODUCTS_PARTITION_SQL.format(
+                        partition=partition_name(PRODUCTS_TABLE, month),
+                        receipts_partition=receipts_partition,
+                        **bounds,
+                    )
+                )
+            )
+            created.append(month)
+
+        month = add_months(month, 1)
+
+    return created
+
+
+async def create_future_partitions(
+    connection: AsyncConnection, months_ahead: int
+) -> list[date]:
+    current_month = month_start(datetime.now(UTC).date())
+    return await create_monthly_partitions(
+        connection, current_month, add_months(current_month, months_ahead)
+    )
+
+
+async def detach_partitions(
+    connection: AsyncConnection, before: date, lock_timeout_ms: int = 5000
+) -> list[date]:
+    """Detach the monthly partitions that end on or before `before`.
+
+    Detached partitions stay as standalone tables `receipts_yYYYYmMM` and
+    `receipt_products_yYYYYmMM`, to be archived or dropped. Detaching only
+    changes the catalog, but needs an exclusive lock on the parent tables: gives
+    up after `lock_timeout_ms` instead of blocking queries queued behind it.
+    """
+    await connection.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITIONS_LOCK_ID}
+    )
+    await connection.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    detached = []
+
+    for month in await get_partition_months(connection):
+        if add_months(month, 1) > before:
+            continue
+
+        await detach_partition(connection, month)
+        detached.append(month)
+
+    return detached
+
+
+async def detach_partition(connection: AsyncConnection, month: date) -> None:
+    await connection.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITIONS_LOCK_ID}
+    )
+
+    # Products first, they reference the receipts partition
+    for table in (PRODUCTS_TABLE, RECEIPTS_TABLE):
+        await connection.execute(
+            text(f"ALTER TABLE {table} DETACH PARTITION {partition_name(table, month)}")
+        )
+
+
+async def get_partition_months(connection: AsyncConnection) -> list[date]:
+    months = []
+
+    for receipts_partition in await _get_partitions(connection):
+        match = PARTITION_NAME_RE.match(receipts_partition)
+        months.append(date(int(match[1]), int(match[2]), 1))
+
+    return months
+
+
+async def get_retained_since(connection: AsyncConnection) -> datetime | None:
+    """Receipts created since then are all still in the database.
+
+    The start of the oldest monthly partition, or the oldest receipt of the
+    default partition if it is older. Receipts of earlier months were archived
+    or detached. None if there are neither partitions nor receipts.
+    """
+    retained_since = await connection.scalar(
+        text(f"SELECT min(created_at) FROM {RECEIPTS_TABLE}_default")
+    )
+    months = await get_partition_months(connection)
+
+    if months:
+        first_month_start = datetime.combine(months[0], datetime.min.time(), UTC)
+        if retained_since is None or first_month_start < retained_since:
+            retained_since = first_month_start
+
+    return retained_since
+
+
+async def _get_partitions(connection: AsyncConnection) -> list[str]:
+    result = await connection.execute(
+        text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            ORDER BY child.relname
+            """),
+        {"table": RECEIPTS_TABLE},
+    )
+    return [name for name in result.scalars() if PARTITION_NAME_RE.match(name)]
+
+
+def _format_bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
@@ -0,0 +1,52 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+# Checkout latencies kept for the percentiles reported by `/health`
+CHECKOUT_SAMPLES = 1000
+
+
+@dataclass
+class PoolStats:
+    # Checkouts in progress: waiting for a free connection or opening a new one
+    waiting: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    checkout_times_ms: deque[float] = field(
+        default_factory=lambda: deque(maxlen=CHECKOUT_SAMPLES)
+    )
+
+    def checkout_time_percentile(self, percent: float) -> float:
+        samples = sorted(self.checkout_times_ms)
+        if not samples:
+            return 0.0
+        return samples[round(percent / 100 * (len(samples) - 1))]
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    # `AsyncAdaptedQueuePool` that measures how long `connect()` takes to hand out
+    # a connection. Runs on the event loop only, so the counters need no locking.
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        self.stats.waiting += 1
+        started_at = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+
+        self.stats.checkouts += 1
+        self.stats.checkout_times_ms.append((time.perf_counter() - started_at) * 1000)
+
+        return connection
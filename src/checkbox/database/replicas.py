@@ -0,0 +1,40 @@
+from collections.abc import Sequence
+from typing import Literal, NewType
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+# Session for read-only queries, bound to a replica when replicas are configured.
+# Replicas lag behind the primary, so reads that must see the request's own
+# writes go through the regular `AsyncSession`.
+ReadOnlySession = NewType("ReadOnlySession", AsyncSession)
+
+
+class ReplicaRouter:
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        selection: Literal["round_robin", "least_busy"] = "round_robin",
+    ) -> None:
+        self.engines = list(engines)
+        self.selection = selection
+        self._next_index = 0
+
+    def choose(self) -> AsyncEngine | None:
+        if not self.engines:
+            return None
+
+        start = self._next_index % len(self.engines)
+        self._next_index += 1
+        # Rotated, so that least busy ties are still spread over all replicas
+        engines = self.engines[start:] + self.engines[:start]
+
+        if self.selection == "least_busy":
+            return min(engines, key=_busy_connections)
+
+        return engines[0]
+
+
+def _busy_connections(engine: AsyncEngine) -> int:
+    pool = engine.pool
+    return pool.checkedout() + pool.stats.waiting
@@ -1,8 +1,21 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
 
+from checkbox.database.pool import InstrumentedAsyncPool
 
-def create_sa_engine(postgres_url: str, **kwargs) -> AsyncEngine:
-    return create_async_engine(postgres_url, **kwargs)
+
+def create_sa_engine(
+    postgres_url: str, statement_cache_size: int = 100, **kwargs
+) -> AsyncEngine:
+    return create_async_engine(
+        postgres_url,
+        poolclass=InstrumentedAsyncPool,
+        # SQLAlchemy's and asyncpg's own prepared statements caches, per connection
+        connect_args={
+            "prepared_statement_cache_size": statement_cache_size,
+            "statement_cache_size": statement_cache_size,
+        },
+        **kwargs,
+    )
 
 
 def create_sa_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
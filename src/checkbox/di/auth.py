@@ -1,18 +1,36 @@
+from dataclasses import dataclass
 from typing import NewType
 
 from dishka import Provider, provide, Scope, from_context
 from starlette.requests import Request
 
-from checkbox.database.models import User
 from checkbox.exceptions.base import Unauthorized
-from checkbox.services.user import UserService
+from checkbox.services.user import UserService, CurrentUser
 
 AccessToken = NewType("AccessToken", str)
 
+# Id of the authenticated user taken from the access token claims, without
+# checking the users table. Enough for endpoints that only filter by the user,
+# endpoints that need the user to exist (e.g. writes) should depend on `CurrentUser`.
+CurrentUserId = NewType("CurrentUserId", str)
+# Id from a valid access token, decoded once per request. Use `CurrentUserId`
+# in endpoints, this one doesn't count towards `AuthStats`.
+TokenUserId = NewType("TokenUserId", str)
+
+
+@dataclass
+class AuthStats:
+    # Users table queries saved are `claims_only` + user cache hits
+    claims_only: int = 0
+
 
 class AuthProvider(Provider):
     settings = from_context(provides=Request, scope=Scope.REQUEST)
 
+    @provide(scope=Scope.APP)
+    def get_auth_stats(self) -> AuthStats:
+        return AuthStats()
+
     @provide(scope=Scope.REQUEST, provides=AccessToken)
     async def get_access_token(self, request: Request):
         token = request.headers.get("Authorization")
@@ -27,12 +45,26 @@ class AuthProvider(Provider):
 
         return token_parts[1]
 
+    @provide(scope=Scope.REQUEST)
+    async def get_token_user_id(
+        self, user_service: UserService, access_token: AccessToken
+    ) -> TokenUserId:
+        return TokenUserId(user_service.get_user_id_from_access_token(access_token))
+
+    @provide(scope=Scope.REQUEST)
+    async def get_current_user_id(
+        self, user_id: TokenUserId, auth_stats: AuthStats
+    ) -> CurrentUserId:
+        auth_stats.claims_only += 1
+        return CurrentUserId(user_id)
+
     @provide(scope=Scope.REQUEST)
     async def get_current_user(
-        self,
-        user_service: UserService,
-        access_token: AccessToken,
-    ) -> User:
-        user_id = user_service.get_user_id_from_access_token(access_token)
-        user = await user_service.get_by_id(user_id)
+        self, user_service: UserService, user_id: TokenUserId
+    ) -> CurrentUser:
+        user = await user_service.get_by_id_cached(user_id)
+
+        if user is None:
+            raise Unauthorized("Could not validate credentials")
+
         return user
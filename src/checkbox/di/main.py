@@ -1,11 +1,16 @@
-from typing import AsyncIterable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import AsyncIterable, Iterable
 
 from dishka import Provider, provide, Scope, FromDishka, from_context
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, AsyncSession
 
-from checkbox.config import Settings
+from checkbox.config import Settings, RateLimitBudget
+from checkbox.database.replicas import ReplicaRouter, ReadOnlySession
 from checkbox.database.setup import create_sa_engine, create_sa_sessionmaker
+from checkbox.metrics import instrument_engine
+from checkbox.rate_limit import RateLimiter, InMemoryRateLimiterBackend, RateLimit
+from checkbox.services.password import PasswordHasher
 
 
 class MainProvider(Provider):
@@ -13,14 +18,25 @@ class MainProvider(Provider):
 
     @provide(scope=Scope.APP)
     async def get_sa_engine(self, settings: Settings) -> AsyncIterable[AsyncEngine]:
-        engine = create_sa_engine(
-            postgres_url=settings.postgres.url, echo=settings.sqlalchemy.ECHO
-        )
+        engine = _create_engine(settings.postgres.url, settings)
 
         yield engine
 
         await engine.dispose()
 
+    @provide(scope=Scope.APP)
+    async def get_replica_router(
+        self, settings: Settings
+    ) -> AsyncIterable[ReplicaRouter]:
+        engines = [
+            _create_engine(url, settings) for url in settings.postgres.REPLICA_URLS
+        ]
+
+        yield ReplicaRouter(engines, selection=settings.postgres.REPLICA_SELECTION)
+
+        for engine in engines:
+            await engine.dispose()
+
     @provide(scope=Scope.APP)
     def get_sa_sessionmaker(
         self, engine: FromDishka[AsyncEngine]
@@ -34,6 +50,78 @@ class MainProvider(Provider):
         async with sa_sessionmaker() as session:
             yield session
 
+    @provide(scope=Scope.REQUEST)
+    async def get_read_only_session(
+        self,
+        session: AsyncSession,
+        replica_router: ReplicaRouter,
+        sa_sessionmaker: FromDishka[async_sessionmaker],
+    ) -> AsyncIterable[ReadOnlySession]:
+        replica_engine = replica_router.choose()
+
+        if replica_engine is None:
+            yield ReadOnlySession(session)
+            return
+
+        # Connects to the replica only once the session runs a query
+        async with sa_sessionmaker(bind=replica_engine) as read_session:
+            yield ReadOnlySession(read_session)
+
     @provide(scope=Scope.APP)
     def get_password_context(self) -> CryptContext:
         return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+    @provide(scope=Scope.APP)
+    def get_password_hasher(
+        self, settings: Settings, password_context: CryptContext
+    ) -> Iterable[PasswordHasher]:
+        executor_settings = settings.password_hashing
+        executor = None
+
+        if executor_settings.EXECUTOR == "thread":
+            executor = ThreadPoolExecutor(
+                max_workers=executor_settings.MAX_WORKERS,
+                thread_name_prefix="password-hasher",
+            )
+        elif executor_settings.EXECUTOR == "process":
+            executor = ProcessPoolExecutor(max_workers=executor_settings.MAX_WORKERS)
+
+        yield PasswordHasher(password_context=password_context, executor=executor)
+
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    @provide(scope=Scope.APP)
+    def get_rate_limiter(self, settings: Settings) -> RateLimiter:
+        rate_limit_settings = settings.rate_limit
+        return RateLimiter(
+            backend=InMemoryRateLimiterBackend(
+                max_buckets=rate_limit_settings.MAX_BUCKETS
+            ),
+            default_limit=_to_rate_limit(rate_limit_settings.DEFAULT),
+            route_limits={
+                route: _to_rate_limit(budget)
+                for route, budget in rate_limit_settings.ROUTES.items()
+            },
+            enabled=rate_limit_settings.ENABLED,
+        )
+
+
+def _to_rate_limit(budget: RateLimitBudget) -> RateLimit:
+    return RateLimit(rate=budget.RATE, burst=budget.BURST)
+
+
+def _create_engine(postgres_url: str, settings: Settings) -> AsyncEngine:
+    sqlalchemy_settings = settings.sqlalchemy
+    engine = create_sa_engine(
+        postgres_url=postgres_url,
+        statement_cache_size=sqlalchemy_settings.STATEMENT_CACHE_SIZE,
+        echo=sqlalchemy_settings.ECHO,
+        pool_size=sqlalchemy_settings.POOL_SIZE,
+        max_overflow=sqlalchemy_settings.MAX_OVERFLOW,
+        pool_timeout=sqlalchemy_settings.POOL_TIMEOUT,
+        pool_pre_ping=sqlalchemy_settings.POOL_PRE_PING,
+        pool_recycle=sqlalchemy_settings.POOL_RECYCLE,
+    )
+    instrument_engine(engine)
+    return engine
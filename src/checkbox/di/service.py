@@ -1,10 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterable
+
 from dishka import Provider, provide, Scope, from_context
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from checkbox.archive import ReceiptArchive
+from checkbox.cache import LRUCache
 from checkbox.config import Settings
-from checkbox.services.receipt_service import ReceiptService
-from checkbox.services.user import UserService
+from checkbox.database.replicas import ReadOnlySession
+from checkbox.services.password import PasswordHasher
+from checkbox.services.plaintext import PlaintextRenderer
+from checkbox.services.receipt_service import ReceiptService, RenderCache, ReplicaPins
+from checkbox.services.report_service import ReportService
+from checkbox.services.user import UserService, UserCache
 
 
 class ServiceProvider(Provider):
@@ -15,15 +25,93 @@ class ServiceProvider(Provider):
         self,
         settings: Settings,
         session: AsyncSession,
-        password_context: CryptContext,
+        password_hasher: PasswordHasher,
+        user_cache: UserCache,
     ) -> UserService:
         return UserService(
-            session=session, settings=settings, password_context=password_context
+            session=session,
+            settings=settings,
+            password_hasher=password_hasher,
+            user_cache=user_cache,
+        )
+
+    @provide(scope=Scope.APP)
+    def get_user_cache(self, settings: Settings) -> UserCache:
+        return UserCache(
+            LRUCache(
+                max_entries=settings.user_cache.MAX_ENTRIES,
+                ttl_seconds=settings.user_cache.TTL_SECONDS,
+            )
+        )
+
+    @provide(scope=Scope.APP)
+    def get_render_cache(self, settings: Settings) -> RenderCache:
+        return RenderCache(
+            LRUCache(
+                max_entries=settings.render_cache.MAX_ENTRIES,
+                max_bytes=settings.render_cache.MAX_BYTES,
+                ttl_seconds=settings.render_cache.TTL_SECONDS,
+            )
         )
 
+    @provide(scope=Scope.APP)
+    def get_replica_pins(self, settings: Settings) -> ReplicaPins:
+        return ReplicaPins(
+            LRUCache(
+                max_entries=100_000,
+                ttl_seconds=settings.postgres.READ_YOUR_WRITES_SECONDS,
+            )
+        )
+
+    @provide(scope=Scope.APP)
+    def get_receipt_archive(self, settings: Settings) -> Iterable[ReceiptArchive]:
+        archive = ReceiptArchive(Path(settings.archive.DIRECTORY))
+
+        yield archive
+
+        archive.close()
+
+    @provide(scope=Scope.APP)
+    def get_plaintext_renderer(self, settings: Settings) -> Iterable[PlaintextRenderer]:
+        export_settings = settings.plaintext_export
+        executor = None
+
+        if export_settings.EXECUTOR == "thread":
+            executor = ThreadPoolExecutor(
+                max_workers=export_settings.MAX_WORKERS,
+                thread_name_prefix="plaintext-renderer",
+            )
+        elif export_settings.EXECUTOR == "process":
+            executor = ProcessPoolExecutor(max_workers=export_settings.MAX_WORKERS)
+
+        yield PlaintextRenderer(
+            executor=executor, batch_size=export_settings.BATCH_SIZE
+        )
+
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
     @provide(scope=Scope.REQUEST)
     async def get_receipt_service(
         self,
+        settings: Settings,
         session: AsyncSession,
+        render_cache: RenderCache,
+        read_session: ReadOnlySession,
+        replica_pins: ReplicaPins,
+        archive: ReceiptArchive,
+        plaintext_renderer: PlaintextRenderer,
     ) -> ReceiptService:
-        return ReceiptService(session=session)
+        return ReceiptService(
+            session=session,
+            render_cache=render_cache,
+            read_session=read_session,
+            replica_pins=replica_pins,
+            archive=archive,
+            plaintext_renderer=plaintext_renderer,
+            idempotency_ttl=timedelta(seconds=settings.idempotency.TTL_SECONDS),
+        )
+
+    @provide(scope=Scope.REQUEST)
+    async def get_report_service(self, session: AsyncSession) -> ReportService:
+        return ReportService(session=session)
@@ -1,6 +1,22 @@
+from enum import StrEnum
+
 from pydantic import BaseModel
 
 
+class TotalMode(StrEnum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
 class OffsetResponse[T](BaseModel):
-    total: int
+    total: int | None
     items: list[T]
+    total_mode: TotalMode = TotalMode.EXACT
+    has_more: bool = False
+    next_cursor: str | None = None
+
+
+class ErrorDto(BaseModel):
+    detail: str
+    code: str
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+
+class PoolStatsDto(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    checkout_time_p50_ms: float
+    checkout_time_p99_ms: float
+    checkout_time_max_ms: float
+
+
+class HealthDto(BaseModel):
+    status: str
+    pool: PoolStatsDto
+    replica_pools: list[PoolStatsDto]
@@ -1,9 +1,26 @@
 from datetime import datetime
 from decimal import Decimal
+from enum import StrEnum
 
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from checkbox.database.models.receipt import PaymentType, Receipt
+from checkbox.dto.generic import ErrorDto
+
+MAX_RECEIPTS_BATCH_SIZE = 5000
+MAX_PLAINTEXT_EXPORT_IDS = 10_000
+
+
+class ReceiptsExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ProductMatch(StrEnum):
+    # Case-insensitive substring of a product name
+    SUBSTRING = "substring"
+    # Similar to a word of a product name, tolerates typos
+    FUZZY = "fuzzy"
 
 
 class CreateReceiptProductDto(BaseModel):
@@ -22,6 +39,22 @@ class CreateReceiptDto(BaseModel):
     payment: CreateReceiptPaymentDto
 
 
+class CreateReceiptBatchDto(BaseModel):
+    receipts: list[CreateReceiptDto] = Field(
+        min_length=1, max_length=MAX_RECEIPTS_BATCH_SIZE
+    )
+
+
+class PlaintextReceiptsExportDto(BaseModel):
+    # Receipts of the date range, narrowed down to these ids if given
+    receipt_ids: list[str] | None = Field(
+        None, min_length=1, max_length=MAX_PLAINTEXT_EXPORT_IDS
+    )
+    start_date: datetime | None = None
+    end_date: datetime | None = None
+    line_length: int = Field(32, ge=20, le=50)
+
+
 class ReceiptProductDto(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -57,3 +90,15 @@ class ReceiptDto(BaseModel):
             }
 
         return obj
+
+
+class ReceiptBatchItemDto(BaseModel):
+    index: int
+    receipt: ReceiptDto | None = None
+    error: ErrorDto | None = None
+
+
+class ReceiptBatchResultDto(BaseModel):
+    created: int
+    failed: int
+    items: list[ReceiptBatchItemDto]
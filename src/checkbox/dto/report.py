@@ -0,0 +1,34 @@
+from datetime import date
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+from checkbox.database.models.receipt import PaymentType
+
+
+class PaymentTypeSummaryDto(BaseModel):
+    payment_type: PaymentType
+    receipts_count: int
+    total: Decimal
+    payment_amount: Decimal
+    rest: Decimal
+
+
+class DailyReportDto(BaseModel):
+    day: date
+    receipts_count: int
+    total: Decimal
+    payment_amount: Decimal
+    rest: Decimal
+    payment_types: list[PaymentTypeSummaryDto]
+
+
+class PeriodReportDto(BaseModel):
+    start_day: date
+    end_day: date
+    receipts_count: int
+    total: Decimal
+    payment_amount: Decimal
+    rest: Decimal
+    payment_types: list[PaymentTypeSummaryDto]
+    days: list[DailyReportDto]
@@ -5,9 +5,10 @@ class CheckboxException(Exception):
     CODE = "CHECKBOX_EXCEPTION"
     HTTP_STATUS = status.HTTP_400_BAD_REQUEST
 
-    def __init__(self, message):
+    def __init__(self, message, headers: dict[str, str] | None = None):
         super().__init__(message)
         self.message = message
+        self.headers = headers
 
 
 class TooManyRequests(CheckboxException):
@@ -38,3 +39,8 @@ class ResourceAlreadyExists(CheckboxException):
 class InvalidOffset(CheckboxException):
     CODE = "INVALID_OFFSET"
     HTTP_STATUS = status.HTTP_400_BAD_REQUEST
+
+
+class InvalidCursor(CheckboxException):
+    CODE = "INVALID_CURSOR"
+    HTTP_STATUS = status.HTTP_400_BAD_REQUEST
@@ -6,3 +6,8 @@ from checkbox.exceptions.base import CheckboxException
 class PaymentAmountMismatch(CheckboxException):
     CODE = "PAYMENT_AMOUNT_MISMATCH"
     HTTP_STATUS = status.HTTP_400_BAD_REQUEST
+
+
+class IdempotencyKeyMismatch(CheckboxException):
+    CODE = "IDEMPOTENCY_KEY_MISMATCH"
+    HTTP_STATUS = status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,8 @@
+from starlette import status
+
+from checkbox.exceptions.base import CheckboxException
+
+
+class InvalidReportPeriod(CheckboxException):
+    CODE = "INVALID_REPORT_PERIOD"
+    HTTP_STATUS = status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,270 @@
+import bisect
+import time
+from collections.abc import Iterator, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from checkbox.cache import LRUCache
+from checkbox.database.pool import InstrumentedAsyncPool
+
+# Seconds
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+# Statements per request
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+DB_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE"))
+
+
+class Counter:
+    TYPE = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        # For counters kept by other objects (cache, pool stats), copied on scrape
+        self.values[labels] = value
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.TYPE}"
+
+        for labels, value in self.values.items():
+            yield (
+                f"{self.name}{_format_labels(self.label_names, labels)}"
+                f" {_format_value(value)}"
+            )
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+
+@dataclass
+class _HistogramSeries:
+    bucket_counts: list[int]
+    sum: float = 0.0
+
+
+class Histogram:
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = HTTP_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            # The last bucket is +Inf
+            series = _HistogramSeries(bucket_counts=[0] * (len(self.buckets) + 1))
+            self.series[labels] = series
+
+        series.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+
+        for labels, series in self.series.items():
+            cumulative_count = 0
+            for bound, count in zip(
+                (*self.buckets, "+Inf"), series.bucket_counts, strict=True
+            ):
+                cumulative_count += count
+                bucket_labels = _format_labels(
+                    (*self.label_names, "le"),
+                    (*labels, bound if bound == "+Inf" else _format_value(bound)),
+                )
+                yield f"{self.name}_bucket{bucket_labels} {cumulative_count}"
+
+            series_labels = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{series_labels} {_format_value(series.sum)}"
+            yield f"{self.name}_count{series_labels} {cumulative_count}"
+
+
+class MetricsRegistry:
+    # Metrics of this worker process in the Prometheus text format.
+    # Updated from the event loop only, so there is no locking.
+
+    def __init__(self) -> None:
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(
+        self, name: str, documentation: str, label_names: Sequence[str] = ()
+    ) -> Counter:
+        counter = Counter(name, documentation, label_names)
+        self.metrics.append(counter)
+        return counter
+
+    def gauge(
+        self, name: str, documentation: str, label_names: Sequence[str] = ()
+    ) -> Gauge:
+        gauge = Gauge(name, documentation, label_names)
+        self.metrics.append(gauge)
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = HTTP_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self.metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        return "".join(
+            f"{line}\n" for metric in self.metrics for line in metric.collect()
+        )
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the response is sent.",
+    ("method", "route"),
+)
+HTTP_REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries",
+    "Database statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERIES_BUCKETS,
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time.",
+    ("operation",),
+    buckets=DB_BUCKETS,
+)
+CHECKBOX_EXCEPTIONS = REGISTRY.counter(
+    "checkbox_exceptions_total", "Handled CheckboxException errors.", ("code",)
+)
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "db_pool_connections", "Database pool connections.", ("state",)
+)
+DB_POOL_CHECKOUTS = REGISTRY.counter(
+    "db_pool_checkouts_total", "Database pool checkouts."
+)
+DB_POOL_TIMEOUTS = REGISTRY.counter(
+    "db_pool_checkout_timeouts_total", "Database pool checkouts that timed out."
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "In-process cache lookups.", ("cache", "result")
+)
+CACHE_REMOVALS = REGISTRY.counter(
+    "cache_removals_total", "In-process cache entries dropped.", ("cache", "reason")
+)
+CACHE_ENTRIES = REGISTRY.gauge("cache_entries", "In-process cache entries.", ("cache",))
+CACHE_SIZE = REGISTRY.gauge("cache_size_bytes", "In-process cache size.", ("cache",))
+AUTH_USER_LOOKUPS_SAVED = REGISTRY.counter(
+    "auth_user_lookups_saved_total",
+    "Authenticated requests served without querying the users table.",
+    ("mode",),
+)
+
+# Statements executed by the current request, see `MetricsMiddleware`
+CURRENT_REQUEST_QUERIES: ContextVar[list[int] | None] = ContextVar(
+    "current_request_queries", default=None
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - conn.info["query_started_at"].pop()
+        _observe_query(statement, duration)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started_at"):
+            started_at = connection.info["query_started_at"].pop()
+            _observe_query(
+                exception_context.statement or "", time.perf_counter() - started_at
+            )
+
+
+def update_pool_metrics(pool: InstrumentedAsyncPool) -> None:
+    DB_POOL_CONNECTIONS.set(pool.checkedin(), "checked_in")
+    DB_POOL_CONNECTIONS.set(pool.checkedout(), "checked_out")
+    DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), "overflow")
+    DB_POOL_CONNECTIONS.set(pool.stats.waiting, "waiting")
+    DB_POOL_CHECKOUTS.set(pool.stats.checkouts)
+    DB_POOL_TIMEOUTS.set(pool.stats.timeouts)
+
+
+def update_cache_metrics(name: str, cache: LRUCache) -> None:
+    stats = cache.stats
+    CACHE_REQUESTS.set(stats.hits, name, "hit")
+    CACHE_REQUESTS.set(stats.misses, name, "miss")
+    CACHE_REMOVALS.set(stats.evictions, name, "evicted")
+    CACHE_REMOVALS.set(stats.expirations, name, "expired")
+    CACHE_ENTRIES.set(len(cache), name)
+    CACHE_SIZE.set(cache.size_bytes, name)
+
+
+def _observe_query(statement: str, duration: float) -> None:
+    operation = statement.lstrip()[:6].upper()
+    if operation not in DB_OPERATIONS:
+        operation = "OTHER"
+
+    DB_QUERY_DURATION.observe(duration, operation)
+
+    request_queries = CURRENT_REQUEST_QUERIES.get()
+    if request_queries is not None:
+        request_queries[0] += 1
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    labels = ",".join(
+        f'{name}="{_escape_label_value(str(value))}"'
+        for name, value in zip(names, values)
+    )
+    return f"{{{labels}}}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,86 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from checkbox.cache import LRUCache
+from checkbox.exceptions.base import TooManyRequests
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # Tokens added to the bucket per second
+    rate: float
+    # Bucket size, the number of requests allowed in a burst
+    burst: int
+
+
+class RateLimiterBackend(ABC):
+    """Storage of token buckets.
+
+    The in-memory backend limits every worker process separately, a shared
+    backend (e.g. Redis) has to take a token atomically for all of them.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Take a token from the bucket, return seconds to wait if it is empty."""
+
+
+class InMemoryRateLimiterBackend(RateLimiterBackend):
+
+    def __init__(self, max_buckets: int) -> None:
+        # An evicted bucket starts over full, so `max_buckets` should cover
+        # the clients active within the time it takes to refill a bucket
+        self.buckets = LRUCache(max_entries=max_buckets)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+
+        if bucket is None:
+            tokens = limit.burst
+        else:
+            tokens, updated_at = bucket
+            tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+
+        if tokens >= 1:
+            self.buckets.set(key, (tokens - 1, now))
+            return 0
+
+        self.buckets.set(key, (tokens, now))
+        return (1 - tokens) / limit.rate
+
+
+class RateLimiter:
+
+    def __init__(
+        self,
+        backend: RateLimiterBackend,
+        default_limit: RateLimit,
+        route_limits: dict[str, RateLimit] | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.backend = backend
+        self.default_limit = default_limit
+        self.route_limits = route_limits or {}
+        self.enabled = enabled
+
+    async def check(self, route: str, client_key: str) -> None:
+        """Raise `TooManyRequests` if the client exhausted its budget for the route.
+
+        `route` is the method and the path template, e.g. "GET /receipts/{receipt_id}".
+        """
+        if not self.enabled:
+            return
+
+        limit = self.route_limits.get(route, self.default_limit)
+        # Routes without their own budget share the default bucket
+        bucket_route = route if route in self.route_limits else "default"
+        retry_after = await self.backend.take(f"{bucket_route}:{client_key}", limit)
+
+        if retry_after > 0:
+            raise TooManyRequests(
+                "Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
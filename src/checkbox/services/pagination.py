@@ -0,0 +1,25 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from checkbox.exceptions.base import InvalidCursor
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+    if not isinstance(item_id, str) or created_at.tzinfo is None:
+        raise InvalidCursor("Invalid cursor")
+
+    return created_at, item_id
@@ -0,0 +1,46 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on an executor.
+
+    bcrypt takes tens of milliseconds per call by design, running it inline
+    would block the event loop and every other request on the worker with it.
+    """
+
+    def __init__(
+        self, password_context: CryptContext, executor: Executor | None
+    ) -> None:
+        # The context travels to workers as its config string, which is picklable
+        self._context_config = password_context.to_string()
+        self._executor = executor
+
+    async def hash(self, secret: str) -> str:
+        return await self._run(hash_password, self._context_config, secret)
+
+    async def verify(self, secret: str, hash: str) -> bool:
+        return await self._run(verify_password, self._context_config, secret, hash)
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+
+@lru_cache
+def _get_password_context(context_config: str) -> CryptContext:
+    return CryptContext.from_string(context_config)
+
+
+def hash_password(context_config: str, secret: str) -> str:
+    return _get_password_context(context_config).hash(secret)
+
+
+def verify_password(context_config: str, secret: str, hash: str) -> bool:
+    return _get_password_context(context_config).verify(secret=secret, hash=hash)
@@ -0,0 +1,173 @@
+import asyncio
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from checkbox.database.models import Receipt, ReceiptProduct
+from checkbox.database.models.receipt import PaymentType
+from checkbox.dto.receipt import ReceiptDto, ReceiptProductDto
+
+KYIV_TZ = ZoneInfo("Europe/Kyiv")
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class PlaintextRenderer:
+    """Renders batches of plaintext receipts on an executor.
+
+    A batch of a few hundred receipts takes tens of milliseconds of pure
+    Python, a process pool keeps it off the event loop and the GIL.
+    """
+
+    def __init__(
+        self, executor: Executor | None, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        self._executor = executor
+        # Receipts per executor call, enough to outweigh the call's overhead
+        self.batch_size = batch_size
+
+    async def render(
+        self, receipts_json: list[str], line_length: int
+    ) -> list[tuple[str, datetime, str]]:
+        """Render receipts in the `ReceiptDto` JSON shape.
+
+        Returns (receipt id, created at, plaintext receipt) in the same order.
+        """
+        if self._executor is None:
+            return render_receipts_json(receipts_json, line_length)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, render_receipts_json, receipts_json, line_length
+        )
+
+
+def render_receipts_json(
+    receipts_json: list[str], line_length: int
+) -> list[tuple[str, datetime, str]]:
+    # JSON strings are cheaper to send to worker processes than ORM objects
+    render = get_layout(line_length).render_dto
+    rendered = []
+
+    for receipt_json in receipts_json:
+        receipt = ReceiptDto.model_validate_json(receipt_json)
+        rendered.append((receipt.id, receipt.created_at, render(receipt)))
+
+    return rendered
+
+
+class ReceiptLayout:
+    """The plaintext receipt layout for one line length.
+
+    Lines and paddings that don't depend on the receipt are built once,
+    rendering only formats the amounts and pads them.
+    """
+
+    def __init__(self, line_length: int) -> None:
+        self.line_length = line_length
+        separator = "=" * line_length
+        self._header = f"{'checkbox.ua':^{line_length}}\n{separator}"
+        self._separator = separator
+        self._footer = f"{'Дякуємо за покупку!':^{line_length}}"
+        self._payment_types = {
+            payment_type: payment_type.capitalize() for payment_type in PaymentType
+        }
+        # "dd.mm.YYYY HH:MM" centered with the extra space on the right,
+        # as `f"{value:^{width}}"` does
+        date_padding = line_length - 16
+        self._date_left = " " * (date_padding // 2)
+        self._date_right = " " * (date_padding - date_padding // 2)
+
+    def render(self, receipt: Receipt) -> str:
+        return self._render(
+            receipt.products,
+            receipt.total,
+            receipt.payment_type,
+            receipt.payment_amount,
+            receipt.rest,
+            receipt.created_at,
+        )
+
+    def render_dto(self, receipt: ReceiptDto) -> str:
+        # Same as `render`, without building ORM objects, which takes longer
+        # than rendering
+        return self._render(
+            receipt.products,
+            receipt.total,
+            receipt.payment.type,
+            receipt.payment.amount,
+            receipt.rest,
+            receipt.created_at,
+        )
+
+    def _render(
+        self,
+        products: Iterable[ReceiptProduct | ReceiptProductDto],
+        total: Decimal,
+        payment_type: PaymentType,
+        payment_amount: Decimal,
+        rest: Decimal,
+        created_at: datetime,
+    ) -> str:
+        line_length = self.line_length
+        lines = [self._header]
+        append = lines.append
+
+        for product in products:
+            # Quantities are integers, `f"{quantity:.2f}"` without the float
+            quantity_price = f"{product.quantity}.00 x {_format_money(product.price)}"
+            append(
+                product.name.ljust(line_length - len(quantity_price)) + quantity_price
+            )
+            append(_format_money(product.total).rjust(line_length))
+
+        append(self._separator)
+
+        # The amounts are padded to `line_length - len(amount) + 1`, so these
+        # lines are only as long as the others for some amounts
+        str_total = str(total)
+        append("СУМА" + str_total.rjust(line_length - len(str_total) + 1))
+        str_payment_amount = str(payment_amount)
+        append(
+            self._payment_types[payment_type]
+            + str_payment_amount.rjust(line_length - len(str_payment_amount) + 1)
+        )
+        str_rest = str(rest)
+        append("Решта" + str_rest.rjust(line_length - len(str_rest) - 1))
+        append(self._separator)
+
+        # `strftime("%d.%m.%Y %H:%M")`, formatted faster
+        kyiv = created_at.astimezone(KYIV_TZ)
+        append(
+            f"{self._date_left}{kyiv.day:02}.{kyiv.month:02}.{kyiv.year}"
+            f" {kyiv.hour:02}:{kyiv.minute:02}{self._date_right}"
+        )
+        append(self._footer)
+
+        return "\n".join(lines)
+
+
+@lru_cache
+def get_layout(line_length: int) -> ReceiptLayout:
+    return ReceiptLayout(line_length)
+
+
+def format_receipt(receipt: Receipt, line_length: int = 32) -> str:
+    return get_layout(line_length).render(receipt)
+
+
+def _format_money(value: Decimal) -> str:
+    # `f"{value:,.2f}"`: money has two decimal places, so below 1000 it is
+    # rendered as is
+    text = str(value)
+    if len(text) < 7 and text[-3:-2] == ".":
+        return text
+    return f"{value:,.2f}"
+
+
+def format_receipts(receipts: Iterable[Receipt], line_length: int = 32) -> list[str]:
+    render = get_layout(line_length).render
+    return [render(receipt) for receipt in receipts]
@@ -1,35 +1,377 @@
-from datetime import datetime
+import csv
+import hashlib
+import json
+import zipfile
+from collections.abc import Sequence, AsyncIterator, Iterable
+from datetime import datetime, date, timedelta, UTC
 from decimal import Decimal
-from zoneinfo import ZoneInfo
+from io import StringIO
+from operator import itemgetter
+from typing import Any, NewType
 
+import orjson
 from pydantic import TypeAdapter
-from sqlalchemy import select, func
+from sqlalchemy import (
+    select,
+    insert,
+    update,
+    delete,
+    func,
+    tuple_,
+    cast,
+    literal,
+    literal_column,
+    ColumnElement,
+    Select,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from checkbox.database.models import ReceiptProduct, Receipt
+from checkbox.archive import ReceiptArchive, SegmentWriter
+from checkbox.cache import LRUCache
+from checkbox.database.copy import copy_records
+from checkbox.database.models import (
+    ReceiptProduct,
+    Receipt,
+    DailyReceiptSummary,
+    IdempotencyKey,
+)
+from checkbox.database.models.base import generate_sequential_ids, quantize_money
 from checkbox.database.models.receipt import PaymentType
-from checkbox.dto.generic import OffsetResponse
-from checkbox.dto.receipt import CreateReceiptDto, ReceiptDto
-from checkbox.exceptions.base import NotFound, InvalidOffset
-from checkbox.exceptions.receipts import PaymentAmountMismatch
+from checkbox.database.partitions import (
+    add_months,
+    detach_partition,
+    partition_name,
+    RECEIPTS_TABLE,
+    PRODUCTS_TABLE,
+)
+from checkbox.database.replicas import ReadOnlySession
+from checkbox.dto.generic import OffsetResponse, TotalMode, ErrorDto
+from checkbox.dto.receipt import (
+    CreateReceiptDto,
+    ReceiptDto,
+    CreateReceiptBatchDto,
+    ReceiptBatchResultDto,
+    ReceiptBatchItemDto,
+    ReceiptsExportFormat,
+    ProductMatch,
+)
+from checkbox.exceptions.base import NotFound, InvalidOffset, CheckboxException
+from checkbox.exceptions.receipts import PaymentAmountMismatch, IdempotencyKeyMismatch
 from checkbox.services.base import BaseService
+from checkbox.services.pagination import encode_cursor, decode_cursor
+from checkbox.services.plaintext import (
+    KYIV_TZ,
+    PlaintextRenderer,
+    format_receipt,
+    get_layout,
+)
+
+# Rendered plaintext receipts keyed by (receipt_id, line_length)
+RenderCache = NewType("RenderCache", LRUCache)
+
+# Ids of users who just created receipts, see `ReceiptService._get_read_session`
+ReplicaPins = NewType("ReplicaPins", LRUCache)
+
+DEFAULT_IDEMPOTENCY_TTL = timedelta(hours=24)
+
+RECEIPTS_ADAPTER = TypeAdapter(list[ReceiptDto])
+
+# `default=str` renders Decimal as pydantic does, `OPT_UTC_Z` the "Z" suffix
+ORJSON_OPTIONS = {"default": str, "option": orjson.OPT_UTC_Z}
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_CSV_HEADER = (
+    "receipt_id",
+    "created_at",
+    "payment_type",
+    "payment_amount",
+    "total",
+    "rest",
+    "product_name",
+    "product_price",
+    "product_quantity",
+    "product_total",
+)
+
+PRODUCT_COPY_COLUMNS = (
+    "id",
+    "receipt_id",
+    "receipt_created_at",
+    "name",
+    "price",
+    "quantity",
+    "total",
+    "created_at",
+    "updated_at",
+)
 
 
 class ReceiptService(BaseService):
 
+    def __init__(
+        self,
+        session: AsyncSession,
+        render_cache: RenderCache,
+        read_session: ReadOnlySession | None = None,
+        replica_pins: ReplicaPins | None = None,
+        archive: ReceiptArchive | None = None,
+        plaintext_renderer: PlaintextRenderer | None = None,
+        idempotency_ttl: timedelta = DEFAULT_IDEMPOTENCY_TTL,
+    ) -> None:
+        super().__init__(session)
+        self.render_cache = render_cache
+        self.read_session = read_session or session
+        self.replica_pins = replica_pins
+        self.archive = archive
+        self.plaintext_renderer = plaintext_renderer or PlaintextRenderer(executor=None)
+        self.idempotency_ttl = idempotency_ttl
+
     async def create(self, data: CreateReceiptDto, user_id: str) -> ReceiptDto:
+        return ReceiptDto.model_validate(await self._create(data, user_id=user_id))
+
+    async def create_json(self, data: CreateReceiptDto, user_id: str) -> bytes:
+        # Same as `create`, encoded straight from the ORM object we just built
+        return dump_receipt_json(await self._create(data, user_id=user_id))
+
+    async def create_json_idempotent(
+        self, data: CreateReceiptDto, user_id: str, idempotency_key: str
+    ) -> tuple[bytes, bool]:
+        """Create a receipt once per `idempotency_key`.
+
+        Returns the response and whether it is a replay of an earlier request.
+        """
+        request_hash = hashlib.sha256(data.model_dump_json().encode()).hexdigest()
+        recept = self._build_receipt(data, user_id=user_id)
+
+        insert_stmt = pg_insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=idempotency_key,
+            request_hash=request_hash,
+            expires_at=datetime.now(UTC) + self.idempotency_ttl,
+        )
+        # Claim the key in the receipt's transaction. An expired key is claimed
+        # again, while a duplicate of an in-flight request blocks here until the
+        # first one commits (and then replays it) or rolls back (and then claims).
+        claim_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "request_hash": insert_stmt.excluded.request_hash,
+                "expires_at": insert_stmt.excluded.expires_at,
+                "updated_at": func.now(),
+            },
+            where=IdempotencyKey.expires_at <= func.now(),
+        ).returning(IdempotencyKey.key)
+
+        if await self.session.scalar(claim_stmt) is None:
+            stored_key = (
+                await self.session.execute(
+                    select(IdempotencyKey.request_hash, IdempotencyKey.response).where(
+                        IdempotencyKey.user_id == user_id,
+                        IdempotencyKey.key == idempotency_key,
+                    )
+                )
+            ).one()
+            await self.session.rollback()
+
+            if stored_key.request_hash != request_hash:
+                raise IdempotencyKeyMismatch(
+                    f"Idempotency key {idempotency_key} was used for another receipt"
+                )
+
+            return stored_key.response, True
+
+        await self._insert_receipt(recept)
+        response = dump_receipt_json(recept)
+        await self.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == idempotency_key,
+            )
+            .values(receipt_id=recept.id, response=response)
+        )
+        await self.session.commit()
+        self._pin_to_primary(user_id)
+
+        return response, False
+
+    async def delete_expired_idempotency_keys(self) -> int:
+        result = await self.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now())
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def create_batch(
+        self, data: CreateReceiptBatchDto, user_id: str
+    ) -> ReceiptBatchResultDto:
+        receipts, errors = await self._create_batch(data, user_id=user_id)
+
+        items = [
+            ReceiptBatchItemDto(index=index, receipt=ReceiptDto.model_validate(receipt))
+            for index, receipt in receipts
+        ]
+        items.extend(
+            ReceiptBatchItemDto(index=index, error=error) for index, error in errors
+        )
+        items.sort(key=lambda item: item.index)
+
+        return ReceiptBatchResultDto(
+            created=len(receipts), failed=len(errors), items=items
+        )
+
+    async def create_batch_json(
+        self, data: CreateReceiptBatchDto, user_id: str
+    ) -> bytes:
+        receipts, errors = await self._create_batch(data, user_id=user_id)
+        return dump_receipt_batch_json(receipts, errors)
+
+    async def _create(self, data: CreateReceiptDto, user_id: str) -> Receipt:
+        recept = self._build_receipt(data, user_id=user_id)
+        await self._insert_receipt(recept)
+        await self.session.commit()
+        self._pin_to_primary(user_id)
+
+        return recept
+
+    async def _insert_receipt(self, recept: Receipt) -> None:
+        self.session.add(recept)
+        await self.session.flush()
+        await self._add_to_daily_summaries([recept])
+
+    async def _create_batch(
+        self, data: CreateReceiptBatchDto, user_id: str
+    ) -> tuple[list[tuple[int, Receipt]], list[tuple[int, ErrorDto]]]:
+        receipts: list[tuple[int, Receipt]] = []
+        errors: list[tuple[int, ErrorDto]] = []
+        receipt_ids = iter(generate_sequential_ids(len(data.receipts)))
+
+        for index, receipt_data in enumerate(data.receipts):
+            try:
+                receipt = self._build_receipt(receipt_data, user_id=user_id)
+            except CheckboxException as e:
+                errors.append((index, ErrorDto(detail=e.message, code=e.CODE)))
+                continue
+
+            receipt.id = next(receipt_ids)
+            receipts.append((index, receipt))
+
+        if receipts:
+            # One multi-row INSERT for the whole batch instead of a flush per receipt
+            insert_receipts_stmt = insert(Receipt).returning(
+                Receipt.created_at, sort_by_parameter_order=True
+            )
+            created_at_values = await self.session.scalars(
+                insert_receipts_stmt,
+                [
+                    {
+                        "id": receipt.id,
+                        "user_id": receipt.user_id,
+                        "total": receipt.total,
+                        "payment_type": receipt.payment_type,
+                        "payment_amount": receipt.payment_amount,
+                        "rest": receipt.rest,
+                    }
+                    for _, receipt in receipts
+                ],
+            )
+
+            for (_, receipt), created_at in zip(receipts, created_at_values):
+                receipt.created_at = created_at
+
+            # Products are the bulk of the rows, so they go through COPY
+            await copy_records(
+                self.session,
+                ReceiptProduct.__table__,
+                columns=PRODUCT_COPY_COLUMNS,
+                records=(
+                    (
+                        product.id,
+                        receipt.id,
+                        receipt.created_at,
+                        product.name,
+                        product.price,
+                        product.quantity,
+                        product.total,
+                        receipt.created_at,
+                        receipt.created_at,
+                    )
+                    for _, receipt in receipts
+                    for product in receipt.products
+                ),
+            )
+            await self._add_to_daily_summaries(receipt for _, receipt in receipts)
+            await self.session.commit()
+            self._pin_to_primary(user_id)
+
+        return receipts, errors
+
+    async def _add_to_daily_summaries(self, receipts: Iterable[Receipt]) -> None:
+        summaries: dict[tuple[str, date, PaymentType], dict] = {}
+
+        for receipt in receipts:
+            key = (
+                receipt.user_id,
+                receipt.created_at.astimezone(KYIV_TZ).date(),
+                receipt.payment_type,
+            )
+            summary = summaries.setdefault(
+                key,
+                {
+                    "user_id": key[0],
+                    "day": key[1],
+                    "payment_type": key[2],
+                    "receipts_count": 0,
+                    "total": Decimal(0),
+                    "payment_amount": Decimal(0),
+                    "rest": Decimal(0),
+                },
+            )
+            summary["receipts_count"] += 1
+            summary["total"] += receipt.total
+            summary["payment_amount"] += receipt.payment_amount
+            summary["rest"] += receipt.rest
+
+        # Rows are locked in a stable order, so concurrent batches can't deadlock
+        stmt = pg_insert(DailyReceiptSummary).values(
+            [summaries[key] for key in sorted(summaries)]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                DailyReceiptSummary.user_id,
+                DailyReceiptSummary.day,
+                DailyReceiptSummary.payment_type,
+            ],
+            set_={
+                column: getattr(DailyReceiptSummary, column)
+                + getattr(stmt.excluded, column)
+                for column in ("receipts_count", "total", "payment_amount", "rest")
+            },
+        )
+        await self.session.execute(stmt)
+
+    @staticmethod
+    def _build_receipt(data: CreateReceiptDto, user_id: str) -> Receipt:
         receipt_products = []
         receipt_total = Decimal(0)
 
-        for p in data.products:
+        product_ids = generate_sequential_ids(len(data.products))
+
+        for p, product_id in zip(data.products, product_ids):
             product_total = p.quantity * p.price
             receipt_total += product_total
 
             product = ReceiptProduct(
+                id=product_id,
                 name=p.name,
                 quantity=p.quantity,
-                price=p.price,
-                total=product_total,
+                price=quantize_money(p.price),
+                total=quantize_money(product_total),
             )
             receipt_products.append(product)
 
@@ -40,18 +382,14 @@ class ReceiptService(BaseService):
 
         rest = data.payment.amount - receipt_total
 
-        recept = Receipt(
+        return Receipt(
             user_id=user_id,
             products=receipt_products,
             payment_type=data.payment.type,
-            payment_amount=data.payment.amount,
-            total=receipt_total,
-            rest=rest,
+            payment_amount=quantize_money(data.payment.amount),
+            total=quantize_money(receipt_total),
+            rest=quantize_money(rest),
         )
-        self.session.add(recept)
-        await self.session.commit()
-
-        return await self.get_user_receipt_by_id(receipt_id=recept.id, user_id=user_id)
 
     async def get_user_receipt_by_id(self, receipt_id: str, user_id: str) -> ReceiptDto:
         stmt = (
@@ -59,12 +397,41 @@ class ReceiptService(BaseService):
             .options(joinedload(Receipt.products))
             .where(Receipt.id == receipt_id, Receipt.user_id == user_id)
         )
-        receipt = await self.session.scalar(stmt)
+        receipt = await self._read_scalar(stmt, user_id=user_id)
 
-        if not receipt:
-            raise NotFound(f"Receipt (id={receipt_id}) not found")
+        if receipt:
+            return ReceiptDto.model_validate(receipt)
+
+        return ReceiptDto.model_validate_json(
+            self._get_archived_receipt_json(receipt_id, user_id=user_id)
+        )
+
+    async def get_user_receipt_by_id_json(self, receipt_id: str, user_id: str) -> bytes:
+        stmt = select(_receipt_json()).where(
+            Receipt.id == receipt_id, Receipt.user_id == user_id
+        )
+        receipt_json = await self._read_scalar(stmt, user_id=user_id)
 
-        return ReceiptDto.model_validate(receipt)
+        if receipt_json is None:
+            return self._get_archived_receipt_json(receipt_id, user_id=user_id)
+
+        return receipt_json.encode()
+
+    async def receipt_exists(self, receipt_id: str, user_id: str | None = None) -> bool:
+        # For conditional requests: neither products nor archived receipts are read
+        filters = [Receipt.id == receipt_id]
+        if user_id is not None:
+            filters.append(Receipt.user_id == user_id)
+
+        stmt = select(literal(True)).where(*filters)
+        if await self._read_scalar(stmt, user_id=user_id):
+            return True
+
+        if self.archive is None:
+            return False
+
+        archived_user_id = self.archive.get_user_id(receipt_id)
+        return archived_user_id is not None and user_id in (None, archived_user_id)
 
     async def get_user_receipts(
         self,
@@ -75,89 +442,623 @@ class ReceiptService(BaseService):
         min_total: Decimal | None,
         offset: int,
         limit: int,
+        cursor: str | None = None,
+        total_mode: TotalMode = TotalMode.EXACT,
+        product: str | None = None,
+        product_match: ProductMatch = ProductMatch.SUBSTRING,
     ) -> OffsetResponse[ReceiptDto]:
-        count_stmt = select(func.count()).where(Receipt.user_id == user_id)
-        items_stmt = (
-            select(Receipt)
-            .options(joinedload(Receipt.products))
-            .where(Receipt.user_id == user_id)
-            .offset(offset)
-            .limit(limit)
+        filters = self._get_user_receipts_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            payment_type=payment_type,
+            min_total=min_total,
+            product=product,
+            product_match=product_match,
+        )
+        items_stmt = self._paginate_user_receipts(
+            select(Receipt).options(joinedload(Receipt.products)),
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+        )
+
+        session = self._get_read_session(user_id)
+        result = await session.execute(items_stmt.where(*filters))
+        receipts, total_count, has_more, next_cursor = await self._get_page(
+            session,
+            result.unique().scalars().all(),
+            filters=filters,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode,
+        )
+        items = RECEIPTS_ADAPTER.validate_python(receipts)
+
+        return OffsetResponse[ReceiptDto](
+            items=items,
+            total=total_count,
+            total_mode=total_mode,
+            has_more=has_more,
+            next_cursor=next_cursor,
+        )
+
+    async def get_user_receipts_json(
+        self,
+        user_id: str,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        payment_type: PaymentType | None,
+        min_total: Decimal | None,
+        offset: int,
+        limit: int,
+        cursor: str | None = None,
+        total_mode: TotalMode = TotalMode.EXACT,
+        product: str | None = None,
+        product_match: ProductMatch = ProductMatch.SUBSTRING,
+    ) -> bytes:
+        # Same contract as `get_user_receipts`, but Postgres renders every receipt
+        # with its products to JSON, so no ORM objects or DTOs are built at all.
+        filters = self._get_user_receipts_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            payment_type=payment_type,
+            min_total=min_total,
+            product=product,
+            product_match=product_match,
+        )
+        items_stmt = self._paginate_user_receipts(
+            select(Receipt.id, Receipt.created_at, _receipt_json().label("json")),
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+        )
+
+        session = self._get_read_session(user_id)
+        result = await session.execute(items_stmt.where(*filters))
+        rows, total_count, has_more, next_cursor = await self._get_page(
+            session,
+            result.all(),
+            filters=filters,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode,
+        )
+        items = "[" + ",".join(row.json for row in rows) + "]"
+
+        return orjson.dumps(
+            {
+                "total": total_count,
+                "items": orjson.Fragment(items),
+                "total_mode": total_mode,
+                "has_more": has_more,
+                "next_cursor": next_cursor,
+            }
+        )
+
+    async def export_user_receipts(
+        self,
+        user_id: str,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        payment_type: PaymentType | None,
+        min_total: Decimal | None,
+        export_format: ReceiptsExportFormat,
+    ) -> AsyncIterator[bytes]:
+        filters = self._get_user_receipts_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            payment_type=payment_type,
+            min_total=min_total,
+        )
+
+        session = self._get_read_session(user_id)
+
+        if export_format == ReceiptsExportFormat.CSV:
+            chunks = self._export_user_receipts_csv(session, filters)
+        else:
+            chunks = self._export_user_receipts_ndjson(session, filters)
+
+        async for chunk in chunks:
+            yield chunk.encode()
+
+    @staticmethod
+    async def _export_user_receipts_ndjson(
+        session: AsyncSession, filters: list[ColumnElement[bool]]
+    ) -> AsyncIterator[str]:
+        stmt = (
+            select(_receipt_json())
+            .where(*filters)
+            .order_by(Receipt.created_at.desc(), Receipt.id.desc())
+            # Server-side cursor: only one batch of rows is held in memory at a time
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = await session.stream_scalars(stmt)
+
+        async for receipts_json in result.partitions():
+            yield "\n".join(receipts_json) + "\n"
+
+    @staticmethod
+    async def _export_user_receipts_csv(
+        session: AsyncSession, filters: list[ColumnElement[bool]]
+    ) -> AsyncIterator[str]:
+        # One line per product, receipts without products get a single line
+        stmt = (
+            select(
+                Receipt.id,
+                Receipt.created_at,
+                Receipt.payment_type,
+                Receipt.payment_amount,
+                Receipt.total,
+                Receipt.rest,
+                ReceiptProduct.name,
+                ReceiptProduct.price,
+                ReceiptProduct.quantity,
+                ReceiptProduct.total,
+            )
+            .outerjoin(Receipt.products)
+            .where(*filters)
+            .order_by(Receipt.created_at.desc(), Receipt.id.desc(), ReceiptProduct.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = await session.stream(stmt)
+
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_CSV_HEADER)
+
+        async for rows in result.partitions():
+            for row in rows:
+                writer.writerow((row[0], row[1].isoformat(), *row[2:]))
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        yield buffer.getvalue()
+
+    async def export_plaintext_receipts_zip(
+        self,
+        user_id: str,
+        receipt_ids: list[str] | None,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        line_length: int,
+    ) -> AsyncIterator[bytes]:
+        """Stream a ZIP archive of the user's plaintext receipts.
+
+        Archived receipts are not included, nor are ids of missing receipts
+        or receipts of other users.
+        """
+        filters = self._get_user_receipts_filters(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            payment_type=None,
+            min_total=None,
+        )
+        if receipt_ids is not None:
+            filters.append(Receipt.id.in_(receipt_ids))
+
+        renderer = self.plaintext_renderer
+        stmt = (
+            select(_receipt_json())
+            .where(*filters)
+            .order_by(Receipt.created_at, Receipt.id)
+            .execution_options(yield_per=renderer.batch_size)
         )
+        result = await self._get_read_session(user_id).stream_scalars(stmt)
+
+        # Only the archive's central directory, a small entry per receipt,
+        # grows with the number of receipts
+        output = _ZipOutput()
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            async for receipts_json in result.partitions():
+                for receipt_id, created_at, formatted_receipt in await renderer.render(
+                    list(receipts_json), line_length
+                ):
+                    member = zipfile.ZipInfo(
+                        f"receipt_{receipt_id}.txt",
+                        date_time=created_at.astimezone(KYIV_TZ).timetuple()[:6],
+                    )
+                    member.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(member, formatted_receipt)
+
+                yield output.drain()
+
+        yield output.drain()
+
+    @staticmethod
+    def _paginate_user_receipts(
+        stmt: Select, offset: int, limit: int, cursor: str | None
+    ) -> Select:
+        stmt = (
+            stmt.order_by(Receipt.created_at.desc(), Receipt.id.desc())
+            # Fetch one extra row to know whether there is a next page
+            .limit(limit + 1)
+        )
+
+        if not cursor:
+            return stmt.offset(offset)
+
+        if offset:
+            raise InvalidOffset("Offset can't be combined with cursor")
+
+        # Keyset pagination: continue right after the last seen receipt,
+        # so the page cost doesn't depend on how deep the client is.
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        return stmt.where(
+            tuple_(Receipt.created_at, Receipt.id) < (cursor_created_at, cursor_id)
+        )
+
+    async def _get_page(
+        self,
+        session: AsyncSession,
+        rows: Sequence,
+        filters: list[ColumnElement[bool]],
+        offset: int,
+        limit: int,
+        cursor: str | None,
+        total_mode: TotalMode,
+    ) -> tuple[Sequence, int | None, bool, str | None]:
+        has_more = len(rows) > limit
+        next_cursor = None
+
+        if has_more:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        # When the page is the last one, its position gives the exact total for free
+        is_last_offset_page = (
+            not cursor and not has_more and (bool(rows) or offset == 0)
+        )
+        total_count = None
+
+        if total_mode == TotalMode.EXACT:
+            if is_last_offset_page:
+                total_count = offset + len(rows)
+            else:
+                count_stmt = select(func.count()).where(*filters)
+                total_count = await session.scalar(count_stmt)
+
+            max_offset = total_count - 1
+
+            if not cursor and offset > max_offset:
+                raise InvalidOffset(f"Max offset value is {max_offset}")
+
+        elif not cursor and offset and not rows:
+            raise InvalidOffset(f"Offset {offset} is out of range")
+
+        elif total_mode == TotalMode.ESTIMATE:
+            if is_last_offset_page:
+                total_count = offset + len(rows)
+            else:
+                estimated_count = await self._estimate_rows_count(
+                    session, select(Receipt.id).where(*filters)
+                )
+                total_count = max(estimated_count, offset + len(rows) + has_more)
+
+        return rows, total_count, has_more, next_cursor
+
+    @staticmethod
+    async def _estimate_rows_count(session: AsyncSession, stmt: Select) -> int:
+        # Ask the planner instead of counting: statistics-based estimate,
+        # costs a plan but no scan of the matching rows.
+        compiled = stmt.compile(
+            dialect=session.bind.dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar_one()
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def _get_user_receipts_filters(
+        user_id: str,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        payment_type: PaymentType | None,
+        min_total: Decimal | None,
+        product: str | None = None,
+        product_match: ProductMatch = ProductMatch.SUBSTRING,
+    ) -> list[ColumnElement[bool]]:
+        filters = [Receipt.user_id == user_id]
 
         if start_date:
-            count_stmt = count_stmt.where(Receipt.created_at >= start_date)
-            items_stmt = items_stmt.where(Receipt.created_at >= start_date)
+            filters.append(Receipt.created_at >= start_date)
 
         if end_date:
-            count_stmt = count_stmt.where(Receipt.created_at <= end_date)
-            items_stmt = items_stmt.where(Receipt.created_at <= end_date)
+            filters.append(Receipt.created_at <= end_date)
 
         if payment_type:
-            count_stmt = count_stmt.where(Receipt.payment_type == payment_type)
-            items_stmt = items_stmt.where(Receipt.payment_type == payment_type)
+            filters.append(Receipt.payment_type == payment_type)
 
         if min_total:
-            count_stmt = count_stmt.where(Receipt.total >= min_total)
-            items_stmt = items_stmt.where(Receipt.total >= min_total)
+            filters.append(Receipt.total >= min_total)
+
+        if product:
+            # The term is rendered into the SQL: with a bound parameter, a prepared
+            # statement's generic plan (after 5 runs) can't estimate how selective
+            # the term is and scans all products instead of the user's receipts
+            if product_match == ProductMatch.FUZZY:
+                term = literal(product, literal_execute=True)
+                name_filter = term.op("<%", is_comparison=True)(ReceiptProduct.name)
+            else:
+                pattern = literal(f"%{_escape_like(product)}%", literal_execute=True)
+                name_filter = ReceiptProduct.name.ilike(pattern, escape="\\")
+            # EXISTS stops at the first matching product of a receipt, both
+            # conditions can use the trigram index on the product name
+            filters.append(Receipt.products.any(name_filter))
+
+        return filters
+
+    def _pin_to_primary(self, user_id: str) -> None:
+        if self.replica_pins is not None and self.read_session is not self.session:
+            self.replica_pins.set(user_id, True)
 
-        total_count = await self.session.scalar(count_stmt)
-        max_offset = total_count - 1
+    def _get_read_session(self, user_id: str | None = None) -> AsyncSession:
+        # Read-your-writes: right after creating receipts, the user's reads go to
+        # the primary until replicas have most likely caught up
+        if (
+            user_id is not None
+            and self.replica_pins is not None
+            and user_id in self.replica_pins
+        ):
+            return self.session
+        return self.read_session
 
-        if offset > max_offset:
-            raise InvalidOffset(f"Max offset value is {max_offset}")
+    async def _read_scalar(self, stmt: Select, user_id: str | None = None) -> Any:
+        session = self._get_read_session(user_id)
+        value = await session.scalar(stmt)
 
-        result = await self.session.execute(items_stmt)
-        receipts = result.unique().scalars()
-        items = TypeAdapter(list[ReceiptDto]).validate_python(receipts)
+        if value is None and session is not self.session:
+            # The row may have been created moments ago (possibly by another
+            # worker) and not have reached the replica yet
+            value = await self.session.scalar(stmt)
 
-        return OffsetResponse[ReceiptDto](items=items, total=total_count)
+        return value
 
     async def get_plaintext_receipt(self, receipt_id: str, line_length: int) -> str:
+        # Receipts are immutable, so a rendered receipt never goes stale
+        cache_key = (receipt_id, line_length)
+        formatted_receipt = self.render_cache.get(cache_key)
+
+        if formatted_receipt is not None:
+            return formatted_receipt
+
         stmt = (
             select(Receipt)
             .options(joinedload(Receipt.products))
             .where(Receipt.id == receipt_id)
         )
-        receipt = await self.session.scalar(stmt)
+        receipt = await self._read_scalar(stmt)
+
+        if receipt:
+            formatted_receipt = self.format_receipt(receipt, line_length)
+        else:
+            archived_receipt = ReceiptDto.model_validate_json(
+                self._get_archived_receipt_json(receipt_id)
+            )
+            formatted_receipt = get_layout(line_length).render_dto(archived_receipt)
 
-        if not receipt:
+        self.render_cache.set(cache_key, formatted_receipt)
+
+        return formatted_receipt
+
+    async def plaintext_receipt_exists(self, receipt_id: str, line_length: int) -> bool:
+        return (receipt_id, line_length) in self.render_cache or (
+            await self.receipt_exists(receipt_id)
+        )
+
+    def _get_archived_receipt_json(
+        self, receipt_id: str, user_id: str | None = None
+    ) -> bytes:
+        archived_receipt = None
+        if self.archive is not None:
+            archived_receipt = self.archive.get(receipt_id)
+
+        if archived_receipt is None or (
+            user_id is not None and archived_receipt.user_id != user_id
+        ):
             raise NotFound(f"Receipt (id={receipt_id}) not found")
 
-        return self.format_receipt(receipt, line_length)
+        return archived_receipt.json
 
-    @staticmethod
-    def format_receipt(receipt: Receipt, line_length: int = 32) -> str:
-        receipt_lines = [f"{'checkbox.ua':^{line_length}}", "=" * line_length]
+    async def archive_month(self, month: date, lock_timeout_ms: int = 5000) -> int:
+        """Move the receipts of a month to a new archive segment.
 
-        for product in receipt.products:
-            quantity_price = f"{product.quantity:.2f} x {product.price:,.2f}".rjust(
-                line_length - len(product.name)
-            )
-            receipt_lines.append(
-                f"{product.name.ljust(line_length - len(quantity_price))}{quantity_price}"
-            )
-            total = f"{product.total:,.2f}".rjust(line_length)
-            receipt_lines.append(total)
+        The month's partitions are dropped in the same transaction, once the
+        segment is written: if it fails, the segment only duplicates receipts
+        still in the database and the month can be archived again. Daily
+        summaries are kept, so reports still cover archived receipts.
+        Returns the number of archived receipts.
+        """
+        if self.archive is None:
+            raise RuntimeError("Archiving receipts needs a service with an archive")
+
+        receipts_partition = partition_name(RECEIPTS_TABLE, month)
+        products_partition = partition_name(PRODUCTS_TABLE, month)
 
-        receipt_lines.append("=" * line_length)
+        await self.session.execute(text(f"SET LOCAL lock_timeout = {lock_timeout_ms}"))
+        # Receipts of the month created meanwhile would be dropped unarchived
+        await self.session.execute(
+            text(f"LOCK TABLE {receipts_partition}, {products_partition} IN SHARE MODE")
+        )
 
-        str_total = str(receipt.total)
-        receipt_lines.append(f"СУМА{str_total:>{line_length - len(str_total) + 1}}")
+        stmt = (
+            select(Receipt.id, Receipt.user_id, _receipt_json())
+            .where(
+                Receipt.created_at >= month,
+                Receipt.created_at < add_months(month, 1),
+            )
+            .order_by(Receipt.id)
+            .limit(EXPORT_BATCH_SIZE)
+        )
+        self.archive.directory.mkdir(parents=True, exist_ok=True)
+        writer = SegmentWriter(self.archive.new_segment_path(month))
 
-        str_payment_amount = str(receipt.payment_amount)
-        receipt_lines.append(
-            f"{receipt.payment_type.capitalize()}{str_payment_amount:>{line_length - len(str_payment_amount) + 1}}"
+        try:
+            # Keyset batches: asyncpg keeps a server-side cursor open until the
+            # transaction ends, which would block detaching the partitions
+            rows = (await self.session.execute(stmt)).all()
+            while rows:
+                for receipt_id, user_id, receipt_json in rows:
+                    writer.add(receipt_id, user_id, receipt_json.encode())
+                rows = (
+                    await self.session.execute(stmt.where(Receipt.id > rows[-1][0]))
+                ).all()
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+        await detach_partition(await self.session.connection(), month)
+        await self.session.execute(
+            text(f"DROP TABLE {products_partition}, {receipts_partition}")
         )
-        str_rest = str(receipt.rest)
-        receipt_lines.append(f"Решта{str_rest:>{line_length - len(str_rest) - 1}}")
-        receipt_lines.append("=" * line_length)
+        await self.session.commit()
+
+        return writer.entries_count
 
-        kyiv_tz = ZoneInfo("Europe/Kyiv")
-        created_at_kyiv = receipt.created_at.astimezone(kyiv_tz)
-        receipt_lines.append(
-            f"{created_at_kyiv.strftime('%d.%m.%Y %H:%M'):^{line_length}}"
+    # Kept for callers of the service, see `checkbox.services.plaintext`
+    format_receipt = staticmethod(format_receipt)
+
+
+def _receipt_json() -> ColumnElement[str]:
+    # Mirrors the `ReceiptDto` JSON shape: money as strings, UTC timestamps with "Z"
+    products = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "name",
+                            ReceiptProduct.name,
+                            "price",
+                            cast(ReceiptProduct.price, Text),
+                            "quantity",
+                            ReceiptProduct.quantity,
+                            "total",
+                            cast(ReceiptProduct.total, Text),
+                        ),
+                        ReceiptProduct.id,
+                    )
+                ),
+                literal_column("'[]'::json"),
+            )
         )
-        receipt_lines.append(f"{'Дякуємо за покупку!':^{line_length}}")
+        # `receipt_created_at` selects the products partition
+        .where(
+            ReceiptProduct.receipt_id == Receipt.id,
+            ReceiptProduct.receipt_created_at == Receipt.created_at,
+        ).scalar_subquery()
+    )
+    created_at = func.timezone("UTC", Receipt.created_at)
+
+    return cast(
+        func.json_build_object(
+            "id",
+            Receipt.id,
+            "products",
+            products,
+            "total",
+            cast(Receipt.total, Text),
+            "payment",
+            func.json_build_object(
+                "type",
+                Receipt.payment_type,
+                "amount",
+                cast(Receipt.payment_amount, Text),
+            ),
+            "rest",
+            cast(Receipt.rest, Text),
+            "created_at",
+            func.concat(
+                func.to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS'),
+                func.nullif(func.to_char(created_at, ".US"), ".000000"),
+                "Z",
+            ),
+        ),
+        Text,
+    )
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _ZipOutput:
+    """A write-only file for `zipfile`, drained as the archive is written.
+
+    Without `seek` and `tell`, `zipfile` writes sizes and checksums after
+    each member's data instead of going back to its header.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def dump_receipt_json(receipt: Receipt) -> bytes:
+    # Byte-for-byte `ReceiptDto.model_validate(receipt).model_dump_json()`
+    return orjson.dumps(_receipt_to_dict(receipt), **ORJSON_OPTIONS)
+
+
+def dump_receipt_batch_json(
+    receipts: Sequence[tuple[int, Receipt]], errors: Sequence[tuple[int, ErrorDto]]
+) -> bytes:
+    # Byte-for-byte `ReceiptBatchResultDto(...).model_dump_json()`
+    items = [
+        {"index": index, "receipt": _receipt_to_dict(receipt), "error": None}
+        for index, receipt in receipts
+    ]
+    items.extend(
+        {"index": index, "receipt": None, "error": error.model_dump()}
+        for index, error in errors
+    )
+    items.sort(key=itemgetter("index"))
+
+    return orjson.dumps(
+        {"created": len(receipts), "failed": len(errors), "items": items},
+        **ORJSON_OPTIONS,
+    )
+
 
-        return "\n".join(receipt_lines)
+def _receipt_to_dict(receipt: Receipt) -> dict:
+    # Mirrors `ReceiptDto.parse_from_orm`, without validating our own data again
+    return {
+        "id": receipt.id,
+        "products": [
+            {
+                "name": product.name,
+                "price": product.price,
+                "quantity": product.quantity,
+                "total": product.total,
+            }
+            for product in receipt.products
+        ],
+        "total": receipt.total,
+        "payment": {"type": receipt.payment_type, "amount": receipt.payment_amount},
+        "rest": receipt.rest,
+        "created_at": receipt.created_at,
+    }
@@ -0,0 +1,192 @@
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select, insert, delete, func, cast, literal, text, Date
+
+from checkbox.database.models import DailyReceiptSummary, Receipt
+from checkbox.database.partitions import get_retained_since
+from checkbox.dto.report import (
+    DailyReportDto,
+    PeriodReportDto,
+    PaymentTypeSummaryDto,
+)
+from checkbox.exceptions.reports import InvalidReportPeriod
+from checkbox.services.base import BaseService
+from checkbox.services.receipt_service import KYIV_TZ
+
+MAX_REPORT_PERIOD_DAYS = 366
+
+SUMMARY_COLUMNS = ("receipts_count", "total", "payment_amount", "rest")
+
+
+class ReportService(BaseService):
+
+    async def get_daily_report(
+        self, user_id: str, day: date | None = None
+    ) -> DailyReportDto:
+        if day is None:
+            day = datetime.now(KYIV_TZ).date()
+
+        summaries = await self._get_summaries(user_id, start_day=day, end_day=day)
+        return self._build_daily_report(day, summaries)
+
+    async def get_period_report(
+        self, user_id: str, start_day: date, end_day: date
+    ) -> PeriodReportDto:
+        if end_day < start_day:
+            raise InvalidReportPeriod("end_day must not be earlier than start_day")
+
+        days_count = (end_day - start_day).days + 1
+        if days_count > MAX_REPORT_PERIOD_DAYS:
+            raise InvalidReportPeriod(
+                f"Max report period is {MAX_REPORT_PERIOD_DAYS} days"
+            )
+
+        summaries = await self._get_summaries(
+            user_id, start_day=start_day, end_day=end_day
+        )
+
+        summaries_by_day: dict[date, list[DailyReceiptSummary]] = {}
+        for summary in summaries:
+            summaries_by_day.setdefault(summary.day, []).append(summary)
+
+        days = [
+            self._build_daily_report(day, summaries_by_day.get(day, []))
+            for day in (start_day + timedelta(days=i) for i in range(days_count))
+        ]
+        payment_types = self._sum_by_payment_type(summaries)
+
+        return PeriodReportDto(
+            start_day=start_day,
+            end_day=end_day,
+            payment_types=payment_types,
+            days=days,
+            **self._sum_payment_types(payment_types),
+        )
+
+    async def rebuild_daily_summaries(self, user_id: str | None = None) -> int:
+        # Receipts created while the summaries are rebuilt would either be counted
+        # twice or not at all, so receipt writes wait until this transaction ends
+        await self.session.execute(text("LOCK TABLE receipts IN SHARE MODE"))
+
+        start_day = await self._get_rebuild_start_day(user_id)
+        if start_day is None:
+            await self.session.commit()
+            return 0
+
+        # Summaries of archived and detached months are kept
+        delete_stmt = delete(DailyReceiptSummary).where(
+            DailyReceiptSummary.day >= start_day
+        )
+        if user_id:
+            delete_stmt = delete_stmt.where(DailyReceiptSummary.user_id == user_id)
+        await self.session.execute(delete_stmt)
+
+        day = cast(func.timezone(KYIV_TZ.key, Receipt.created_at), Date)
+        rebuild_from = datetime.combine(start_day, time(), KYIV_TZ)
+        summaries_stmt = (
+            select(
+                Receipt.user_id,
+                day,
+                Receipt.payment_type,
+                func.count(),
+                func.sum(Receipt.total),
+                func.sum(Receipt.payment_amount),
+                func.sum(Receipt.rest),
+            )
+            .where(Receipt.created_at >= rebuild_from)
+            .group_by(Receipt.user_id, day, Receipt.payment_type)
+        )
+        if user_id:
+            summaries_stmt = summaries_stmt.where(Receipt.user_id == user_id)
+
+        result = await self.session.execute(
+            insert(DailyReceiptSummary).from_select(
+                ["user_id", "day", "payment_type", *SUMMARY_COLUMNS],
+                summaries_stmt,
+            )
+        )
+        await self.session.commit()
+
+        return result.rowcount
+
+    async def _get_rebuild_start_day(self, user_id: str | None) -> date | None:
+        retained_since = await get_retained_since(await self.session.connection())
+        if retained_since is None:
+            return None
+
+        # Kyiv is ahead of UTC: the first day also holds the receipts of the last
+        # hours of the previous month, which are gone if it was archived. The day
+        # is only rebuilt if no earlier day has summaries.
+        start_day = retained_since.astimezone(KYIV_TZ).date()
+        earlier_stmt = select(literal(True)).where(DailyReceiptSummary.day < start_day)
+        if user_id:
+            earlier_stmt = earlier_stmt.where(DailyReceiptSummary.user_id == user_id)
+
+        if await self.session.scalar(earlier_stmt.limit(1)):
+            start_day += timedelta(days=1)
+
+        return start_day
+
+    async def _get_summaries(
+        self, user_id: str, start_day: date, end_day: date
+    ) -> list[DailyReceiptSummary]:
+        summaries = await self.session.scalars(
+            select(DailyReceiptSummary)
+            .where(
+                DailyReceiptSummary.user_id == user_id,
+                DailyReceiptSummary.day >= start_day,
+                DailyReceiptSummary.day <= end_day,
+            )
+            .order_by(DailyReceiptSummary.day, DailyReceiptSummary.payment_type)
+        )
+        return list(summaries)
+
+    def _build_daily_report(
+        self, day: date, summaries: Iterable[DailyReceiptSummary]
+    ) -> DailyReportDto:
+        payment_types = self._sum_by_payment_type(summaries)
+        return DailyReportDto(
+            day=day,
+            payment_types=payment_types,
+            **self._sum_payment_types(payment_types),
+        )
+
+    @staticmethod
+    def _sum_by_payment_type(
+        summaries: Iterable[DailyReceiptSummary],
+    ) -> list[PaymentTypeSummaryDto]:
+        totals: dict = {}
+
+        for summary in summaries:
+            payment_type_totals = totals.setdefault(
+                summary.payment_type,
+                _empty_totals(),
+            )
+            for column in SUMMARY_COLUMNS:
+                payment_type_totals[column] += getattr(summary, column)
+
+        return [
+            PaymentTypeSummaryDto(payment_type=payment_type, **totals[payment_type])
+            for payment_type in sorted(totals)
+        ]
+
+    @staticmethod
+    def _sum_payment_types(payment_types: Iterable[PaymentTypeSummaryDto]) -> dict:
+        totals = _empty_totals()
+
+        for payment_type in payment_types:
+            for column in SUMMARY_COLUMNS:
+                totals[column] += getattr(payment_type, column)
+
+        return totals
+
+
+def _empty_totals() -> dict:
+    return {
+        "receipts_count": 0,
+        "total": Decimal(0),
+        "payment_amount": Decimal(0),
+        "rest": Decimal(0),
+    }
@@ -1,25 +1,45 @@
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
+from typing import NewType
 
 import jwt
-from passlib.context import CryptContext
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from checkbox.cache import LRUCache
 from checkbox.database.models import User
 from checkbox.dto.user import SignUpUserDto, TokensResponseDto, SignInUserDto
 from checkbox.exceptions.base import Unauthorized, ResourceAlreadyExists
 from checkbox.services.base import BaseService
+from checkbox.services.password import PasswordHasher
 from checkbox.config import Settings
 
+# Authenticated users by id, saves a users table query per request
+UserCache = NewType("UserCache", LRUCache)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    # What the cache keeps of an authenticated user: unlike an ORM instance,
+    # it isn't tied to the session that loaded it, so a rollback or
+    # `expire_all()` in one request can't break it for the others
+    id: str
+    email: str
+
 
 class UserService(BaseService):
 
     def __init__(
-        self, session: AsyncSession, settings: Settings, password_context: CryptContext
+        self,
+        session: AsyncSession,
+        settings: Settings,
+        password_hasher: PasswordHasher,
+        user_cache: UserCache,
     ) -> None:
         super().__init__(session)
         self.settings = settings
-        self.password_context = password_context
+        self.password_hasher = password_hasher
+        self.user_cache = user_cache
 
     async def sign_up(self, data: SignUpUserDto) -> TokensResponseDto:
         stmt = select(User).where(User.email == data.email)
@@ -40,7 +60,9 @@ class UserService(BaseService):
         if not user:
             raise Unauthorized(f"Invalid email or password.")
 
-        if not self.password_context.verify(secret=data.password, hash=user.password):
+        if not await self.password_hasher.verify(
+            secret=data.password, hash=user.password
+        ):
             raise Unauthorized(f"Invalid email or password.")
 
         return self.generate_auth_tokens(user.id)
@@ -48,7 +70,7 @@ class UserService(BaseService):
     async def create(self, email: str, password: str) -> User:
         db_user = User(
             email=email,
-            password=self.password_context.hash(password),
+            password=await self.password_hasher.hash(password),
         )
         self.session.add(db_user)
         await self.session.commit()
@@ -58,10 +80,23 @@ class UserService(BaseService):
         stmt = delete(User).where(User.id == user_id)
         await self.session.execute(stmt)
         await self.session.commit()
+        self.user_cache.delete(user_id)
 
     async def get_by_id(self, user_id: str) -> User:
         return await self.session.scalar(select(User).where(User.id == user_id))
 
+    async def get_by_id_cached(self, user_id: str) -> CurrentUser | None:
+        user = self.user_cache.get(user_id)
+
+        if user is None:
+            db_user = await self.get_by_id(user_id)
+
+            if db_user is not None:
+                user = CurrentUser(id=db_user.id, email=db_user.email)
+                self.user_cache.set(user_id, user)
+
+        return user
+
     def generate_auth_tokens(self, user_id: str) -> TokensResponseDto:
         access_token = self._generate_access_token(user_id)
         refresh_token = self._generate_refresh_token(user_id)
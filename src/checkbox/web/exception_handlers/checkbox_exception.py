@@ -3,12 +3,15 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 from checkbox.exceptions.base import CheckboxException
+from checkbox.metrics import CHECKBOX_EXCEPTIONS
 
 
 def add_handler(app: FastAPI):
     @app.exception_handler(CheckboxException)
     async def handler(request: Request, exc: CheckboxException):
+        CHECKBOX_EXCEPTIONS.inc(exc.CODE)
         return JSONResponse(
             status_code=exc.HTTP_STATUS,
             content={"detail": exc.message, "code": exc.CODE},
+            headers=exc.headers,
         )
@@ -0,0 +1,39 @@
+from starlette import status
+from starlette.responses import Response
+
+# Receipts never change once created, so clients and CDNs may keep them for a
+# year without revalidating. Responses of authenticated routes stay out of
+# shared caches.
+PUBLIC_IMMUTABLE = "public, max-age=31536000, immutable"
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def receipt_etag(receipt_id: str, representation: str, *params: object) -> str:
+    # A strong validator: one receipt renders to the same bytes every time
+    return '"' + ".".join([receipt_id, representation, *map(str, params)]) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether `If-None-Match` lists the ETag, with the weak comparison GET uses."""
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_headers(etag: str, cache_control: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    # A 304 repeats the validator and caching headers of the full response
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(etag, cache_control),
+    )
@@ -1,29 +1,54 @@
+from contextlib import asynccontextmanager
+
 from dishka import make_async_container
 from dishka.integrations.fastapi import setup_dishka
 from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine
 from starlette.middleware.cors import CORSMiddleware
 
 from checkbox.config import Settings
+from checkbox.database.partitions import create_future_partitions
 from checkbox.di import MainProvider, ServiceProvider
 from checkbox.di.auth import AuthProvider
 from checkbox.web.exception_handlers import add_exception_handlers
+from checkbox.web.middleware import MetricsMiddleware
 from checkbox.web.routers import include_routers
 
+
+def create_app(settings: Settings) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if settings.partitions.CREATE_ON_STARTUP:
+            engine = await app.state.dishka_container.get(AsyncEngine)
+            async with engine.begin() as connection:
+                await create_future_partitions(
+                    connection, months_ahead=settings.partitions.MONTHS_AHEAD
+                )
+
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(MetricsMiddleware)
+
+    include_routers(app)
+    add_exception_handlers(app)
+
+    di_container = make_async_container(
+        MainProvider(), ServiceProvider(), AuthProvider(), context={Settings: settings}
+    )
+    setup_dishka(container=di_container, app=app)
+
+    return app
+
+
 settings = Settings()
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-include_routers(app)
-add_exception_handlers(app)
-
-di_container = make_async_container(
-    MainProvider(), ServiceProvider(), AuthProvider(), context={Settings: settings}
-)
-setup_dishka(container=di_container, app=app)
+app = create_app(settings)
@@ -0,0 +1,50 @@
+import time
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from checkbox.metrics import (
+    CURRENT_REQUEST_QUERIES,
+    HTTP_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_DB_QUERIES,
+)
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: `BaseHTTPMiddleware` would add a task per request
+    # and buffer streaming responses.
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_queries = [0]
+        token = CURRENT_REQUEST_QUERIES.set(request_queries)
+        started_at = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started_at
+            CURRENT_REQUEST_QUERIES.reset(token)
+
+            # The route template, not the path, to keep the number of series bounded
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+
+            HTTP_REQUESTS.inc(method, route_path, str(status_code))
+            HTTP_REQUEST_DURATION.observe(duration, method, route_path)
+            HTTP_REQUEST_DB_QUERIES.observe(request_queries[0], method, route_path)
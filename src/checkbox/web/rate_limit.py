@@ -0,0 +1,29 @@
+from dishka import FromDishka
+from dishka.integrations.fastapi import inject
+from starlette.requests import Request
+
+from checkbox.di.auth import TokenUserId
+from checkbox.rate_limit import RateLimiter
+
+
+@inject
+async def limit_by_user(
+    request: Request,
+    user_id: FromDishka[TokenUserId],
+    rate_limiter: FromDishka[RateLimiter],
+) -> None:
+    # The token is decoded once per request, endpoints reuse the user id
+    await rate_limiter.check(_route_key(request), f"user:{user_id}")
+
+
+@inject
+async def limit_by_client(
+    request: Request, rate_limiter: FromDishka[RateLimiter]
+) -> None:
+    # Behind a proxy, run uvicorn with --proxy-headers to get the real address
+    client_host = request.client.host if request.client else "unknown"
+    await rate_limiter.check(_route_key(request), f"client:{client_host}")
+
+
+def _route_key(request: Request) -> str:
+    return f"{request.method} {request.scope['route'].path}"
@@ -1,9 +1,15 @@
 from fastapi import FastAPI
 
+from . import health
+from . import metrics
 from . import receipts
+from . import reports
 from . import users
 
 
 def include_routers(app: FastAPI) -> None:
+    app.include_router(health.router)
+    app.include_router(metrics.router)
     app.include_router(users.router)
     app.include_router(receipts.router)
+    app.include_router(reports.router)
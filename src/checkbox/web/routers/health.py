@@ -0,0 +1,43 @@
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from checkbox.database.pool import InstrumentedAsyncPool
+from checkbox.database.replicas import ReplicaRouter
+from checkbox.dto.health import HealthDto, PoolStatsDto
+
+router = APIRouter(prefix="/health", route_class=DishkaRoute, tags=["Health"])
+
+
+@router.get("")
+async def get_health(
+    engine: FromDishka[AsyncEngine],
+    replica_router: FromDishka[ReplicaRouter],
+) -> HealthDto:
+    return HealthDto(
+        status="ok",
+        pool=_get_pool_stats(engine.pool),
+        replica_pools=[
+            _get_pool_stats(replica_engine.pool)
+            for replica_engine in replica_router.engines
+        ],
+    )
+
+
+def _get_pool_stats(pool: InstrumentedAsyncPool) -> PoolStatsDto:
+    stats = pool.stats
+
+    return PoolStatsDto(
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        # Negative while fewer than `size` connections are open
+        overflow=max(pool.overflow(), 0),
+        waiting=stats.waiting,
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        checkout_time_p50_ms=stats.checkout_time_percentile(50),
+        checkout_time_p99_ms=stats.checkout_time_percentile(99),
+        checkout_time_max_ms=max(stats.checkout_times_ms, default=0.0),
+    )
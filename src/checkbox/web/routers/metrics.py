@@ -0,0 +1,48 @@
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+
+from checkbox.config import Settings
+from checkbox.di.auth import AuthStats
+from checkbox.exceptions.base import Forbidden
+from checkbox.metrics import (
+    AUTH_USER_LOOKUPS_SAVED,
+    REGISTRY,
+    update_pool_metrics,
+    update_cache_metrics,
+)
+from checkbox.services.receipt_service import RenderCache
+from checkbox.services.user import UserCache
+
+router = APIRouter(
+    prefix="/metrics",
+    route_class=DishkaRoute,
+    tags=["Metrics"],
+    include_in_schema=False,
+)
+
+
+@router.get("")
+async def get_metrics(
+    request: Request,
+    settings: FromDishka[Settings],
+    engine: FromDishka[AsyncEngine],
+    user_cache: FromDishka[UserCache],
+    render_cache: FromDishka[RenderCache],
+    auth_stats: FromDishka[AuthStats],
+) -> Response:
+    if request.client is None or (
+        request.client.host not in settings.metrics.ALLOWED_CLIENTS
+    ):
+        raise Forbidden("Metrics are only available to local clients")
+
+    update_pool_metrics(engine.pool)
+    update_cache_metrics("user", user_cache)
+    update_cache_metrics("render", render_cache)
+    # User cache hits are counted by `cache_requests_total`
+    AUTH_USER_LOOKUPS_SAVED.set(auth_stats.claims_only, "claims_only")
+
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -4,32 +4,88 @@ from io import StringIO
 
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Header, Depends
 from pydantic import NonNegativeInt, PositiveInt
 from starlette import status
-from starlette.responses import StreamingResponse
+from starlette.responses import StreamingResponse, Response
 
-from checkbox.database.models import User
 from checkbox.database.models.receipt import PaymentType
-from checkbox.dto.generic import OffsetResponse
-from checkbox.dto.receipt import CreateReceiptDto, ReceiptDto
+from checkbox.di.auth import CurrentUserId
+from checkbox.dto.generic import OffsetResponse, TotalMode
+from checkbox.dto.receipt import (
+    CreateReceiptDto,
+    ReceiptDto,
+    CreateReceiptBatchDto,
+    ReceiptBatchResultDto,
+    ReceiptsExportFormat,
+    ProductMatch,
+    PlaintextReceiptsExportDto,
+)
 from checkbox.services.receipt_service import ReceiptService
+from checkbox.services.user import CurrentUser
+from checkbox.web.http_cache import (
+    PRIVATE_IMMUTABLE,
+    PUBLIC_IMMUTABLE,
+    cache_headers,
+    etag_matches,
+    not_modified,
+    receipt_etag,
+)
+from checkbox.web.rate_limit import limit_by_user, limit_by_client
 
 router = APIRouter(prefix="/receipts", route_class=DishkaRoute, tags=["Receipt"])
 
 
-@router.post("", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ReceiptDto,
+    dependencies=[Depends(limit_by_user)],
+)
 async def create_receipt(
-    user: FromDishka[User],
+    user: FromDishka[CurrentUser],
     data: CreateReceiptDto,
     receipt_service: FromDishka[ReceiptService],
-) -> ReceiptDto:
-    return await receipt_service.create(data, user_id=user.id)
+    idempotency_key: str = Header(None, alias="Idempotency-Key", max_length=255),
+) -> Response:
+    headers = {}
 
+    if idempotency_key:
+        content, replayed = await receipt_service.create_json_idempotent(
+            data, user_id=user.id, idempotency_key=idempotency_key
+        )
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
+    else:
+        content = await receipt_service.create_json(data, user_id=user.id)
 
-@router.get("")
+    return Response(
+        content,
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=ReceiptBatchResultDto,
+    dependencies=[Depends(limit_by_user)],
+)
+async def create_receipts_batch(
+    user: FromDishka[CurrentUser],
+    data: CreateReceiptBatchDto,
+    receipt_service: FromDishka[ReceiptService],
+) -> Response:
+    content = await receipt_service.create_batch_json(data, user_id=user.id)
+    return Response(content, media_type="application/json")
+
+
+@router.get(
+    "", response_model=OffsetResponse[ReceiptDto], dependencies=[Depends(limit_by_user)]
+)
 async def get_all_user_receipts(
-    user: FromDishka[User],
+    user_id: FromDishka[CurrentUserId],
     receipt_service: FromDishka[ReceiptService],
     start_date: datetime = Query(None),
     end_date: datetime = Query(None),
@@ -37,47 +93,145 @@ async def get_all_user_receipts(
     min_total: Decimal = Query(None),
     offset: NonNegativeInt = Query(0),
     limit: PositiveInt = Query(100),
-) -> OffsetResponse[ReceiptDto]:
-    return await receipt_service.get_user_receipts(
-        user_id=user.id,
+    cursor: str = Query(None),
+    total_mode: TotalMode = Query(TotalMode.EXACT),
+    # Shorter terms have no trigrams to look up in the index
+    product: str = Query(None, min_length=3, max_length=100),
+    product_match: ProductMatch = Query(ProductMatch.SUBSTRING),
+) -> Response:
+    content = await receipt_service.get_user_receipts_json(
+        user_id=user_id,
         start_date=start_date,
         end_date=end_date,
         payment_type=payment_type,
         min_total=min_total,
         offset=offset,
         limit=limit,
+        cursor=cursor,
+        total_mode=total_mode,
+        product=product,
+        product_match=product_match,
+    )
+    return Response(content, media_type="application/json")
+
+
+@router.get("/export", dependencies=[Depends(limit_by_user)])
+async def export_user_receipts(
+    user_id: FromDishka[CurrentUserId],
+    receipt_service: FromDishka[ReceiptService],
+    start_date: datetime = Query(None),
+    end_date: datetime = Query(None),
+    payment_type: PaymentType = Query(None),
+    min_total: Decimal = Query(None),
+    export_format: ReceiptsExportFormat = Query(
+        ReceiptsExportFormat.NDJSON, alias="format"
+    ),
+) -> StreamingResponse:
+    receipts = receipt_service.export_user_receipts(
+        user_id=user_id,
+        start_date=start_date,
+        end_date=end_date,
+        payment_type=payment_type,
+        min_total=min_total,
+        export_format=export_format,
+    )
+    media_type = {
+        ReceiptsExportFormat.NDJSON: "application/x-ndjson",
+        ReceiptsExportFormat.CSV: "text/csv",
+    }[export_format]
+
+    return StreamingResponse(
+        receipts,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=receipts.{export_format}"
+        },
+    )
+
+
+@router.post("/plaintext/zip", dependencies=[Depends(limit_by_user)])
+async def export_plaintext_receipts_zip(
+    user_id: FromDishka[CurrentUserId],
+    data: PlaintextReceiptsExportDto,
+    receipt_service: FromDishka[ReceiptService],
+) -> StreamingResponse:
+    archive = receipt_service.export_plaintext_receipts_zip(
+        user_id=user_id,
+        receipt_ids=data.receipt_ids,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        line_length=data.line_length,
+    )
+
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=receipts.zip"},
     )
 
 
-@router.get("/{receipt_id}")
+@router.get(
+    "/{receipt_id}", response_model=ReceiptDto, dependencies=[Depends(limit_by_user)]
+)
 async def get_receipt_by_id(
-    user: FromDishka[User],
+    user_id: FromDishka[CurrentUserId],
     receipt_id: str,
     receipt_service: FromDishka[ReceiptService],
-) -> ReceiptDto:
-    return await receipt_service.get_user_receipt_by_id(
+    if_none_match: str = Header(None, alias="If-None-Match"),
+) -> Response:
+    etag = receipt_etag(receipt_id, "json")
+
+    # Answered by an index lookup, without reading the products
+    if etag_matches(if_none_match, etag):
+        if await receipt_service.receipt_exists(receipt_id, user_id=user_id):
+            return not_modified(etag, PRIVATE_IMMUTABLE)
+
+    content = await receipt_service.get_user_receipt_by_id_json(
         receipt_id=receipt_id,
-        user_id=user.id,
+        user_id=user_id,
+    )
+    return Response(
+        content,
+        media_type="application/json",
+        headers=cache_headers(etag, PRIVATE_IMMUTABLE),
     )
 
 
-@router.get("/{receipt_id}/plaintext")
+@router.get("/{receipt_id}/plaintext", dependencies=[Depends(limit_by_client)])
 async def get_plaintext_receipt(
     receipt_service: FromDishka[ReceiptService],
     receipt_id: str,
+    response: Response,
     line_length: int = Query(32, ge=20, le=50),
+    if_none_match: str = Header(None, alias="If-None-Match"),
 ) -> str:
-    return await receipt_service.get_plaintext_receipt(
+    etag = receipt_etag(receipt_id, "plaintext", line_length)
+
+    if etag_matches(if_none_match, etag):
+        if await receipt_service.plaintext_receipt_exists(receipt_id, line_length):
+            return not_modified(etag, PUBLIC_IMMUTABLE)
+
+    formatted_receipt = await receipt_service.get_plaintext_receipt(
         receipt_id=receipt_id, line_length=line_length
     )
+    response.headers.update(cache_headers(etag, PUBLIC_IMMUTABLE))
+
+    return formatted_receipt
 
 
-@router.get("/{receipt_id}/plaintext/download")
+@router.get("/{receipt_id}/plaintext/download", dependencies=[Depends(limit_by_client)])
 async def download_plaintext_receipt(
     receipt_service: FromDishka[ReceiptService],
     receipt_id: str,
     line_length: int = Query(32, ge=20, le=50),
-) -> StreamingResponse:
+    if_none_match: str = Header(None, alias="If-None-Match"),
+) -> Response:
+    etag = receipt_etag(receipt_id, "txt", line_length)
+
+    if etag_matches(if_none_match, etag):
+        if await receipt_service.plaintext_receipt_exists(receipt_id, line_length):
+            return not_modified(etag, PUBLIC_IMMUTABLE)
+
     formatted_receipt = await receipt_service.get_plaintext_receipt(
         receipt_id=receipt_id, line_length=line_length
     )
@@ -88,5 +242,8 @@ async def download_plaintext_receipt(
     return StreamingResponse(
         receipt_file,
         media_type="text/plain",
-        headers={"Content-Disposition": f"attachment; filename={receipt_filename}"},
+        headers={
+            "Content-Disposition": f"attachment; filename={receipt_filename}",
+            **cache_headers(etag, PUBLIC_IMMUTABLE),
+        },
     )
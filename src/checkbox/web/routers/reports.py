@@ -0,0 +1,38 @@
+from datetime import date
+
+from dishka import FromDishka
+from dishka.integrations.fastapi import DishkaRoute
+from fastapi import APIRouter, Query, Depends
+
+from checkbox.di.auth import CurrentUserId
+from checkbox.dto.report import DailyReportDto, PeriodReportDto
+from checkbox.services.report_service import ReportService
+from checkbox.web.rate_limit import limit_by_user
+
+router = APIRouter(
+    prefix="/reports",
+    route_class=DishkaRoute,
+    tags=["Report"],
+    dependencies=[Depends(limit_by_user)],
+)
+
+
+@router.get("/daily")
+async def get_daily_report(
+    user_id: FromDishka[CurrentUserId],
+    report_service: FromDishka[ReportService],
+    day: date = Query(None),
+) -> DailyReportDto:
+    return await report_service.get_daily_report(user_id=user_id, day=day)
+
+
+@router.get("/period")
+async def get_period_report(
+    user_id: FromDishka[CurrentUserId],
+    report_service: FromDishka[ReportService],
+    start_day: date = Query(),
+    end_day: date = Query(),
+) -> PeriodReportDto:
+    return await report_service.get_period_report(
+        user_id=user_id, start_day=start_day, end_day=end_day
+    )
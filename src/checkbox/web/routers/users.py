@@ -1,6 +1,6 @@
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from checkbox.dto.user import (
     SignUpUserDto,
@@ -9,8 +9,14 @@ from checkbox.dto.user import (
     RefreshTokensDto,
 )
 from checkbox.services.user import UserService
+from checkbox.web.rate_limit import limit_by_client
 
-router = APIRouter(prefix="/users", route_class=DishkaRoute, tags=["User"])
+router = APIRouter(
+    prefix="/users",
+    route_class=DishkaRoute,
+    tags=["User"],
+    dependencies=[Depends(limit_by_client)],
+)
 
 
 @router.post("/sign-up")
@@ -7,6 +7,7 @@ from pytest_asyncio import is_async_test
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from checkbox.config import Settings
+from checkbox.database.models import User
 from checkbox.di import MainProvider, ServiceProvider
 from checkbox.services.user import UserService
 from checkbox.web.main import app
@@ -58,3 +59,21 @@ async def client():
     ) as ac:
         yield ac
 
+
+@pytest_asyncio.fixture()
+async def test_user(db_session: AsyncSession, user_service: UserService):
+    user = await user_service.create(
+        email="test_cashier@gmail.com", password="securepassword"
+    )
+
+    yield user
+
+    await user_service.delete(user.id)
+
+
+@pytest_asyncio.fixture()
+async def access_token(client: AsyncClient, test_user: User) -> str:
+    sign_in_data = {"email": "test_cashier@gmail.com", "password": "securepassword"}
+    response = await client.post("/users/sign-in", json=sign_in_data)
+    tokens = response.json()
+    return tokens["access_token"]
@@ -0,0 +1,164 @@
+from datetime import datetime, UTC
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from checkbox.archive import ReceiptArchive, Segment, SegmentWriter
+from checkbox.cache import LRUCache
+from checkbox.database.models import Receipt, User
+from checkbox.database.partitions import (
+    add_months,
+    create_monthly_partitions,
+    get_partition_months,
+    month_start,
+)
+from checkbox.dto.receipt import CreateReceiptDto, ReceiptDto
+from checkbox.exceptions.base import NotFound
+from checkbox.services.receipt_service import ReceiptService, RenderCache
+from checkbox.services.report_service import ReportService
+
+
+def test_segment_lookup(tmp_path):
+    path = tmp_path / "segment.cbxseg"
+    writer = SegmentWriter(path)
+    # Ids out of order and enough records for several compressed blocks
+    receipt_ids = [f"R{i * 7919 % 5000:025}" for i in range(5000)]
+
+    for receipt_id in receipt_ids:
+        writer.add(receipt_id, "U1", f'{{"id": "{receipt_id}"}}'.encode() * 10)
+    writer.close()
+
+    segment = Segment(path)
+    assert len(segment) == 5000
+
+    for receipt_id in receipt_ids[::97]:
+        archived_receipt = segment.get(receipt_id)
+        assert archived_receipt.user_id == "U1"
+        assert archived_receipt.json == f'{{"id": "{receipt_id}"}}'.encode() * 10
+
+    assert segment.get("R" + "9" * 25) is None
+    assert segment.get("A") is None
+    assert segment.get("R" * 27) is None
+    assert segment.get_user_id("R" * 27) is None
+    segment.close()
+
+
+@pytest_asyncio.fixture
+async def archive_receipt_service(db_session: AsyncSession, tmp_path):
+    archive = ReceiptArchive(tmp_path)
+    yield ReceiptService(
+        session=db_session,
+        render_cache=RenderCache(LRUCache(max_entries=0)),
+        archive=archive,
+    )
+    archive.close()
+
+
+async def test_archive_month(
+    archive_receipt_service: ReceiptService,
+    test_user: User,
+):
+    session = archive_receipt_service.session
+    month = add_months(month_start(datetime.now(UTC).date()), -24)
+    await create_monthly_partitions(await session.connection(), month, month)
+
+    receipt_data = CreateReceiptDto.model_validate(
+        {
+            "products": [
+                {"name": "Coffee", "price": "45.50", "quantity": 2},
+                {"name": "Croissant", "price": "30", "quantity": 1},
+            ],
+            "payment": {"type": "CASH", "amount": "200"},
+        }
+    )
+    receipts = []
+    for day in range(3):
+        receipt = ReceiptService._build_receipt(receipt_data, user_id=test_user.id)
+        receipt.created_at = datetime(month.year, month.month, day + 1, tzinfo=UTC)
+        session.add(receipt)
+        receipts.append(receipt)
+    await session.commit()
+
+    report_service = ReportService(session=session)
+    await report_service.rebuild_daily_summaries(user_id=test_user.id)
+    report = await report_service.get_period_report(
+        test_user.id, month, month.replace(day=3)
+    )
+    assert report.receipts_count == 3
+
+    expected = {}
+    for receipt in receipts:
+        expected[receipt.id] = (
+            await archive_receipt_service.get_user_receipt_by_id(
+                receipt.id, test_user.id
+            ),
+            await archive_receipt_service.get_plaintext_receipt(receipt.id, 40),
+        )
+
+    assert await archive_receipt_service.archive_month(month) == 3
+    assert month not in await get_partition_months(await session.connection())
+    assert not await session.scalar(
+        select(func.count(Receipt.id)).where(Receipt.user_id == test_user.id)
+    )
+
+    # The archived month's receipts are no longer there to rebuild from
+    await report_service.rebuild_daily_summaries(user_id=test_user.id)
+    await report_service.rebuild_daily_summaries()
+    assert (
+        await report_service.get_period_report(
+            test_user.id, month, month.replace(day=3)
+        )
+        == report
+    )
+
+    for receipt_id, (receipt_dto, plaintext) in expected.items():
+        assert (
+            await archive_receipt_service.get_user_receipt_by_id(
+                receipt_id, test_user.id
+            )
+            == receipt_dto
+        )
+        receipt_json = await archive_receipt_service.get_user_receipt_by_id_json(
+            receipt_id, test_user.id
+        )
+        assert ReceiptDto.model_validate_json(receipt_json) == receipt_dto
+        assert (
+            await archive_receipt_service.get_plaintext_receipt(receipt_id, 40)
+            == plaintext
+        )
+
+        assert await archive_receipt_service.receipt_exists(
+            receipt_id, user_id=test_user.id
+        )
+        assert not await archive_receipt_service.receipt_exists(
+            receipt_id, user_id="another_user"
+        )
+
+        with pytest.raises(NotFound):
+            await archive_receipt_service.get_user_receipt_by_id(
+                receipt_id, "another_user"
+            )
+
+    with pytest.raises(NotFound):
+        await archive_receipt_service.get_plaintext_receipt("missing", 40)
+
+    # Longer than any archived id
+    overlong_id = "X" * 40
+    with pytest.raises(NotFound):
+        await archive_receipt_service.get_plaintext_receipt(overlong_id, 40)
+    with pytest.raises(NotFound):
+        await archive_receipt_service.get_user_receipt_by_id_json(
+            overlong_id, test_user.id
+        )
+    assert not await archive_receipt_service.receipt_exists(overlong_id)
+
+
+async def test_archive_month_without_archive(db_session: AsyncSession):
+    receipt_service = ReceiptService(
+        session=db_session, render_cache=RenderCache(LRUCache(max_entries=0))
+    )
+
+    with pytest.raises(RuntimeError):
+        await receipt_service.archive_month(month_start(datetime.now(UTC).date()))
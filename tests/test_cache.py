@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from checkbox.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+    assert cache.stats.hits == 3
+    assert cache.stats.misses == 1
+
+
+def test_lru_cache_is_bounded_by_size():
+    cache = LRUCache(max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.set("c", "xxxx")
+
+    assert "a" not in cache
+    assert cache.size_bytes == 8
+
+    # larger than the whole cache, never stored
+    cache.set("d", "x" * 11)
+    assert "d" not in cache
+    assert cache.size_bytes == 8
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_entries=10, ttl_seconds=60)
+
+    with patch("checkbox.cache.time.monotonic", return_value=1000):
+        cache.set("a", 1)
+
+    with patch("checkbox.cache.time.monotonic", return_value=1059):
+        assert cache.get("a") == 1
+
+    with patch("checkbox.cache.time.monotonic", return_value=1061):
+        assert cache.get("a") is None
+
+    assert len(cache) == 0
+    assert cache.stats.expirations == 1
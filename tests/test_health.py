@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import exc
+
+from checkbox.config import Settings
+from checkbox.database.setup import create_sa_engine
+
+
+async def test_health(client: AsyncClient, settings: Settings):
+    response = await client.get("/health")
+    assert response.status_code == 200, response.text
+    health = response.json()
+
+    assert health["status"] == "ok"
+    assert health["pool"]["size"] == settings.sqlalchemy.POOL_SIZE
+    assert health["pool"]["waiting"] == 0
+
+
+async def test_pool_stats(settings: Settings):
+    engine = create_sa_engine(
+        settings.postgres.url, pool_size=1, max_overflow=0, pool_timeout=0.5
+    )
+    stats = engine.pool.stats
+
+    async def checkout():
+        async with engine.connect():
+            pass
+
+    try:
+        async with engine.connect():
+            waiter = asyncio.create_task(checkout())
+            await asyncio.sleep(0.05)
+            assert stats.waiting == 1
+
+        await waiter
+        assert stats.waiting == 0
+        assert stats.checkouts == 2
+        assert stats.checkout_time_percentile(100) >= 0.05 * 1000
+
+        async with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                await checkout()
+
+        assert stats.timeouts == 1
+        assert stats.waiting == 0
+    finally:
+        await engine.dispose()
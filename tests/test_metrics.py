@@ -0,0 +1,72 @@
+from httpx import AsyncClient, ASGITransport
+
+from checkbox.database.models import User
+from checkbox.metrics import MetricsRegistry
+from checkbox.web.main import app
+
+
+def test_histogram_rendering():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "request_duration_seconds", "Latency.", ("route",), buckets=(0.1, 1)
+    )
+    counter = registry.counter("errors_total", "Errors.", ("code",))
+
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(5, "/a")
+    counter.inc('quote"d')
+
+    assert registry.render().splitlines() == [
+        "# HELP request_duration_seconds Latency.",
+        "# TYPE request_duration_seconds histogram",
+        'request_duration_seconds_bucket{route="/a",le="0.1"} 2',
+        'request_duration_seconds_bucket{route="/a",le="1"} 2',
+        'request_duration_seconds_bucket{route="/a",le="+Inf"} 3',
+        'request_duration_seconds_sum{route="/a"} 5.15',
+        'request_duration_seconds_count{route="/a"} 3',
+        "# HELP errors_total Errors.",
+        "# TYPE errors_total counter",
+        'errors_total{code="quote\\"d"} 1',
+    ]
+
+
+async def test_metrics(client: AsyncClient, test_user: User, access_token: str):
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = await client.get("/receipts/missing", headers=headers)
+    assert response.status_code == 404
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200, response.text
+    metrics = response.text
+
+    assert (
+        'http_requests_total{method="GET",route="/receipts/{receipt_id}",status="404"}'
+        in metrics
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/receipts/{receipt_id}"}'
+        in metrics
+    )
+    assert (
+        'http_request_db_queries_bucket{method="GET",route="/receipts/{receipt_id}",le="1"}'
+        in metrics
+    )
+    assert 'checkbox_exceptions_total{code="NOT_FOUND"}' in metrics
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in metrics
+    assert 'db_pool_connections{state="checked_out"}' in metrics
+    assert 'cache_requests_total{cache="user",result="hit"}' in metrics
+    # `GET /receipts/{receipt_id}` only needs the user id from the token
+    assert 'auth_user_lookups_saved_total{mode="claims_only"}' in metrics
+
+
+async def test_metrics_are_local_only():
+    async with AsyncClient(
+        transport=ASGITransport(app=app, client=("203.0.113.7", 4321)),
+        base_url="http://test",
+    ) as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 403
+    assert response.json()["code"] == "FORBIDDEN"
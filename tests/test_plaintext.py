@@ -0,0 +1,142 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from checkbox.database.models import Receipt, ReceiptProduct
+from checkbox.dto.receipt import ReceiptDto
+from checkbox.services.plaintext import (
+    format_receipt,
+    format_receipts,
+    get_layout,
+    render_receipts_json,
+)
+
+# Renders of `RECEIPTS` at every line length the API allows, one file each.
+# Regenerate after an intended change of the format with:
+#   UPDATE_GOLDEN=1 pytest tests/test_plaintext.py
+GOLDEN_DIR = Path(__file__).parent / "golden" / "plaintext"
+LINE_LENGTHS = range(20, 51)
+
+
+def _receipt(receipt_id, products, payment_type, payment_amount, created_at):
+    total = sum(product[1] * product[2] for product in products)
+    return ReceiptDto.model_validate(
+        {
+            "id": receipt_id,
+            "products": [
+                {
+                    "name": name,
+                    "price": f"{price:.2f}",
+                    "quantity": quantity,
+                    "total": f"{price * quantity:.2f}",
+                }
+                for name, price, quantity in products
+            ],
+            "total": f"{total:.2f}",
+            "payment": {"type": payment_type, "amount": f"{payment_amount:.2f}"},
+            "rest": f"{payment_amount - total:.2f}",
+            "created_at": created_at,
+        }
+    )
+
+
+RECEIPTS = {
+    "cash": _receipt(
+        "01JB0000000000000000000001",
+        [("Product 1", 10.5, 2), ("Product 2", 5, 1)],
+        "CASH",
+        30,
+        "2025-06-15T09:41:07Z",
+    ),
+    "card_thousands": _receipt(
+        "01JB0000000000000000000002",
+        [("Laptop", 1234.5, 3), ("Mouse", 999.99, 1)],
+        "CARD",
+        4703.49,
+        "2025-01-02T23:59:59.999999Z",
+    ),
+    "long_names": _receipt(
+        "01JB0000000000000000000003",
+        [
+            ("A product name far longer than any line length allows", 1, 1),
+            ("Exactly twenty chars", 12.34, 10),
+        ],
+        "CASH",
+        200,
+        "2025-03-30T00:30:00Z",
+    ),
+    "cyrillic": _receipt(
+        "01JB0000000000000000000004",
+        [("Кава лате", 65, 2), ("Круасан з мигдалем", 48.5, 1)],
+        "CARD",
+        178.5,
+        "2025-10-26T00:59:59Z",
+    ),
+    "no_products": _receipt(
+        "01JB0000000000000000000005",
+        [],
+        "CASH",
+        0,
+        "2025-12-31T22:30:00Z",
+    ),
+    "large_amounts": _receipt(
+        "01JB0000000000000000000006",
+        [("Bolts", 0.01, 100000), ("Truck", 1234567.89, 1)],
+        "CASH",
+        1240000,
+        "2024-02-29T12:00:00Z",
+    ),
+}
+
+
+def _to_orm(receipt: ReceiptDto) -> Receipt:
+    return Receipt(
+        id=receipt.id,
+        products=[
+            ReceiptProduct(
+                name=product.name,
+                price=product.price,
+                quantity=product.quantity,
+                total=product.total,
+            )
+            for product in receipt.products
+        ],
+        total=receipt.total,
+        payment_type=receipt.payment.type,
+        payment_amount=receipt.payment.amount,
+        rest=receipt.rest,
+        created_at=receipt.created_at,
+    )
+
+
+def _join(rendered_receipts: list[str]) -> str:
+    return "".join(
+        f"--- {name}\n{rendered_receipt}\n"
+        for name, rendered_receipt in zip(RECEIPTS, rendered_receipts)
+    )
+
+
+@pytest.mark.parametrize("line_length", LINE_LENGTHS)
+def test_plaintext_golden_files(line_length: int):
+    path = GOLDEN_DIR / f"line_length_{line_length}.txt"
+    receipts = [_to_orm(receipt) for receipt in RECEIPTS.values()]
+    rendered = _join([format_receipt(receipt, line_length) for receipt in receipts])
+
+    if os.environ.get("UPDATE_GOLDEN"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rendered, encoding="utf-8")
+
+    assert rendered == path.read_text(encoding="utf-8")
+
+    # The batch, DTO and JSON paths render the same
+    assert _join(format_receipts(receipts, line_length)) == rendered
+    layout = get_layout(line_length)
+    assert (
+        _join([layout.render_dto(receipt) for receipt in RECEIPTS.values()]) == rendered
+    )
+    receipts_json = [receipt.model_dump_json() for receipt in RECEIPTS.values()]
+    assert (
+        _join([text for _, _, text in render_receipts_json(receipts_json, line_length)])
+        == rendered
+    )
@@ -0,0 +1,250 @@
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, UTC, timedelta
+
+import pytest_asyncio
+from dishka import AsyncContainer
+from sqlalchemy import event, text, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from checkbox.cache import LRUCache
+from checkbox.database.models import Receipt
+from checkbox.database.models.receipt import PaymentType
+from checkbox.database.partitions import partition_name, month_start
+from checkbox.services.receipt_service import ReceiptService, RenderCache
+
+SEED_USERS_COUNT = 50
+SEED_RECEIPTS_PER_USER = 2000
+SEED_PRODUCTS_PER_RECEIPT = 3
+
+SEED_USERS_SQL = """
+INSERT INTO users (id, email, password, created_at, updated_at)
+SELECT 'QP' || lpad(u::text, 24, '0'), 'query_plans_' || u || '@example.com', '',
+       now(), now()
+FROM generate_series(1, :users_count) u
+"""
+
+SEED_RECEIPTS_SQL = """
+INSERT INTO receipts
+    (id, user_id, total, payment_type, payment_amount, rest, created_at, updated_at)
+SELECT 'QP' || lpad((u * 1000000 + r)::text, 24, '0'),
+       'QP' || lpad(u::text, 24, '0'),
+       r % 500 + 1,
+       (CASE WHEN r % 3 = 0 THEN 'CARD' ELSE 'CASH' END)::paymenttype,
+       r % 500 + 1,
+       0,
+       now() - r * interval '1 minute',
+       now() - r * interval '1 minute'
+FROM generate_series(1, :users_count) u, generate_series(1, :receipts_count) r
+"""
+
+SEED_PRODUCTS_SQL = """
+INSERT INTO receipt_products
+    (id, receipt_id, receipt_created_at, name, price, quantity, total,
+     created_at, updated_at)
+SELECT 'QP' || lpad(((u * 1000000 + r) * 10 + p)::text, 24, '0'),
+       'QP' || lpad((u * 1000000 + r)::text, 24, '0'),
+       now() - r * interval '1 minute',
+       'Product ' || p, 1, 1, 1, now(), now()
+FROM generate_series(1, :users_count) u,
+     generate_series(1, :receipts_count) r,
+     generate_series(1, :products_count) p
+"""
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def seeded_user_id(di_container: AsyncContainer):
+    async with di_container() as request_container:
+        session = await request_container.get(AsyncSession)
+        params = {
+            "users_count": SEED_USERS_COUNT,
+            "receipts_count": SEED_RECEIPTS_PER_USER,
+            "products_count": SEED_PRODUCTS_PER_RECEIPT,
+        }
+        await session.execute(text(SEED_USERS_SQL), params)
+        await session.execute(text(SEED_RECEIPTS_SQL), params)
+        await session.execute(text(SEED_PRODUCTS_SQL), params)
+        await session.execute(text("ANALYZE users, receipts, receipt_products"))
+        await session.commit()
+
+    yield "QP" + "1".zfill(24)
+
+    async with di_container() as request_container:
+        session = await request_container.get(AsyncSession)
+        await session.execute(text("DELETE FROM users WHERE id LIKE 'QP%'"))
+        await session.commit()
+
+
+@pytest_asyncio.fixture
+async def uncached_receipt_service(di_container: AsyncContainer):
+    # A zero-sized render cache, so plaintext receipts always hit the database
+    async with di_container() as request_container:
+        session = await request_container.get(AsyncSession)
+        yield ReceiptService(
+            session=session, render_cache=RenderCache(LRUCache(max_entries=0))
+        )
+
+
+@contextmanager
+def capture_statements(session: AsyncSession) -> Iterator[list[tuple]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    engine = session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def iter_plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child_plan in plan.get("Plans", []):
+        yield from iter_plan_nodes(child_plan)
+
+
+async def get_plan_nodes(
+    session: AsyncSession, statement: str, parameters
+) -> tuple[dict, list[dict]]:
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}", parameters
+    )
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan, list(iter_plan_nodes(plan[0]["Plan"]))
+
+
+async def assert_index_scans(session: AsyncSession, statements: list[tuple]) -> None:
+    assert statements
+    # Scanning an empty partition sequentially is the cheapest way to scan it
+    non_empty_partitions = set(await session.scalars(text("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname IN ('receipts', 'receipt_products')
+                  AND child.reltuples > 0
+                """)))
+
+    for statement, parameters in statements:
+        plan, nodes = await get_plan_nodes(session, statement, parameters)
+        seq_scans = [
+            node["Relation Name"]
+            for node in nodes
+            if node["Node Type"] == "Seq Scan"
+            and node["Relation Name"] in non_empty_partitions
+        ]
+        assert not seq_scans, (statement, json.dumps(plan, indent=2))
+        assert any("Index Name" in node for node in nodes), statement
+
+
+async def test_get_user_receipts_uses_indexes(
+    seeded_user_id: str, uncached_receipt_service: ReceiptService
+):
+    receipt_service = uncached_receipt_service
+    filters = [
+        {},
+        {"payment_type": PaymentType.CARD},
+        {"min_total": 450},
+    ]
+
+    for filter_kwargs in filters:
+        kwargs = {
+            "user_id": seeded_user_id,
+            "start_date": None,
+            "end_date": None,
+            "payment_type": None,
+            "min_total": None,
+            "offset": 0,
+            "limit": 100,
+        } | filter_kwargs
+
+        with capture_statements(receipt_service.session) as statements:
+            page = await receipt_service.get_user_receipts(**kwargs)
+            await receipt_service.get_user_receipts_json(**kwargs)
+
+        assert len(page.items) == 100
+        await assert_index_scans(receipt_service.session, statements)
+
+    # The next page through the keyset cursor
+    kwargs["cursor"] = page.next_cursor
+    with capture_statements(receipt_service.session) as statements:
+        await receipt_service.get_user_receipts_json(**kwargs)
+    await assert_index_scans(receipt_service.session, statements)
+
+
+async def test_get_user_receipts_prunes_partitions(
+    seeded_user_id: str, uncached_receipt_service: ReceiptService
+):
+    receipt_service = uncached_receipt_service
+    end_date = datetime.now(UTC)
+    start_date = end_date - timedelta(hours=1)
+    kwargs = {
+        "user_id": seeded_user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "payment_type": None,
+        "min_total": None,
+        "offset": 0,
+        "limit": 10,
+    }
+
+    with capture_statements(receipt_service.session) as statements:
+        page = await receipt_service.get_user_receipts(**kwargs)
+        await receipt_service.get_user_receipts_json(**kwargs)
+
+    assert len(page.items) == 10
+    expected_partitions = {
+        partition_name("receipts", month_start(day.date()))
+        for day in (start_date, end_date)
+    }
+    for statement, parameters in statements:
+        _, nodes = await get_plan_nodes(receipt_service.session, statement, parameters)
+        receipts_partitions = {
+            node["Relation Name"]
+            for node in nodes
+            if node.get("Relation Name", "").startswith("receipts_")
+        }
+        assert receipts_partitions == expected_partitions, statement
+
+
+async def test_get_user_receipt_by_id_uses_indexes(
+    seeded_user_id: str, uncached_receipt_service: ReceiptService
+):
+    receipt_service = uncached_receipt_service
+    receipt_id = await receipt_service.session.scalar(
+        select(Receipt.id).where(Receipt.user_id == seeded_user_id).limit(1)
+    )
+
+    with capture_statements(receipt_service.session) as statements:
+        receipt = await receipt_service.get_user_receipt_by_id(
+            receipt_id=receipt_id, user_id=seeded_user_id
+        )
+        await receipt_service.get_user_receipt_by_id_json(
+            receipt_id=receipt_id, user_id=seeded_user_id
+        )
+
+    assert len(receipt.products) == SEED_PRODUCTS_PER_RECEIPT
+    await assert_index_scans(receipt_service.session, statements)
+
+
+async def test_get_plaintext_receipt_uses_indexes(
+    seeded_user_id: str, uncached_receipt_service: ReceiptService
+):
+    receipt_service = uncached_receipt_service
+    receipt_id = await receipt_service.session.scalar(
+        select(Receipt.id).where(Receipt.user_id == seeded_user_id).limit(1)
+    )
+
+    for _ in range(2):
+        with capture_statements(receipt_service.session) as statements:
+            await receipt_service.get_plaintext_receipt(receipt_id, line_length=32)
+
+        await assert_index_scans(receipt_service.session, statements)
@@ -0,0 +1,85 @@
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from checkbox.config import Settings, RateLimitBudget
+from checkbox.rate_limit import InMemoryRateLimiterBackend, RateLimit
+from checkbox.services.user import UserService
+from checkbox.web.main import create_app
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def rate_limited_client(settings: Settings):
+    # The shared app has rate limiting disabled, see test.env
+    limited_settings = settings.model_copy(deep=True)
+    limited_settings.rate_limit.ENABLED = True
+    limited_settings.rate_limit.DEFAULT = RateLimitBudget(RATE=0.01, BURST=3)
+    limited_settings.rate_limit.ROUTES = {
+        "GET /receipts/{receipt_id}/plaintext": RateLimitBudget(RATE=0.01, BURST=2)
+    }
+    app = create_app(limited_settings)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+
+    await app.state.dishka_container.close()
+
+
+async def test_token_bucket(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("checkbox.rate_limit.time.monotonic", lambda: now)
+    backend = InMemoryRateLimiterBackend(max_buckets=10)
+    limit = RateLimit(rate=2, burst=2)
+
+    assert [await backend.take("a", limit) for _ in range(3)] == [0, 0, 0.5]
+    assert await backend.take("b", limit) == 0
+
+    now += 0.5
+    assert await backend.take("a", limit) == 0
+    assert await backend.take("a", limit) == 0.5
+
+    # Refills up to the burst only
+    now += 60
+    assert [await backend.take("a", limit) for _ in range(3)] == [0, 0, 0.5]
+
+
+async def test_rate_limit_by_user(
+    rate_limited_client: AsyncClient, user_service: UserService
+):
+    client = rate_limited_client
+    first_user_headers = {
+        "Authorization": f"Bearer {user_service.generate_auth_tokens('RL1').access_token}"
+    }
+    second_user_headers = {
+        "Authorization": f"Bearer {user_service.generate_auth_tokens('RL2').access_token}"
+    }
+
+    for _ in range(3):
+        response = await client.get("/reports/daily", headers=first_user_headers)
+        assert response.status_code == 200, response.text
+
+    # Routes without their own budget share the default one
+    response = await client.get("/receipts", headers=first_user_headers)
+    assert response.status_code == 429
+    assert response.json()["code"] == "TOO_MANY_REQUESTS"
+    assert int(response.headers["Retry-After"]) > 0
+
+    response = await client.get("/reports/daily", headers=second_user_headers)
+    assert response.status_code == 200, response.text
+
+
+async def test_rate_limit_by_client(rate_limited_client: AsyncClient):
+    client = rate_limited_client
+
+    for _ in range(2):
+        response = await client.get("/receipts/missing/plaintext")
+        assert response.status_code == 404
+
+    response = await client.get("/receipts/missing/plaintext")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "100"
+
+    # Its own budget, not the default one
+    response = await client.post("/users/sign-in", json={})
+    assert response.status_code == 422
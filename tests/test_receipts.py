@@ -1,34 +1,23 @@
+import asyncio
+import csv
+import json
+import zipfile
 from datetime import datetime, timedelta, UTC
 from decimal import Decimal
+from io import BytesIO
 
-import pytest_asyncio
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
+from ulid import ULID
 
-from checkbox.database.models import Receipt, User
+from checkbox.database.models import Receipt, ReceiptProduct, User, IdempotencyKey
+from checkbox.database.models.base import generate_sequential_ids
 from checkbox.database.models.receipt import PaymentType
-from checkbox.services.user import UserService
-
-
-@pytest_asyncio.fixture()
-async def test_user(db_session: AsyncSession, user_service: UserService):
-    user = await user_service.create(
-        email="test_cashier@gmail.com", password="securepassword"
-    )
-
-    yield user
-
-    await user_service.delete(user.id)
-
-
-@pytest_asyncio.fixture()
-async def access_token(client: AsyncClient, test_user: User) -> str:
-    sign_in_data = {"email": "test_cashier@gmail.com", "password": "securepassword"}
-    response = await client.post("/users/sign-in", json=sign_in_data)
-    tokens = response.json()
-    return tokens["access_token"]
+from checkbox.dto.receipt import ReceiptDto
+from checkbox.services.receipt_service import RenderCache, dump_receipt_json
+from checkbox.web.main import app
 
 
 async def test_create_receipt(
@@ -81,6 +70,118 @@ async def test_create_receipt(
     assert len(db_receipt.products) == 2
 
 
+async def test_create_receipt_with_idempotency_key(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    receipt_data = {
+        "products": [{"name": "Product 1", "price": "10.50", "quantity": 2}],
+        "payment": {"type": "CASH", "amount": "25.00"},
+    }
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Idempotency-Key": "terminal-1-sale-42",
+    }
+
+    # Concurrent duplicates wait for the first request instead of inserting
+    responses = await asyncio.gather(
+        *(
+            client.post("/receipts", json=receipt_data, headers=headers)
+            for _ in range(5)
+        )
+    )
+    assert all(response.status_code == 201 for response in responses)
+    assert len({response.content for response in responses}) == 1
+    assert [r.headers.get("Idempotent-Replayed") for r in responses].count(None) == 1
+
+    receipt = responses[0].json()
+    receipts_count = await db_session.scalar(
+        select(func.count()).where(Receipt.user_id == test_user.id)
+    )
+    assert receipts_count == 1
+
+    response = await client.post("/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 201
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.json() == receipt
+
+    other_receipt_data = receipt_data | {"payment": {"type": "CARD", "amount": "21"}}
+    response = await client.post("/receipts", json=other_receipt_data, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["code"] == "IDEMPOTENCY_KEY_MISMATCH"
+
+    # An expired key creates a new receipt
+    await db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == test_user.id)
+        .values(expires_at=datetime.now(UTC) - timedelta(seconds=1))
+    )
+    await db_session.commit()
+
+    response = await client.post("/receipts", json=other_receipt_data, headers=headers)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert response.json()["id"] != receipt["id"]
+
+
+async def test_create_receipts_batch(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    valid_receipt_data = {
+        "products": [
+            {"name": "Product 1", "price": "10.50", "quantity": 2},
+            {"name": "Product 2", "price": "5.00", "quantity": 1},
+        ],
+        "payment": {"type": "CASH", "amount": "26.00"},
+    }
+    invalid_receipt_data = {
+        "products": [{"name": "Product 1", "price": "10.50", "quantity": 2}],
+        "payment": {"type": "CARD", "amount": "10.00"},
+    }
+
+    response = await client.post(
+        "/receipts/batch",
+        json={
+            "receipts": [valid_receipt_data, invalid_receipt_data, valid_receipt_data]
+        },
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert [item["index"] for item in result["items"]] == [0, 1, 2]
+    assert result["items"][1]["receipt"] is None
+    assert result["items"][1]["error"]["code"] == "PAYMENT_AMOUNT_MISMATCH"
+
+    receipt = result["items"][0]["receipt"]
+    assert receipt["total"] == "26.00"
+    assert receipt["rest"] == "0.00"
+    assert [p["name"] for p in receipt["products"]] == ["Product 1", "Product 2"]
+
+    db_receipts = (
+        (
+            await db_session.scalars(
+                select(Receipt)
+                .options(joinedload(Receipt.products))
+                .where(Receipt.user_id == test_user.id)
+            )
+        )
+        .unique()
+        .all()
+    )
+    assert {r.id for r in db_receipts} == {
+        result["items"][0]["receipt"]["id"],
+        result["items"][2]["receipt"]["id"],
+    }
+    assert all(len(r.products) == 2 for r in db_receipts)
+
+    response = await client.get(
+        f"/receipts/{receipt['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.json() == receipt
+
+
 async def test_get_receipt_by_id(
     client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
 ):
@@ -104,6 +205,95 @@ async def test_get_receipt_by_id(
     assert fetched_receipt["payment"]["amount"] == "50.00"
 
 
+async def test_receipt_json_matches_dto(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [
+            {"name": 'Кава "Лате"', "price": "55.50", "quantity": 2},
+            {"name": "Product 2", "price": "0.05", "quantity": 10},
+            {"name": "Product 3", "price": "1.005", "quantity": 3},
+        ],
+        "payment": {"type": "CARD", "amount": "114.52"},
+    }
+
+    response = await client.post("/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 201, response.text
+    created_receipt = response.json()
+
+    empty_receipt = Receipt(
+        user_id=test_user.id,
+        payment_type=PaymentType.CASH,
+        payment_amount=Decimal("1.00"),
+        total=Decimal("0.00"),
+        rest=Decimal("1.00"),
+        created_at=datetime(2024, 1, 1, tzinfo=UTC),
+    )
+    db_session.add(empty_receipt)
+    await db_session.commit()
+
+    response = await client.get(f"/receipts/{created_receipt['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == created_receipt
+
+    response = await client.get("/receipts", headers=headers)
+    assert response.status_code == 200, response.text
+    receipts = response.json()
+    assert receipts["items"][0] == created_receipt
+    assert receipts["items"][1] == {
+        "id": empty_receipt.id,
+        "products": [],
+        "total": "0.00",
+        "payment": {"type": "CASH", "amount": "1.00"},
+        "rest": "1.00",
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+
+
+def test_receipt_orjson_encoding_matches_dto():
+    for created_at in (
+        datetime(2024, 1, 1, tzinfo=UTC),
+        datetime(2024, 1, 1, 12, 30, 15, 250, tzinfo=UTC),
+    ):
+        receipt = Receipt(
+            id="01J8FZ8Y3Q9ZKX6V1T2W3X4Y5Z",
+            user_id="01J8FZ8Y3Q9ZKX6V1T2W3X4Y60",
+            products=[
+                ReceiptProduct(
+                    name='Кава "Лате"',
+                    price=Decimal("55.50"),
+                    quantity=2,
+                    total=Decimal("111.00"),
+                )
+            ],
+            payment_type=PaymentType.CARD,
+            payment_amount=Decimal("120.00"),
+            total=Decimal("111.00"),
+            rest=Decimal("9.00"),
+            created_at=created_at,
+        )
+
+        assert (
+            dump_receipt_json(receipt)
+            == ReceiptDto.model_validate(receipt).model_dump_json().encode()
+        )
+
+
+def test_generate_sequential_ids():
+    # Calls within the same millisecond, e.g. the receipts of one batch
+    batches = [generate_sequential_ids(5) for _ in range(1000)]
+
+    for ids in batches:
+        assert ids == sorted(ids)
+        assert abs(ULID.from_str(ids[0]).datetime - datetime.now(UTC)) < timedelta(
+            minutes=1
+        )
+
+    all_ids = [receipt_id for ids in batches for receipt_id in ids]
+    assert len(set(all_ids)) == len(all_ids)
+
+
 async def test_get_receipt_by_invalid_id(
     client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
 ):
@@ -214,6 +404,238 @@ async def test_get_receipts_with_pagination(
     assert len(receipts["items"]) == 1
 
 
+async def test_get_receipts_total_modes(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    for i in range(5):
+        receipt = Receipt(
+            user_id=test_user.id,
+            payment_type=PaymentType.CARD,
+            payment_amount=Decimal(f"{50 + i}.00"),
+            total=Decimal(f"{50 + i}.00"),
+            rest=Decimal("0.00"),
+        )
+        db_session.add(receipt)
+    await db_session.commit()
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = await client.get(
+        "/receipts", headers=headers, params={"limit": 2, "total_mode": "none"}
+    )
+    assert response.status_code == 200, response.text
+    receipts = response.json()
+    assert len(receipts["items"]) == 2
+    assert receipts["total"] is None
+    assert receipts["has_more"] is True
+
+    response = await client.get(
+        "/receipts",
+        headers=headers,
+        params={"offset": 4, "limit": 2, "total_mode": "none"},
+    )
+    receipts = response.json()
+    assert len(receipts["items"]) == 1
+    assert receipts["has_more"] is False
+
+    response = await client.get(
+        "/receipts",
+        headers=headers,
+        params={"offset": 5, "limit": 2, "total_mode": "none"},
+    )
+    assert response.status_code == 400
+    assert response.json()["code"] == "INVALID_OFFSET"
+
+    response = await client.get(
+        "/receipts",
+        headers=headers,
+        params={
+            "limit": 2,
+            "total_mode": "estimate",
+            "start_date": (datetime.now(tz=UTC) - timedelta(days=1)).isoformat(),
+            "payment_type": "CARD",
+            "min_total": "10.00",
+        },
+    )
+    assert response.status_code == 200, response.text
+    receipts = response.json()
+    assert receipts["total_mode"] == "estimate"
+    assert receipts["total"] >= 3
+
+    response = await client.get(
+        "/receipts",
+        headers=headers,
+        params={"offset": 4, "limit": 2, "total_mode": "estimate"},
+    )
+    assert response.json()["total"] == 5
+
+    response = await client.get(
+        "/receipts", headers=headers, params={"offset": 2, "limit": 2}
+    )
+    receipts = response.json()
+    assert receipts["total"] == 5
+    assert receipts["has_more"] is True
+
+
+async def test_get_receipts_with_cursor_pagination(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    receipts = [
+        Receipt(
+            user_id=test_user.id,
+            payment_type=PaymentType.CASH if i % 2 else PaymentType.CARD,
+            payment_amount=Decimal(f"{50 + i}.00"),
+            total=Decimal(f"{50 + i}.00"),
+            rest=Decimal("0.00"),
+            created_at=datetime.now(tz=UTC) - timedelta(days=i),
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(receipts)
+    await db_session.commit()
+
+    fetched_ids = []
+    params = {"limit": 2}
+
+    while True:
+        response = await client.get(
+            "/receipts",
+            headers={"Authorization": f"Bearer {access_token}"},
+            params=params,
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        fetched_ids.extend(item["id"] for item in page["items"])
+
+        if page["next_cursor"] is None:
+            break
+
+        params = {"limit": 2, "cursor": page["next_cursor"]}
+
+    # newest first, every receipt exactly once
+    assert fetched_ids == [r.id for r in receipts]
+
+    response = await client.get(
+        "/receipts",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"limit": 1, "payment_type": "CARD"},
+    )
+    page = response.json()
+    assert page["items"][0]["id"] == receipts[0].id
+
+    response = await client.get(
+        "/receipts",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"limit": 1, "payment_type": "CARD", "cursor": page["next_cursor"]},
+    )
+    page = response.json()
+    assert page["items"][0]["id"] == receipts[2].id
+
+    response = await client.get(
+        "/receipts",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"cursor": "invalid"},
+    )
+    assert response.status_code == 400
+    assert response.json()["code"] == "INVALID_CURSOR"
+
+
+async def test_get_receipts_by_product_name(
+    client: AsyncClient, test_user: User, access_token: str
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    product_names = (
+        ["Espresso Coffee", "Croissant"],
+        ["Green tea", "100% Juice"],
+        ["Coffee beans_1kg"],
+    )
+    response = await client.post(
+        "/receipts/batch",
+        json={
+            "receipts": [
+                {
+                    "products": [
+                        {"name": name, "price": "1.00", "quantity": 1} for name in names
+                    ],
+                    "payment": {"type": "CARD", "amount": f"{len(names)}.00"},
+                }
+                for names in product_names
+            ]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    receipt_ids = [item["receipt"]["id"] for item in response.json()["items"]]
+
+    async def search(**params) -> list[str]:
+        # An exact total of no receipts is an invalid offset
+        params["total_mode"] = "none"
+        response = await client.get("/receipts", headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        return sorted(receipt["id"] for receipt in response.json()["items"])
+
+    assert await search(product="coffee") == sorted([receipt_ids[0], receipt_ids[2]])
+    assert await search(product="COFFEE", limit=1) in (
+        [receipt_ids[0]],
+        [receipt_ids[2]],
+    )
+    # LIKE wildcards match literally
+    assert await search(product="0% J") == [receipt_ids[1]]
+    assert await search(product="s_1") == [receipt_ids[2]]
+    assert await search(product="n_1") == []
+    assert await search(product="Cofee") == []
+    assert await search(product="Cofee", product_match="fuzzy") == sorted(
+        [receipt_ids[0], receipt_ids[2]]
+    )
+
+    response = await client.get("/receipts", headers=headers, params={"product": "te"})
+    assert response.status_code == 422
+
+
+async def test_export_receipts(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [
+            {"name": "Product 1", "price": "10.50", "quantity": 2},
+            {"name": "Product, 2", "price": "5.00", "quantity": 1},
+        ],
+        "payment": {"type": "CASH", "amount": "26.00"},
+    }
+    card_receipt_data = {
+        "products": [{"name": "Product 3", "price": "1.00", "quantity": 1}],
+        "payment": {"type": "CARD", "amount": "1.00"},
+    }
+    response = await client.post(
+        "/receipts/batch",
+        json={"receipts": [receipt_data, card_receipt_data, receipt_data]},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    response = await client.get("/receipts", headers=headers)
+    receipts = response.json()["items"]
+
+    response = await client.get("/receipts/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported_receipts = [json.loads(line) for line in response.text.splitlines()]
+    assert exported_receipts == receipts
+
+    response = await client.get(
+        "/receipts/export",
+        headers=headers,
+        params={"format": "csv", "payment_type": "CASH"},
+    )
+    assert response.status_code == 200, response.text
+    rows = list(csv.reader(response.text.splitlines()))
+    assert rows[0][0] == "receipt_id"
+    assert len(rows) == 5
+    assert {row[2] for row in rows[1:]} == {"CASH"}
+    assert rows[2][6:] == ["Product, 2", "5.00", "1", "5.00"]
+
+
 async def test_plaintext_receipt_structure_and_accessibility(
     client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
 ):
@@ -244,3 +666,122 @@ async def test_plaintext_receipt_structure_and_accessibility(
     assert "2.00 x 10.50" in plaintext_receipt
     assert "26.00" in plaintext_receipt
     assert "Дякуємо за покупку!" in plaintext_receipt
+
+    render_cache = await app.state.dishka_container.get(RenderCache)
+    cache_hits = render_cache.stats.hits
+
+    response = await client.get(
+        f"/receipts/{receipt['id']}/plaintext/download",
+        params={"line_length": 32},
+    )
+    assert response.status_code == 200, response.text
+    assert response.text == json.loads(plaintext_receipt)
+    assert render_cache.stats.hits == cache_hits + 1
+
+
+async def test_export_plaintext_receipts_zip(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [
+            {"name": "Product 1", "price": "10.50", "quantity": 2},
+            {"name": "Product 2", "price": "5.00", "quantity": 1},
+        ],
+        "payment": {"type": "CASH", "amount": "26.00"},
+    }
+    response = await client.post(
+        "/receipts/batch",
+        json={"receipts": [receipt_data] * 3},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    receipt_ids = [item["receipt"]["id"] for item in response.json()["items"]]
+
+    response = await client.post(
+        "/receipts/plaintext/zip", json={"line_length": 40}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            f"receipt_{receipt_id}.txt" for receipt_id in receipt_ids
+        ]
+
+        for receipt_id in receipt_ids:
+            response = await client.get(
+                f"/receipts/{receipt_id}/plaintext/download",
+                params={"line_length": 40},
+            )
+            assert archive.read(f"receipt_{receipt_id}.txt").decode() == response.text
+
+    response = await client.post(
+        "/receipts/plaintext/zip",
+        json={"receipt_ids": [receipt_ids[1], "missing"]},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.namelist() == [f"receipt_{receipt_ids[1]}.txt"]
+
+
+async def test_receipt_http_caching(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, access_token: str
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [{"name": "Product 1", "price": "10.50", "quantity": 2}],
+        "payment": {"type": "CASH", "amount": "21.00"},
+    }
+    response = await client.post("/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 201, response.text
+    receipt_id = response.json()["id"]
+
+    for url, params, request_headers, cache_control in (
+        (f"/receipts/{receipt_id}", {}, headers, "private"),
+        (f"/receipts/{receipt_id}/plaintext", {"line_length": 40}, {}, "public"),
+        (f"/receipts/{receipt_id}/plaintext/download", {}, {}, "public"),
+    ):
+        response = await client.get(url, params=params, headers=request_headers)
+        assert response.status_code == 200, response.text
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and receipt_id in etag
+        assert response.headers["cache-control"].startswith(cache_control)
+        assert "immutable" in response.headers["cache-control"]
+
+        response = await client.get(
+            url,
+            params=params,
+            headers={**request_headers, "If-None-Match": f'"other", W/{etag}'},
+        )
+        assert response.status_code == 304, response.text
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await client.get(
+            url, params=params, headers={**request_headers, "If-None-Match": '"other"'}
+        )
+        assert response.status_code == 200, response.text
+
+    # ETags depend on the render parameters
+    response = await client.get(
+        f"/receipts/{receipt_id}/plaintext",
+        params={"line_length": 32},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["etag"] != etag
+
+    # A matching ETag of a missing receipt is still a 404
+    missing_etag = etag.replace(receipt_id, "missing")
+    response = await client.get(
+        "/receipts/missing/plaintext/download", headers={"If-None-Match": missing_etag}
+    )
+    assert response.status_code == 404, response.text
+    response = await client.get(
+        "/receipts/missing", headers={**headers, "If-None-Match": "*"}
+    )
+    assert response.status_code == 404, response.text
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+import pytest_asyncio
+from dishka import make_async_container
+from sqlalchemy import text
+
+from checkbox.config import Settings
+from checkbox.database.models import Base
+from checkbox.database.replicas import ReplicaRouter
+from checkbox.database.setup import create_sa_engine
+from checkbox.di import MainProvider, ServiceProvider
+from checkbox.dto.generic import TotalMode
+from checkbox.dto.receipt import CreateReceiptDto
+from checkbox.exceptions.base import NotFound
+from checkbox.services.receipt_service import ReceiptService, ReplicaPins
+from checkbox.services.user import UserService
+
+REPLICA_DATABASE = "checkbox_replica"
+
+
+def fake_engine(name: str, checked_out: int) -> SimpleNamespace:
+    pool = SimpleNamespace(
+        checkedout=lambda: checked_out, stats=SimpleNamespace(waiting=0)
+    )
+    return SimpleNamespace(name=name, pool=pool)
+
+
+def test_replica_router_selection():
+    engines = [fake_engine("a", 3), fake_engine("b", 1), fake_engine("c", 1)]
+
+    round_robin = ReplicaRouter(engines)
+    assert [round_robin.choose().name for _ in range(4)] == ["a", "b", "c", "a"]
+
+    least_busy = ReplicaRouter(engines, selection="least_busy")
+    assert [least_busy.choose().name for _ in range(3)] == ["b", "b", "c"]
+
+    assert ReplicaRouter([]).choose() is None
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def replica_settings(settings: Settings):
+    # An empty database plays a replica that hasn't caught up with the primary
+    admin_engine = create_sa_engine(settings.postgres.url).execution_options(
+        isolation_level="AUTOCOMMIT"
+    )
+    async with admin_engine.connect() as connection:
+        await connection.execute(text(f"DROP DATABASE IF EXISTS {REPLICA_DATABASE}"))
+        await connection.execute(text(f"CREATE DATABASE {REPLICA_DATABASE}"))
+
+    replica_url = settings.postgres.model_copy(
+        update={"DATABASE": REPLICA_DATABASE}
+    ).url
+    replica_engine = create_sa_engine(replica_url)
+    async with replica_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await replica_engine.dispose()
+
+    replica_settings = settings.model_copy(deep=True)
+    replica_settings.postgres.REPLICA_URLS = [replica_url]
+
+    yield replica_settings
+
+    async with admin_engine.connect() as connection:
+        await connection.execute(text(f"DROP DATABASE {REPLICA_DATABASE} WITH (FORCE)"))
+    await admin_engine.dispose()
+
+
+async def test_reads_go_to_replica_with_read_your_writes(replica_settings: Settings):
+    container = make_async_container(
+        MainProvider(), ServiceProvider(), context={Settings: replica_settings}
+    )
+    receipt_data = CreateReceiptDto.model_validate(
+        {
+            "products": [{"name": "Product 1", "price": "10.00", "quantity": 1}],
+            "payment": {"type": "CASH", "amount": "10.00"},
+        }
+    )
+    list_params = {
+        "start_date": None,
+        "end_date": None,
+        "payment_type": None,
+        "min_total": None,
+        "offset": 0,
+        "limit": 10,
+    }
+
+    async with container() as request_container:
+        user_service = await request_container.get(UserService)
+        user = await user_service.create(
+            email="replica_reader@gmail.com", password="securepassword"
+        )
+
+    try:
+        async with container() as request_container:
+            receipt_service = await request_container.get(ReceiptService)
+            replica_router = await request_container.get(ReplicaRouter)
+            assert receipt_service.read_session is not receipt_service.session
+            assert receipt_service.read_session.bind is replica_router.engines[0]
+
+            receipt = await receipt_service.create(receipt_data, user_id=user.id)
+
+            # Pinned to the primary right after the write
+            page = await receipt_service.get_user_receipts(
+                user_id=user.id, **list_params
+            )
+            assert [r.id for r in page.items] == [receipt.id]
+
+        replica_pins = await container.get(ReplicaPins)
+        replica_pins.delete(user.id)
+
+        async with container() as request_container:
+            receipt_service = await request_container.get(ReceiptService)
+
+            # Not pinned anymore: the list comes from the lagging replica
+            page = await receipt_service.get_user_receipts_json(
+                user_id=user.id, total_mode=TotalMode.NONE, **list_params
+            )
+            assert orjson.loads(page)["items"] == []
+            # Lookups by id that miss on the replica fall back to the primary
+            found = await receipt_service.get_user_receipt_by_id(
+                receipt_id=receipt.id, user_id=user.id
+            )
+            assert found.id == receipt.id
+            assert await receipt_service.get_plaintext_receipt(receipt.id, 32)
+
+            with pytest.raises(NotFound):
+                await receipt_service.get_user_receipt_by_id(
+                    receipt_id="missing", user_id=user.id
+                )
+
+        assert replica_router.engines[0].pool.stats.checkouts > 0
+    finally:
+        async with container() as request_container:
+            user_service = await request_container.get(UserService)
+            await user_service.delete(user.id)
+        await container.close()
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest_asyncio
+from dishka import AsyncContainer
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from checkbox.database.models import Receipt, User
+from checkbox.database.models.receipt import PaymentType
+from checkbox.services.receipt_service import KYIV_TZ
+from checkbox.services.report_service import ReportService
+
+
+@pytest_asyncio.fixture
+async def report_service(di_container: AsyncContainer):
+    async with di_container() as request_container:
+        yield await request_container.get(ReportService)
+
+
+async def test_daily_report(client: AsyncClient, test_user: User, access_token: str):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    cash_receipt_data = {
+        "products": [{"name": "Product 1", "price": "10.50", "quantity": 2}],
+        "payment": {"type": "CASH", "amount": "25.00"},
+    }
+    card_receipt_data = {
+        "products": [{"name": "Product 2", "price": "5.00", "quantity": 3}],
+        "payment": {"type": "CARD", "amount": "15.00"},
+    }
+
+    response = await client.post("/receipts", json=cash_receipt_data, headers=headers)
+    assert response.status_code == 201, response.text
+    response = await client.post(
+        "/receipts/batch",
+        json={"receipts": [cash_receipt_data, card_receipt_data]},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    response = await client.get("/reports/daily", headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+
+    assert report["day"] == datetime.now(KYIV_TZ).date().isoformat()
+    assert report["receipts_count"] == 3
+    assert Decimal(report["total"]) == Decimal("57.00")
+    assert Decimal(report["payment_amount"]) == Decimal("65.00")
+    assert Decimal(report["rest"]) == Decimal("8.00")
+    assert [
+        (p["payment_type"], p["receipts_count"], Decimal(p["total"]))
+        for p in report["payment_types"]
+    ] == [("CARD", 1, Decimal("15.00")), ("CASH", 2, Decimal("42.00"))]
+
+
+async def test_period_report_after_backfill(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    report_service: ReportService,
+    test_user: User,
+    access_token: str,
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    today = datetime.now(KYIV_TZ).replace(hour=12, minute=0, second=0)
+    # 23:30 in Kyiv is already the next day in UTC
+    late_evening = (today - timedelta(days=2)).replace(hour=23, minute=30)
+
+    # Receipts inserted bypassing `ReceiptService` are not in the summaries yet
+    for created_at in (today, late_evening):
+        db_session.add(
+            Receipt(
+                user_id=test_user.id,
+                payment_type=PaymentType.CASH,
+                payment_amount=Decimal("50.00"),
+                total=Decimal("40.00"),
+                rest=Decimal("10.00"),
+                created_at=created_at,
+            )
+        )
+    await db_session.commit()
+
+    params = {
+        "start_day": (today - timedelta(days=2)).date().isoformat(),
+        "end_day": today.date().isoformat(),
+    }
+    response = await client.get("/reports/period", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["receipts_count"] == 0
+
+    await report_service.rebuild_daily_summaries(user_id=test_user.id)
+
+    response = await client.get("/reports/period", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+
+    assert report["receipts_count"] == 2
+    assert Decimal(report["total"]) == Decimal("80.00")
+    assert [day["receipts_count"] for day in report["days"]] == [1, 0, 1]
+    assert report["days"][0]["day"] == params["start_day"]
+
+    response = await client.get(
+        "/reports/period",
+        params={"start_day": params["end_day"], "end_day": params["start_day"]},
+        headers=headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["code"] == "INVALID_REPORT_PERIOD"
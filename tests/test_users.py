@@ -1,10 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor
+
 from httpx import AsyncClient
 from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from checkbox.database.models import User
-from checkbox.services.user import UserService
+from checkbox.di.auth import AuthStats
+from checkbox.services.password import PasswordHasher
+from checkbox.services.user import UserService, UserCache
+from checkbox.web.main import app
 
 
 async def test_sign_up(db_session: AsyncSession, client: AsyncClient):
@@ -60,3 +65,70 @@ async def test_refresh_tokens(
 
     assert "access_token" in new_tokens
     assert "refresh_token" in new_tokens
+
+
+async def test_current_user_cache(client: AsyncClient):
+    sign_up_data = {"email": "test4@gmail.com", "password": "securepassword"}
+    response = await client.post("/users/sign-up", json=sign_up_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    receipt_data = {
+        "products": [{"name": "Product 1", "price": "10.50", "quantity": 1}],
+        "payment": {"type": "CASH", "amount": "10.50"},
+    }
+
+    app_container = app.state.dishka_container
+    auth_stats = await app_container.get(AuthStats)
+    user_cache = await app_container.get(UserCache)
+    cache_hits = user_cache.stats.hits
+    claims_only = auth_stats.claims_only
+
+    for _ in range(2):
+        response = await client.post("/receipts", json=receipt_data, headers=headers)
+        assert response.status_code == 201, response.text
+
+    assert user_cache.stats.hits == cache_hits + 1
+
+    # A replayed Idempotency-Key rolls back the session of the request that
+    # loads the user into the cache, later requests still get a usable user
+    response = await client.post(
+        "/receipts",
+        json=receipt_data,
+        headers={**headers, "Idempotency-Key": "cached-user"},
+    )
+    assert response.status_code == 201, response.text
+    user_cache.clear()
+    response = await client.post(
+        "/receipts",
+        json=receipt_data,
+        headers={**headers, "Idempotency-Key": "cached-user"},
+    )
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+    response = await client.post("/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 201, response.text
+
+    response = await client.get("/receipts", headers=headers)
+    assert response.status_code == 200, response.text
+    assert auth_stats.claims_only == claims_only + 1
+
+    async with app_container() as request_container:
+        user_service = await request_container.get(UserService)
+        user = await user_service.session.scalar(
+            select(User).where(User.email == sign_up_data["email"])
+        )
+        await user_service.delete(user.id)
+
+    response = await client.post("/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 401
+
+
+async def test_password_hasher_in_process_pool(pwd_context: CryptContext):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        password_hasher = PasswordHasher(
+            password_context=pwd_context, executor=executor
+        )
+        password_hash = await password_hasher.hash("securepassword")
+
+        assert pwd_context.verify("securepassword", password_hash)
+        assert await password_hasher.verify("securepassword", password_hash)
+        assert not await password_hasher.verify("wrongpassword", password_hash)